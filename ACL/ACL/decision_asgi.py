@@ -0,0 +1,21 @@
+"""
+ASGI entry point for the standalone ACL decision endpoint.
+
+Serves only ``aclcore.decision.DecisionApp`` (no URL conf, middleware,
+sessions or CSRF), for gateway ``auth_request`` / ``ext_authz`` checks::
+
+    uvicorn ACL.decision_asgi:application --workers 4
+
+The full site stays on ``ACL.asgi`` / ``ACL.wsgi``.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ACL.settings')
+django.setup()
+
+from aclcore.decision import DecisionApp  # noqa: E402
+
+application = DecisionApp()
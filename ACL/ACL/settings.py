@@ -85,8 +85,38 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "1234"),
         "HOST": os.getenv("DB_HOST", "127.0.0.1"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # persistent connections, pinged before reuse at the start of each request
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
+# psycopg 3 connection pool (needs psycopg[pool]); replaces persistent connections
+if os.getenv("DB_POOL", "False").lower() in {"1", "true", "yes"}:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        }
+    }
+
+# Read replicas for ACL reads ("host[:port]" list); see aclcore.services.replicas
+ACLCORE_READ_REPLICAS = []
+for _index, _replica in enumerate(h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()):
+    _host, _, _port = _replica.partition(":")
+    _alias = f"replica_{_index + 1}"
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "HOST": _host,
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    ACLCORE_READ_REPLICAS.append(_alias)
+DATABASE_ROUTERS = ["aclcore.routers.ReadReplicaRouter"]
+# After a policy change, ACL reads stay on the primary this long (covers replication lag)
+ACLCORE_REPLICA_STICKY_SECONDS = float(os.getenv("ACLCORE_REPLICA_STICKY_SECONDS", "5"))
+ACLCORE_REPLICA_RETRY_SECONDS = float(os.getenv("ACLCORE_REPLICA_RETRY_SECONDS", "30"))
 
 
 REDIS_URL = os.getenv("REDIS_URL")
@@ -112,11 +142,26 @@ CACHES = {
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
             "PASSWORD": os.getenv("REDIS_PASSWORD") or None,
+            # short timeouts so a stalled Redis trips aclcore's cache breaker instead of hanging requests
+            "SOCKET_CONNECT_TIMEOUT": float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "0.25")),
+            "SOCKET_TIMEOUT": float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25")),
         },
         "TIMEOUT": None,
     }
 }
 
+# aclcore cache keys (decisions, route lists, manifests, login throttles, metrics) spread over these
+# Redis nodes by consistent hashing (aclcore.services.sharding); sessions and coordination keys stay
+# on "default". Rebalance after changing the list: python manage.py aclcore_cache_shards --rebalance
+ACLCORE_CACHE_SHARDS = []
+for _index, _url in enumerate(u.strip() for u in os.getenv("ACLCORE_CACHE_SHARD_URLS", "").split(",") if u.strip()):
+    _alias = f"aclcore_shard_{_index + 1}"
+    CACHES[_alias] = {**CACHES["default"], "LOCATION": _url}
+    ACLCORE_CACHE_SHARDS.append(_alias)
+# "user" keeps one user's keys on one node; "application" one application's
+ACLCORE_CACHE_SHARD_BY = os.getenv("ACLCORE_CACHE_SHARD_BY", "user")
+ACLCORE_CACHE_SHARD_VNODES = int(os.getenv("ACLCORE_CACHE_SHARD_VNODES", "160"))
+
 # Use in-memory cache during tests unless explicitly overridden
 if "test" in sys.argv and os.getenv("USE_REDIS_IN_TESTS", "").lower() not in {"1", "true", "yes"}:
     CACHES = {
@@ -126,6 +171,7 @@ if "test" in sys.argv and os.getenv("USE_REDIS_IN_TESTS", "").lower() not in {"1
             "TIMEOUT": None,
         }
     }
+    ACLCORE_CACHE_SHARDS = []
 
 # ACLCore defaults
 ACLCORE_DEFAULT_APPLICATION = os.getenv("ACLCORE_DEFAULT_APPLICATION", None)
@@ -134,6 +180,35 @@ ACLCORE_BYPASS_PREFIXES = [p.strip() for p in os.getenv("ACLCORE_BYPASS_PREFIXES
 ACLCORE_USER_ID_HEADER = os.getenv("ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")
 ACLCORE_APPLICATION_HEADER = os.getenv("ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")
 ACLCORE_LOG_SAMPLING_RATE = float(os.getenv("ACLCORE_LOG_SAMPLING_RATE", "1.0"))
+# Maintain aclcore_acleffectivepermission and use it on the evaluation miss path
+ACLCORE_EFFECTIVE_PERMISSIONS = os.getenv("ACLCORE_EFFECTIVE_PERMISSIONS", "False").lower() in {"1", "true", "yes"}
+# Directory of <application>.aclsnap policy snapshots (aclcore_snapshot); unset disables
+ACLCORE_SNAPSHOT_DIR = os.getenv("ACLCORE_SNAPSHOT_DIR") or None
+ACLCORE_SNAPSHOT_CHECK_SECONDS = float(os.getenv("ACLCORE_SNAPSHOT_CHECK_SECONDS", "5"))
+# Cache circuit breaker: opens after N failed or slow calls, probes again after the reset period.
+# While open, decisions fall back to the snapshot, the ACLCacheEntry table and the database
+ACLCORE_CACHE_BREAKER_FAILURES = int(os.getenv("ACLCORE_CACHE_BREAKER_FAILURES", "5"))
+ACLCORE_CACHE_BREAKER_RESET_SECONDS = float(os.getenv("ACLCORE_CACHE_BREAKER_RESET_SECONDS", "5"))
+ACLCORE_CACHE_SLOW_MS = float(os.getenv("ACLCORE_CACHE_SLOW_MS", "50"))
+ACLCORE_SECONDARY_CACHE = os.getenv("ACLCORE_SECONDARY_CACHE", "True").lower() in {"1", "true", "yes"}
+# Per-evaluation time budget (0 = none); past it, and on evaluation errors, the degraded policy
+# ("open" allows, "closed" denies) decides, separately for is_sensitive (or unknown) routes
+ACLCORE_EVALUATION_DEADLINE_MS = float(os.getenv("ACLCORE_EVALUATION_DEADLINE_MS", "0"))
+ACLCORE_DEGRADED_POLICY = os.getenv("ACLCORE_DEGRADED_POLICY", "closed")
+ACLCORE_DEGRADED_POLICY_SENSITIVE = os.getenv("ACLCORE_DEGRADED_POLICY_SENSITIVE", "closed")
+# Standalone decision endpoint (ACL.decision_asgi) for gateway auth_request / ext_authz checks:
+# headers naming the original request, and evaluation threads per process
+ACLCORE_DECISION_METHOD_HEADER = os.getenv("ACLCORE_DECISION_METHOD_HEADER", "X-Original-Method")
+ACLCORE_DECISION_URI_HEADER = os.getenv("ACLCORE_DECISION_URI_HEADER", "X-Original-URI")
+ACLCORE_DECISION_THREADS = int(os.getenv("ACLCORE_DECISION_THREADS", "8"))
+# Fraction of ACL checks profiled for queries/cache calls (0 disables; see /api/admin/acl/profile/)
+ACLCORE_PROFILER_SAMPLE_RATE = float(os.getenv("ACLCORE_PROFILER_SAMPLE_RATE", "0"))
+ACLCORE_PROFILER_TOP_N = int(os.getenv("ACLCORE_PROFILER_TOP_N", "20"))
+ACLCORE_PROFILER_TTL_SECONDS = int(os.getenv("ACLCORE_PROFILER_TTL_SECONDS", "3600"))
+ACLCORE_MANIFEST_HISTORY_TTL_SECONDS = int(os.getenv("ACLCORE_MANIFEST_HISTORY_TTL_SECONDS", str(7 * 24 * 3600)))
+ACLCORE_MANIFEST_BUILD_WORKERS = int(os.getenv("ACLCORE_MANIFEST_BUILD_WORKERS", "2"))
+# Embed the full route list in staff login responses (legacy clients)
+ACLCORE_LOGIN_INLINE_ROUTES = os.getenv("ACLCORE_LOGIN_INLINE_ROUTES", "False").lower() in {"1", "true", "yes"}
 
 SESSION_ENGINE = os.getenv("DJANGO_SESSION_ENGINE", "django.contrib.sessions.backends.cache")
 SESSION_CACHE_ALIAS = "default"
@@ -142,6 +217,13 @@ JWT_ACCESS_SECRET = os.getenv("JWT_ACCESS_SECRET", SECRET_KEY)
 JWT_ACCESS_TOKEN_LIFETIME = timedelta(
     seconds=int(os.getenv("JWT_ACCESS_TOKEN_LIFETIME_SECONDS", os.getenv("JWT_ACCESS_TOKEN_LIFETIME", "900")))
 )
+# Verified-token LRU entries per process, and shared-cache TTL for (kind, id) → Staff/User
+PRINCIPAL_TOKEN_CACHE_SIZE = int(os.getenv("PRINCIPAL_TOKEN_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+# Login password hashing pool (per web worker); 0 workers hashes inline. Excess logins get 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "5"))
 
 ACL_CACHE_TTL = int(os.getenv("ACL_CACHE_TTL", "3600"))
 ACL_ENDPOINT_APP = os.getenv("ACL_ENDPOINT_APP", "utils")
@@ -153,6 +235,22 @@ ADMIN_RATE_LIMIT_REQUESTS = int(os.getenv("ADMIN_RATE_LIMIT_REQUESTS", "180"))
 ADMIN_RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("ADMIN_RATE_LIMIT_WINDOW_SECONDS", "60"))
 
 ACL_METRIC_DEFAULT_TTL = int(os.getenv("ACL_METRIC_DEFAULT_TTL", "3600"))
+# Login timestamps/counters are buffered per process and flushed in bulk after responses (0 = write-through)
+ACLCORE_WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("ACLCORE_WRITE_BEHIND_FLUSH_SECONDS", "2"))
+ACLCORE_WRITE_BEHIND_MAX_PENDING = int(os.getenv("ACLCORE_WRITE_BEHIND_MAX_PENDING", "1000"))
+# ACLAccessLog retention (aclcore_access_log); on PostgreSQL the table is range-partitioned by timestamp
+ACLCORE_ACCESS_LOG_RETENTION_DAYS = int(os.getenv("ACLCORE_ACCESS_LOG_RETENTION_DAYS", "90"))
+ACLCORE_ACCESS_LOG_PARTITION_INTERVAL = os.getenv("ACLCORE_ACCESS_LOG_PARTITION_INTERVAL", "month")
+ACLCORE_ACCESS_LOG_PARTITIONS_AHEAD = int(os.getenv("ACLCORE_ACCESS_LOG_PARTITIONS_AHEAD", "3"))
+# Cache warm-up (aclcore_warm_cache): hot keys come from this file (each process merges its
+# top-K into it at exit; unset disables tracking) or from the last N hours of ACLAccessLog
+ACLCORE_WARMUP_HOT_KEYS_FILE = os.getenv("ACLCORE_WARMUP_HOT_KEYS_FILE") or None
+ACLCORE_WARMUP_TOP_K = int(os.getenv("ACLCORE_WARMUP_TOP_K", "5000"))
+ACLCORE_WARMUP_LOOKBACK_HOURS = float(os.getenv("ACLCORE_WARMUP_LOOKBACK_HOURS", "24"))
+ACLCORE_WARMUP_WORKERS = int(os.getenv("ACLCORE_WARMUP_WORKERS", "4"))
+ACLCORE_WARMUP_MAX_PER_SECOND = float(os.getenv("ACLCORE_WARMUP_MAX_PER_SECOND", "200"))
+# Warm in the background when a process serves its first request (one process at a time)
+ACLCORE_WARMUP_ON_STARTUP = os.getenv("ACLCORE_WARMUP_ON_STARTUP", "False").lower() in {"1", "true", "yes"}
 
 # Auth strategy flag (Session-only by default)
 ADMIN_SESSION_ONLY_AUTH = os.getenv("ADMIN_SESSION_ONLY_AUTH", "True").lower() in {"1", "true", "yes"}
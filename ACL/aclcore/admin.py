@@ -1,7 +1,12 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
+
 from .models import (
     ACLApplication,
     ACLRole,
+    ACLRoleParent,
     ACLPermission,
     ACLRoute,
     ACLRoleRoutePermission,
@@ -17,11 +22,20 @@ class ACLApplicationAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+class ACLRoleParentInline(admin.TabularInline):
+    model = ACLRoleParent
+    fk_name = "role"
+    extra = 0
+    autocomplete_fields = ("parent",)
+    verbose_name = "parent role"
+
+
 @admin.register(ACLRole)
 class ACLRoleAdmin(admin.ModelAdmin):
     list_display = ("id", "application", "name", "is_super_role", "is_default")
     list_filter = ("application", "is_super_role", "is_default")
     search_fields = ("name",)
+    inlines = (ACLRoleParentInline,)
 
 
 @admin.register(ACLPermission)
@@ -59,10 +73,44 @@ class ACLCacheEntryAdmin(admin.ModelAdmin):
     search_fields = ("user_id", "route_hash")
 
 
+class AccessLogWindowFilter(admin.SimpleListFilter):
+    """Time window on ``timestamp``; defaults to the last day so list queries touch recent partitions only."""
+
+    title = "time window"
+    parameter_name = "window"
+    default = "24h"
+    windows = {"1h": timedelta(hours=1), "24h": timedelta(days=1), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+
+    def lookups(self, request, model_admin):
+        return [("1h", "Last hour"), ("24h", "Last 24 hours"), ("7d", "Last 7 days"), ("30d", "Last 30 days"), ("all", "All time")]
+
+    def value(self):
+        return super().value() or self.default
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": self.value() == lookup,
+                "query_string": changelist.get_query_string({self.parameter_name: lookup}),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        window = self.windows.get(self.value())
+        if window is None:
+            return queryset
+        return queryset.filter(timestamp__gte=timezone.now() - window)
+
+
 @admin.register(ACLAccessLog)
 class ACLAccessLogAdmin(admin.ModelAdmin):
     list_display = ("id", "user_id", "route", "method", "allowed", "timestamp", "ip_address")
-    list_filter = ("method", "allowed")
+    list_filter = (AccessLogWindowFilter, "method", "allowed")
     search_fields = ("user_id", "ip_address")
+    date_hierarchy = "timestamp"
+    ordering = ("-timestamp",)
+    list_select_related = ("route",)
+    # COUNT(*) over every partition on each page load is the expensive part
+    show_full_result_count = False
 
 # Register your models here.
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AclcoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'aclcore'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+
+        if getattr(settings, "ACLCORE_WARMUP_ON_STARTUP", False):
+            from .services.warmup import schedule_startup_warmup
+
+            schedule_startup_warmup()
@@ -0,0 +1,168 @@
+"""
+Minimal ASGI authorization decision endpoint for gateway sub-requests
+(nginx ``auth_request``, Envoy ``ext_authz`` in HTTP mode).
+
+The original request is described by headers:
+
+- ``ACLCORE_USER_ID_HEADER`` / ``ACLCORE_APPLICATION_HEADER`` (same settings as
+  ``HttpAclMiddleware``);
+- ``ACLCORE_DECISION_METHOD_HEADER`` / ``ACLCORE_DECISION_URI_HEADER``
+  (``X-Original-Method`` / ``X-Original-URI``); without them the
+  sub-request's own method and path are checked, which is what Envoy sends.
+
+The path is percent-decoded and its dot segments resolved before the bypass
+check and evaluation, so ``/static/../api/admin/`` or ``/static/%2e%2e/api/``
+are checked as ``/api/admin/`` and ``/api/``, which is what the upstream serves.
+
+The answer is 200 (allow), 403 (deny) or 401 (no user id) with an empty body
+and ``X-ACL-Decision``, ``X-ACL-Reason`` and ``X-ACL-Route-Id`` headers.
+Only ``EvaluationService`` runs: no URL resolution, middleware, sessions or
+CSRF. Evaluations use a thread pool (``ACLCORE_DECISION_THREADS``) because
+the ORM is synchronous; each thread keeps its own persistent connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from aclcore.services import EvaluationService
+from aclcore.services.evaluation import EvaluationResult
+from .signals import access_checked
+
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def _header_name(meta_key: str) -> bytes:
+    """``HTTP_X_USER_ID`` (request.META style) → ``x-user-id``."""
+    name = meta_key[5:] if meta_key.startswith("HTTP_") else meta_key
+    return name.lower().replace("_", "-").encode("latin-1")
+
+
+def _response_headers(result: Optional[EvaluationResult]) -> Headers:
+    if result is None:
+        return [(b"x-acl-decision", b"deny"), (b"x-acl-reason", b"missing-user-id"), (b"content-length", b"0")]
+    headers = [
+        (b"x-acl-decision", b"allow" if result.allowed else b"deny"),
+        (b"x-acl-reason", result.reason.encode("latin-1")),
+        (b"content-length", b"0"),
+    ]
+    if result.matched_route_id:
+        headers.append((b"x-acl-route-id", result.matched_route_id.encode("latin-1")))
+    return headers
+
+
+def _normalize_path(path: str) -> str:
+    """Percent-decode and resolve ``.``/``..`` segments, keeping a trailing slash."""
+    path = unquote(path) or "/"
+    resolved = posixpath.normpath("/" + path.lstrip("/"))
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+_BYPASS = EvaluationResult(allowed=True, reason="bypass")
+
+
+class DecisionApp:
+    """ASGI 3 application answering one ACL decision per request."""
+
+    def __init__(self, service: Optional[EvaluationService] = None) -> None:
+        self.eval = service or EvaluationService()
+        self.user_id_header = _header_name(getattr(settings, "ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID"))
+        self.app_header = _header_name(getattr(settings, "ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP"))
+        self.method_header = getattr(settings, "ACLCORE_DECISION_METHOD_HEADER", "X-Original-Method").lower().encode()
+        self.uri_header = getattr(settings, "ACLCORE_DECISION_URI_HEADER", "X-Original-URI").lower().encode()
+        self.default_app = getattr(settings, "ACLCORE_DEFAULT_APPLICATION", None)
+        self.bypass_prefixes: Tuple[str, ...] = tuple(
+            p for p in getattr(settings, "ACLCORE_BYPASS_PREFIXES", ["/health", "/static", "/media"]) if p
+        )
+        self.log_sampling = float(getattr(settings, "ACLCORE_LOG_SAMPLING_RATE", 1.0))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            threads = int(getattr(settings, "ACLCORE_DECISION_THREADS", 8))
+            self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="aclcore-decision")
+        return self._executor
+
+    async def __call__(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable[[], Awaitable[Dict[str, Any]]],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"unsupported ASGI scope type {scope['type']!r}")
+
+        status, headers = await self.decide(scope)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def decide(self, scope: Dict[str, Any]) -> Tuple[int, Headers]:
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        user_id = headers.get(self.user_id_header, b"").decode("latin-1")
+        if not user_id:
+            return 401, _response_headers(None)
+
+        method = headers.get(self.method_header, b"").decode("latin-1") or scope["method"]
+        uri = headers.get(self.uri_header, b"").decode("latin-1")
+        path = _normalize_path(uri.partition("?")[0] if uri else scope["path"])
+        application = headers.get(self.app_header, b"").decode("latin-1") or self.default_app
+
+        if self.bypass_prefixes and path.startswith(self.bypass_prefixes):
+            result = _BYPASS
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), self._evaluate, user_id, method, path, application)
+        return (200 if result.allowed else 403), _response_headers(result)
+
+    def _evaluate(self, user_id: str, method: str, path: str, application: Optional[str]) -> EvaluationResult:
+        # what request_started does for Django requests: drop expired or broken connections
+        close_old_connections()
+        try:
+            result = self.eval.evaluate(user_id=user_id, method=method, path=path, application=application)
+        except Exception:
+            logger.exception("ACL evaluation failed for %s %s", method, path)
+            result = self.eval.degraded()
+
+        if access_checked.receivers:
+            try:
+                access_checked.send(
+                    sender=self.__class__,
+                    allowed=result.allowed,
+                    reason=result.reason,
+                    user_id=user_id,
+                    application=application,
+                    method=method,
+                    path=path,
+                    matched_route_id=result.matched_route_id,
+                    sampling_rate=self.log_sampling,
+                )
+            except Exception:
+                pass
+        return result
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
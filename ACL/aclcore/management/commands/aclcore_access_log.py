@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from aclcore.services import access_log
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain ACLAccessLog: create upcoming partitions (PostgreSQL) and drop or batch-delete rows "
+        "older than the retention window. Meant to run daily from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=None,
+            help="Keep this many days (default: ACLCORE_ACCESS_LOG_RETENTION_DAYS; 0 keeps everything)",
+        )
+        parser.add_argument("--ahead", type=int, default=None, help="Partitions to create ahead of the current one")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per DELETE on unpartitioned tables")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between DELETE batches")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be removed")
+        parser.add_argument("--list", action="store_true", help="List partitions and exit")
+
+    def handle(self, *args, **options):
+        partitioned = access_log.is_partitioned()
+        if options["list"]:
+            if not partitioned:
+                self.stdout.write("ACLAccessLog is not partitioned on this database")
+            for partition in access_log.list_partitions():
+                self.stdout.write(f"{partition.name}  {partition.start:%Y-%m-%d} .. {partition.end:%Y-%m-%d}")
+            return
+
+        if partitioned and not options["dry_run"]:
+            created = access_log.ensure_partitions(ahead=options["ahead"])
+            for name in created:
+                self.stdout.write(f"created partition {name}")
+
+        days = options["retention_days"]
+        if days is None:
+            days = int(getattr(settings, "ACLCORE_ACCESS_LOG_RETENTION_DAYS", 90))
+        if days <= 0:
+            self.stdout.write(self.style.SUCCESS("Retention disabled"))
+            return
+
+        before = datetime.now(timezone.utc) - timedelta(days=days)
+        result = access_log.purge(
+            before, batch_size=options["batch_size"], pause=options["sleep"], dry_run=options["dry_run"]
+        )
+        verb = "would drop" if options["dry_run"] else "dropped"
+        if partitioned:
+            self.stdout.write(f"{verb} {len(result.dropped_partitions)} partition(s): {', '.join(result.dropped_partitions) or '-'}")
+            verb = "would delete" if options["dry_run"] else "deleted"
+            self.stdout.write(f"{verb} {result.deleted_rows} expired rows from {access_log.DEFAULT_PARTITION}")
+        else:
+            verb = "would delete" if options["dry_run"] else "deleted"
+            self.stdout.write(f"{verb} {result.deleted_rows} rows older than {before:%Y-%m-%d %H:%M} in {result.seconds:.1f}s")
+        self.stdout.write(self.style.SUCCESS("Done"))
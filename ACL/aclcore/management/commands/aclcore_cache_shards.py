@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from aclcore.services import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how aclcore cache keys are spread over ACLCORE_CACHE_SHARDS and, with --rebalance, move keys "
+        "that are not on their owner's node (run after adding or removing a shard)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebalance", action="store_true", help="Move misplaced keys to their owner's node")
+        parser.add_argument(
+            "--cache",
+            action="append",
+            help="Cache alias to scan (repeatable; default: every alias in CACHES, including drained nodes)",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Keys per SCAN page / get_many")
+        parser.add_argument("--max-moves-per-second", type=float, default=2000, help="Pace moves (0 = unlimited)")
+
+    def handle(self, *args, **options):
+        shards = sharding.shards()
+        if shards:
+            by = getattr(settings, "ACLCORE_CACHE_SHARD_BY", "user")
+            self.stdout.write(f"Sharding by {by} over {', '.join(shards)}")
+        else:
+            self.stdout.write("Sharding disabled: every aclcore key belongs on default")
+
+        result = sharding.rebalance(
+            aliases=options["cache"],
+            batch_size=max(1, options["batch_size"]),
+            max_moves_per_second=options["max_moves_per_second"],
+            dry_run=not options["rebalance"],
+        )
+        for alias, count in result.per_alias.items():
+            self.stdout.write(f"  {alias}: {count} keys")
+        for alias in result.skipped:
+            self.stdout.write(f"  {alias}: cannot list keys, skipped")
+        if not options["rebalance"]:
+            self.stdout.write(f"{result.misplaced} of {result.scanned} keys are on the wrong node")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Moved {result.moved} of {result.misplaced} misplaced keys in {result.seconds:.2f}s")
+        )
@@ -1,22 +1,65 @@
 from __future__ import annotations
 
-from django.core.management.base import BaseCommand
-from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.cache import caches
+
+from aclcore.services.purge import DEFAULT_FAMILIES, FAMILIES, CachePurger, PurgeNotSupported, key_patterns
+from aclcore.services.sharding import all_aliases
 
 
 class Command(BaseCommand):
-    help = "Clear ACLCore cache namespace"
+    help = "Purge ACLCore cache keys by application, user, route and key family (SCAN + UNLINK on Redis)"
 
     def add_arguments(self, parser):
-        parser.add_argument("--all", action="store_true", help="Clear entire cache backend (careful)")
+        parser.add_argument("--application", type=str, default=None, help="Only keys of this application")
+        parser.add_argument("--user", type=str, default=None, help="Only keys of this user id")
+        parser.add_argument("--route", type=str, default=None, help='Only decisions for this route: "GET /api/items/" or a path')
+        parser.add_argument(
+            "--family",
+            action="append",
+            choices=FAMILIES,
+            help=f"Key family to purge (repeatable; default: {', '.join(DEFAULT_FAMILIES)})",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Keys per SCAN page / UNLINK pipeline")
+        parser.add_argument("--max-deletes-per-second", type=float, default=5000, help="Pace deletes (0 = unlimited)")
+        parser.add_argument("--dry-run", action="store_true", help="Only count matching keys")
+        parser.add_argument(
+            "--cache", type=str, default=None, help="Cache alias (default: default and every ACLCORE_CACHE_SHARDS alias)"
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Clear the entire cache backend, including sessions when SESSION_ENGINE is cache-backed (careful)",
+        )
 
     def handle(self, *args, **options):
         if options.get("all"):
-            cache.clear()
-            self.stdout.write(self.style.SUCCESS("Cleared entire cache"))
+            aliases = [options["cache"]] if options["cache"] else all_aliases()
+            for alias in aliases:
+                caches[alias].clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared entire cache ({', '.join(aliases)})"))
             return
-        # best-effort: no direct prefix deletion in base cache API; fall back to clear
-        cache.clear()
-        self.stdout.write(self.style.SUCCESS("Cleared cache (namespace best-effort)"))
 
+        families = options.get("family") or list(DEFAULT_FAMILIES)
+        patterns = key_patterns(families, options.get("application"), options.get("user"), options.get("route"))
+        purger = CachePurger(
+            alias=options["cache"],
+            batch_size=options["batch_size"],
+            max_deletes_per_second=options["max_deletes_per_second"],
+            dry_run=options["dry_run"],
+        )
+        try:
+            result = purger.purge(patterns)
+        except PurgeNotSupported as exc:
+            raise CommandError(str(exc))
 
+        for pattern in patterns:
+            self.stdout.write(f"  {pattern}")
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"[dry-run] {result.matched} keys match"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {result.deleted} of {result.matched} matching keys in {result.batches} batches ({result.seconds:.2f}s)"
+            )
+        )
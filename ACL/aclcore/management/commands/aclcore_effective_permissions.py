@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from aclcore.models import ACLEffectivePermission, ACLUserRole
+from aclcore.services import EvaluationService, EffectivePermissionService
+
+
+class _NoCache:
+    """Cache stand-in so every evaluation takes the miss path."""
+
+    def get(self, *args, **kwargs):
+        return None
+
+    def set(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Rebuild, check or benchmark the effective-permission table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--application", type=str, default=None, help="Application name (default: all)")
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the table from roles and bindings")
+        parser.add_argument("--check", action="store_true", help="Report missing/stale/extra rows")
+        parser.add_argument("--benchmark", action="store_true", help="Compare miss latency: role chain vs table lookup")
+        parser.add_argument("--samples", type=int, default=200, help="Lookups per benchmark variant")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not (options["rebuild"] or options["check"] or options["benchmark"]):
+            raise CommandError("Specify at least one of --rebuild, --check, --benchmark")
+
+        service = EffectivePermissionService()
+        application = options.get("application")
+
+        if options["rebuild"]:
+            started = time.perf_counter()
+            changed = service.rebuild(application=application)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt effective permissions: {changed} rows changed in {elapsed:.2f}s"))
+
+        if options["check"]:
+            inconsistent = False
+            for report in service.check(application=application):
+                line = (
+                    f"[{report.application}] expected={report.expected} missing={report.missing} "
+                    f"stale={report.stale} extra={report.extra}"
+                )
+                if report.consistent:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    inconsistent = True
+                    self.stdout.write(self.style.WARNING(line))
+            if inconsistent:
+                raise CommandError("Effective-permission table is inconsistent; run with --rebuild")
+
+        if options["benchmark"]:
+            self._benchmark(application, int(options["samples"]), int(options["seed"]))
+
+    def _sample_pairs(self, application: str | None, samples: int, seed: int) -> List[Tuple[str, str, str, str]]:
+        # Bias towards users holding many roles: that is where the chain fans out
+        user_roles = ACLUserRole.objects.all()
+        if application:
+            user_roles = user_roles.filter(application__name=application)
+        heavy_users = (
+            user_roles.values("user_id", "application__name").annotate(n=Count("role_id")).order_by("-n")[:50]
+        )
+        pairs: List[Tuple[str, str, str, str]] = []
+        for row in heavy_users:
+            rows = ACLEffectivePermission.objects.filter(
+                user_id=row["user_id"], application__name=row["application__name"]
+            ).values_list("method", "normalized_path")[:20]
+            for method, normalized_path in rows:
+                pairs.append((row["application__name"], row["user_id"], method, normalized_path))
+        random.Random(seed).shuffle(pairs)
+        return pairs[:samples]
+
+    def _benchmark(self, application: str | None, samples: int, seed: int) -> None:
+        pairs = self._sample_pairs(application, samples, seed)
+        if not pairs:
+            raise CommandError("No effective-permission rows to sample; run --rebuild first")
+
+        chain = EvaluationService(cache=_NoCache())
+        variants = {
+            "chain": lambda a, u, m, p: chain.evaluate(user_id=u, method=m, path=p, application=a),
+            "table": lambda a, u, m, p: EffectivePermissionService.lookup(a, u, m, p),
+        }
+        for name, fn in variants.items():
+            timings: List[float] = []
+            with override_settings(ACLCORE_EFFECTIVE_PERMISSIONS=False), CaptureQueriesContext(connection) as ctx:
+                for app_name, user_id, method, path in pairs:
+                    started = time.perf_counter()
+                    fn(app_name, user_id, method, path)
+                    timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f"{name:<6} n={len(timings)} mean={statistics.mean(timings):.3f}ms "
+                f"p50={statistics.median(timings):.3f}ms p95={p95:.3f}ms "
+                f"queries/lookup={len(ctx.captured_queries) / len(timings):.1f}"
+            )
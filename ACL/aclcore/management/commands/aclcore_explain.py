@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from aclcore.services import RoleService, query_plans
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries run by evaluation, staff routes and role assignment and flag table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="user_id to evaluate")
+        parser.add_argument("--application", default=None)
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--path", default="/")
+        parser.add_argument("--role", default=None, help="Also plan RoleService.assign_role(user, role) (writes the assignment)")
+
+    def handle(self, *args, **options):
+        user, app = options["user"], options["application"]
+        sections = [
+            ("evaluation", query_plans.evaluation_plans(user, options["method"], options["path"], app)),
+            ("staff routes", query_plans.staff_routes_plans(user, app)),
+        ]
+        if options["role"]:
+            sections.append(
+                ("role assignment", query_plans.capture_plans(RoleService().assign_role, user, options["role"], app))
+            )
+
+        scans = 0
+        for title, plans in sections:
+            self.stdout.write(f"\n{title}")
+            for plan in plans:
+                self.stdout.write(f"  {plan.sql[:160]}")
+                for access in plan.accesses:
+                    line = f"    {access.kind:<10} {access.table} {access.index or ''}"
+                    self.stdout.write(self.style.WARNING(line) if access.kind == query_plans.SCAN else line)
+                scans += len(plan.scans)
+        if scans:
+            self.stdout.write(self.style.WARNING(f"\n{scans} table scan(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("\nNo table scans"))
@@ -1,28 +1,48 @@
 from __future__ import annotations
 
-import json
+import os
+import time
+
 from django.core.management.base import BaseCommand
 
-from aclcore.models import ACLApplication, ACLRole, ACLRoute, ACLRoleRoutePermission, ACLUserRole
+from aclcore.models import ACLApplication
+from aclcore.services.snapshot import write_snapshot
+from aclcore.services.transfer import export_policy, format_for_path
 
 
 class Command(BaseCommand):
-    help = "Export ACL data (applications, routes, roles, mappings, user_roles) to JSON"
+    help = "Export ACL data (applications, routes, roles, mappings, user_roles) to JSON or NDJSON, streaming"
 
     def add_arguments(self, parser):
-        parser.add_argument("--file", type=str, required=True, help="Output JSON file path")
+        parser.add_argument("--file", type=str, required=True, help="Output file (.json or .ndjson, optionally .gz/.zst)")
+        parser.add_argument("--format", choices=["json", "ndjson"], default=None, help="Override format inferred from --file")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per database round trip")
+        parser.add_argument("--jobs", type=int, default=1, help="Tables exported concurrently on separate connections")
+        parser.add_argument("--snapshot-dir", type=str, default=None, help="Also write <application>.aclsnap binary snapshots here")
 
     def handle(self, *args, **options):
         fp = options["file"]
-        data = {
-            "applications": list(ACLApplication.objects.values("id", "name", "description")),
-            "routes": list(ACLRoute.objects.values("id", "application_id", "path", "normalized_path", "method", "is_active", "is_sensitive", "is_ignored")),
-            "roles": list(ACLRole.objects.values("id", "application_id", "name", "is_super_role", "is_default", "description")),
-            "role_route": list(ACLRoleRoutePermission.objects.values("id", "role_id", "route_id", "is_allowed")),
-            "user_roles": list(ACLUserRole.objects.values("id", "user_id", "application_id", "role_id")),
-        }
-        with open(fp, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        self.stdout.write(self.style.SUCCESS(f"Exported ACL data to {fp}"))
-
-
+        fmt = options.get("format") or format_for_path(fp)
+        started = time.perf_counter()
+
+        def progress(table: str, rows: int, rate: float) -> None:
+            self.stdout.write(f"  {table}: {rows} rows ({rate:,.0f} rows/s)")
+
+        counts = export_policy(
+            fp,
+            fmt=fmt,
+            chunk_size=int(options["chunk_size"]),
+            jobs=max(1, int(options["jobs"])),
+            progress=progress,
+        )
+        snapshot_dir = options.get("snapshot_dir")
+        if snapshot_dir:
+            for name in ACLApplication.objects.order_by("name").values_list("name", flat=True):
+                size = write_snapshot(name, os.path.join(snapshot_dir, f"{name}.aclsnap"))
+                self.stdout.write(f"  snapshot {name}: {size} bytes")
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {total} rows ({fmt}) to {fp} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+        )
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aclcore.services.matrix import MatrixError, PolicyMatrix
+
+
+class Command(BaseCommand):
+    help = "Show which users gain or lose access to which routes if a policy change were applied"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--application", type=str, required=True)
+        change = parser.add_mutually_exclusive_group(required=True)
+        change.add_argument("--remove-role", type=str, metavar="ROLE", help="Revoke the role from every holder")
+        change.add_argument(
+            "--set-permission",
+            nargs=3,
+            metavar=("ROLE", "ROUTE", "STATE"),
+            help='Change one binding, e.g. editor "DELETE /api/items/" deny (STATE: allow|deny|none)',
+        )
+        change.add_argument("--revoke-user-role", nargs=2, metavar=("USER", "ROLE"), help="Remove a single assignment")
+        parser.add_argument("--limit", type=int, default=20, help="Rows/sample users to print")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            matrix = PolicyMatrix(options["application"])
+            if options.get("remove_role"):
+                report = matrix.impact_remove_role(options["remove_role"], sample=options["limit"])
+            elif options.get("set_permission"):
+                role, route, state = options["set_permission"]
+                report = matrix.impact_set_permission(role, route, state.lower(), sample=options["limit"])
+            else:
+                user_id, role = options["revoke_user_role"]
+                report = matrix.impact_revoke_user_role(user_id, role, sample=options["limit"])
+        except MatrixError as exc:
+            raise CommandError(str(exc))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(asdict(report), indent=2))
+            return
+
+        self.stdout.write(self.style.NOTICE(f"[{options['application']}] {report.description}"))
+        if not report.routes:
+            self.stdout.write(self.style.SUCCESS("No effective access changes"))
+            return
+        self.stdout.write(f"{len(report.routes)} routes changed, {report.affected_users} users affected")
+        for row in report.routes[: options["limit"]]:
+            self.stdout.write(f"  {row.method:<7} {row.path}  lost={row.lost} gained={row.gained}")
+        if report.sample_users:
+            self.stdout.write("sample users: " + ", ".join(report.sample_users))
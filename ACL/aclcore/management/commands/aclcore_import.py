@@ -1,71 +1,53 @@
 from __future__ import annotations
 
-import json
+import time
+
 from django.core.management.base import BaseCommand
 
-from aclcore.models import ACLApplication, ACLRole, ACLRoute, ACLRoleRoutePermission, ACLUserRole
+from aclcore.models import ACLApplication
+from aclcore.services import effective
+from aclcore.services.transfer import PolicyImporter, iter_records, open_text
 
 
 class Command(BaseCommand):
-    help = "Import ACL data from JSON (applications, routes, roles, mappings, user_roles)"
+    help = "Import ACL data from JSON or NDJSON (applications, routes, roles, mappings, user_roles), streaming"
 
     def add_arguments(self, parser):
-        parser.add_argument("--file", type=str, required=True, help="Input JSON file path")
+        parser.add_argument("--file", type=str, required=True, help="Input file (.json, .ndjson, optionally .gz/.zst)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert/transaction")
+        parser.add_argument("--copy", action="store_true", help="Use Postgres COPY for user_roles")
+        parser.add_argument("--progress-every", type=int, default=100_000, help="Report progress every N rows per table")
 
     def handle(self, *args, **options):
         fp = options["file"]
-        with open(fp, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        app_id_map = {}
-        for a in data.get("applications", []):
-            obj, _ = ACLApplication.objects.get_or_create(name=a["name"], defaults={"description": a.get("description")})
-            app_id_map[a["id"]] = obj.id
-
-        route_id_map = {}
-        for r in data.get("routes", []):
-            app = ACLApplication.objects.filter(id=app_id_map.get(r["application_id"])).first() if r.get("application_id") else None
-            obj, _ = ACLRoute.objects.get_or_create(
-                application=app,
-                path=r["path"],
-                method=r["method"],
-                defaults={
-                    "normalized_path": r.get("normalized_path") or r["path"],
-                    "is_active": r.get("is_active", True),
-                    "is_sensitive": r.get("is_sensitive", False),
-                    "is_ignored": r.get("is_ignored", False),
-                },
+        started = time.perf_counter()
+
+        def progress(table: str, rows: int, rate: float) -> None:
+            self.stdout.write(f"  {table}: {rows} rows read ({rate:,.0f} rows/s)")
+
+        importer = PolicyImporter(
+            batch_size=int(options["batch_size"]),
+            use_copy=bool(options.get("copy")),
+            progress=progress,
+            progress_every=int(options["progress_every"]),
+        )
+        with open_text(fp) as f:
+            counts = importer.run(iter_records(f))
+
+        for table, n in importer.skipped.items():
+            self.stdout.write(self.style.WARNING(f"  {table}: skipped {n} rows with unresolved references"))
+
+        # bulk inserts bypass post_save; recompute derived decisions once
+        if effective.is_enabled() and importer.touched_app_ids:
+            service = effective.EffectivePermissionService()
+            for app in ACLApplication.objects.filter(id__in=importer.touched_app_ids):
+                service.rebuild(application=app.name)
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {total} rows from {fp} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s); "
+                "rows already present were kept"
             )
-            route_id_map[r["id"]] = obj.id
-
-        role_id_map = {}
-        for ro in data.get("roles", []):
-            app = ACLApplication.objects.filter(id=app_id_map.get(ro["application_id"])).first() if ro.get("application_id") else None
-            obj, _ = ACLRole.objects.get_or_create(
-                application=app,
-                name=ro["name"],
-                defaults={
-                    "is_super_role": ro.get("is_super_role", False),
-                    "is_default": ro.get("is_default", False),
-                    "description": ro.get("description"),
-                },
-            )
-            role_id_map[ro["id"]] = obj.id
-
-        for m in data.get("role_route", []):
-            role_id = role_id_map.get(m["role_id"])
-            route_id = route_id_map.get(m["route_id"])
-            if role_id and route_id:
-                ACLRoleRoutePermission.objects.get_or_create(role_id=role_id, route_id=route_id, defaults={"is_allowed": m.get("is_allowed", True)})
-
-        for ur in data.get("user_roles", []):
-            app_real_id = app_id_map.get(ur["application_id"]) if ur.get("application_id") else None
-            ACLUserRole.objects.get_or_create(
-                user_id=ur["user_id"],
-                application_id=app_real_id,
-                role_id=role_id_map.get(ur["role_id"]),
-            )
-
-        self.stdout.write(self.style.SUCCESS(f"Imported ACL data from {fp}"))
-
-
+        )
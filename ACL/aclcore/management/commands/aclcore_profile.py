@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from aclcore.services import profiler
+
+
+class Command(BaseCommand):
+    help = "Show top SQL fingerprints, cache operations and slowest requests from the sampled ACL profiler"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=None, help="Rows per table (default: ACLCORE_PROFILER_TOP_N)")
+        parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+        parser.add_argument("--reset", action="store_true", help="Clear collected profiles after printing")
+
+    def handle(self, *args, **options):
+        data = profiler.report(top_n=options.get("top"))
+        if options["json"]:
+            self.stdout.write(json.dumps(data, indent=2))
+        else:
+            self._print(data)
+        if options["reset"]:
+            profiler.reset()
+            self.stdout.write(self.style.SUCCESS("Profiler data cleared"))
+
+    def _print(self, data) -> None:
+        if not data["requests"]:
+            rate = data["sample_rate"]
+            hint = "" if rate else " (ACLCORE_PROFILER_SAMPLE_RATE is 0)"
+            self.stdout.write(self.style.WARNING(f"No sampled requests yet{hint}"))
+            return
+        self.stdout.write(
+            f"sampled requests={data['requests']} processes={data['processes']} "
+            f"avg={data['avg_ms']:.3f}ms sample_rate={data['sample_rate']}"
+        )
+        self.stdout.write("\nTop SQL (by total time)")
+        for row in data["sql"]:
+            self.stdout.write(
+                f"  {row['total_ms']:>10.3f}ms  n={row['count']:<6} avg={row['avg_ms']:.3f} max={row['max_ms']:.3f}  {row['fingerprint']}"
+            )
+        self.stdout.write("\nCache operations")
+        for row in data["cache"]:
+            hits = f" hits={row['hits']}" if "hits" in row else ""
+            self.stdout.write(
+                f"  {row['op']:<12} n={row['count']:<6} total={row['total_ms']:.3f}ms avg={row['avg_ms']:.3f} max={row['max_ms']:.3f}{hits}"
+            )
+        self.stdout.write("\nSlowest requests")
+        for row in data["slowest"]:
+            self.stdout.write(
+                f"  {row['ms']:>9.3f}ms  {row['source']} {row['method']} {row['path']}  "
+                f"queries={row['queries']} ({row['query_ms']:.3f}ms) cache={row['cache_calls']} ({row['cache_ms']:.3f}ms)"
+            )
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, Q, Value, When
+
+from base.models import BaseTimeOrderedIDModel, uuid7
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite existing uuid4 primary keys of time-ordered ACL tables as UUIDv7 derived from created_at, "
+        "so old rows sort with new ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="aclcore model name, e.g. ACLAccessLog (repeatable; default: every time-ordered model)",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--reindex", action="store_true", help="REINDEX each table afterwards (PostgreSQL)")
+        parser.add_argument("--dry-run", action="store_true", help="Count rows that would be rekeyed")
+
+    def handle(self, *args, **options):
+        candidates = {
+            m.__name__: m
+            for m in apps.get_app_config("aclcore").get_models()
+            if issubclass(m, BaseTimeOrderedIDModel)
+        }
+        names = options.get("model") or sorted(candidates)
+        unknown = set(names) - set(candidates)
+        if unknown:
+            raise CommandError(f"Not time-ordered aclcore models: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            model = candidates[name]
+            if model._meta.related_objects:
+                # rewriting a referenced pk would need every FK updated too
+                raise CommandError(f"{name} is referenced by other tables; rekeying is not supported")
+            rekeyed, seconds = self._rekey(model, max(1, options["batch_size"]), options["sleep"], options["dry_run"])
+            verb = "would rekey" if options["dry_run"] else "rekeyed"
+            self.stdout.write(f"{name}: {verb} {rekeyed} rows in {seconds:.1f}s")
+            if options["reindex"] and not options["dry_run"] and rekeyed and connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(f'REINDEX TABLE "{model._meta.db_table}"')
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def _rekey(self, model, batch_size: int, pause: float, dry_run: bool):
+        started = time.monotonic()
+        rekeyed = 0
+        cursor = None
+        while True:
+            qs = model._base_manager.order_by("created_at", "pk")
+            if cursor is not None:
+                # keyset over (created_at, old pk); rekeyed rows that come round again are skipped below
+                qs = qs.filter(Q(created_at__gt=cursor[0]) | Q(created_at=cursor[0], pk__gt=cursor[1]))
+            batch = list(qs.values_list("pk", "created_at")[:batch_size])
+            if not batch:
+                break
+            cursor = batch[-1][1], batch[-1][0]
+            pending = [(pk, created_at) for pk, created_at in batch if pk.version != 7]
+            if not pending:
+                continue
+            rekeyed += len(pending)
+            if dry_run:
+                continue
+            new_id = Case(
+                *[When(pk=pk, then=Value(uuid7(int(created_at.timestamp() * 1000)))) for pk, created_at in pending],
+                output_field=model._meta.pk,
+            )
+            with transaction.atomic():
+                model._base_manager.filter(pk__in=[pk for pk, _ in pending]).update(**{model._meta.pk.attname: new_id})
+            if pause:
+                time.sleep(pause)
+        return rekeyed, time.monotonic() - started
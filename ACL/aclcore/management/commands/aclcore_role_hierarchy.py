@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aclcore.models import ACLRole
+from aclcore.services import role_hierarchy
+
+
+class Command(BaseCommand):
+    help = "Set parent roles, or rebuild/check the role inheritance closure"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--application", type=str, default=None, help="Application name (default: all)")
+        parser.add_argument("--role", type=str, default=None, help="Role whose parents --parent replaces (needs --application)")
+        parser.add_argument("--parent", action="append", default=[], help="Parent role name (repeatable; none clears)")
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the closure from the parent links")
+        parser.add_argument("--check", action="store_true", help="Report missing/extra closure rows")
+
+    def handle(self, *args, **options):
+        if not (options["role"] or options["rebuild"] or options["check"]):
+            raise CommandError("Specify at least one of --role, --rebuild, --check")
+        application = options.get("application")
+
+        if options["role"]:
+            if not application:
+                raise CommandError("--role requires --application")
+            names = [options["role"], *options["parent"]]
+            roles = {r.name: r for r in ACLRole.objects.filter(application__name=application, name__in=names)}
+            missing = [name for name in names if name not in roles]
+            if missing:
+                raise CommandError(f"Unknown role(s) in '{application}': {', '.join(missing)}")
+            try:
+                role_hierarchy.set_parents(roles[options["role"]], [roles[name] for name in options["parent"]])
+            except role_hierarchy.RoleHierarchyError as exc:
+                raise CommandError(str(exc))
+            parents = ", ".join(options["parent"]) or "none"
+            self.stdout.write(self.style.SUCCESS(f"{options['role']} now inherits from: {parents}"))
+
+        if options["rebuild"]:
+            started = time.perf_counter()
+            changed = role_hierarchy.rebuild(application=application)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt role closure: {changed} rows changed in {elapsed:.2f}s"))
+
+        if options["check"]:
+            inconsistent = False
+            for report in role_hierarchy.check(application=application):
+                line = (
+                    f"[{report.application}] roles={report.roles} edges={report.edges} rows={report.rows} "
+                    f"missing={report.missing} extra={report.extra}"
+                )
+                if report.consistent:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    inconsistent = True
+                    self.stdout.write(self.style.WARNING(line))
+            if inconsistent:
+                raise CommandError("Role closure is inconsistent; run with --rebuild")
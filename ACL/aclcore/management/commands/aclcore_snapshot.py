@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aclcore.models import ACLApplication
+from aclcore.services.snapshot import PolicySnapshot, SnapshotError, snapshot_path, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write memory-mappable binary policy snapshots (one file per application)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--application", type=str, default=None, help="Application name (default: all)")
+        parser.add_argument("--output", type=str, default=None, help="Output path (single application only; default: ACLCORE_SNAPSHOT_DIR)")
+
+    def handle(self, *args, **options):
+        application = options.get("application")
+        output = options.get("output")
+        if output and not application:
+            raise CommandError("--output requires --application")
+
+        names = [application] if application else list(ACLApplication.objects.order_by("name").values_list("name", flat=True))
+        for name in names:
+            path = output or snapshot_path(name)
+            if path is None:
+                raise CommandError("Set ACLCORE_SNAPSHOT_DIR or pass --output")
+            started = time.perf_counter()
+            try:
+                size = write_snapshot(name, path)
+                snap = PolicySnapshot(path)
+            except SnapshotError as exc:
+                raise CommandError(str(exc)) from exc
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"[{name}] {path}: {size} bytes, routes={snap.n_routes} roles={snap.n_roles} "
+                    f"users={snap.n_users} version={snap.policy_version} ({elapsed:.2f}s)"
+                )
+            )
+            snap.close()
@@ -1,37 +1,55 @@
 from __future__ import annotations
 
-from django.core.management.base import BaseCommand
-from django.urls import get_resolver, URLPattern, URLResolver
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import get_resolver
 
+from aclcore.models import ACLApplication
 from aclcore.services import RouteRegistryService
+from aclcore.services.route_registry import iter_url_routes, routes_digest
 
 
 class Command(BaseCommand):
-    help = "Scan URLConf and register/update routes into ACL core"
+    help = (
+        "Scan URLConf and register/update routes into ACL core. Routes are stored as templates "
+        "(/api/users/{pk}/); requests are matched by exact normalized path, so parameterised routes "
+        "only match when ACLCORE_ROUTE_NORMALIZER maps request paths onto these templates"
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("--application", type=str, default=None, help="Application name (optional)")
+        parser.add_argument("--application", type=str, default=None, help="Application name (default: ACLCORE_DEFAULT_APPLICATION)")
         parser.add_argument("--dry-run", action="store_true", help="Preview without saving")
+        parser.add_argument("--force", action="store_true", help="Sync even if the URLConf digest is unchanged")
+        parser.add_argument("--keep-missing", action="store_true", help="Do not deactivate routes missing from the URLConf")
 
     def handle(self, *args, **options):
-        application = options.get("application")
+        application = options.get("application") or getattr(settings, "ACLCORE_DEFAULT_APPLICATION", None)
+        if not application:
+            raise CommandError("--application is required when ACLCORE_DEFAULT_APPLICATION is not set")
         dry_run = options.get("dry_run", False)
-        registry = RouteRegistryService()
-
-        def iter_patterns(urlpatterns, prefix=""):
-            for p in urlpatterns:
-                if isinstance(p, URLPattern):
-                    yield prefix + str(p.pattern)
-                elif isinstance(p, URLResolver):
-                    yield from iter_patterns(p.url_patterns, prefix + str(p.pattern))
-
-        count = 0
-        for path in iter_patterns(get_resolver().url_patterns):
-            # naive: assume GET allowed for registration baseline
-            if not dry_run:
-                registry.register(path=path, method="GET", application=application, is_sensitive=False, is_ignored=False)
-            count += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Discovered {count} URL patterns{' (dry-run)' if dry_run else ''}"))
-
 
+        # Bypassed prefixes (admin, static, ...) are never evaluated, so never registered
+        bypass = tuple(p for p in getattr(settings, "ACLCORE_BYPASS_PREFIXES", []) if p)
+        routes = sorted({(path, method) for path, method in iter_url_routes(get_resolver().url_patterns) if not path.startswith(bypass)})
+
+        digest = routes_digest(application, routes)
+        stored = ACLApplication.objects.filter(name=application).values_list("routes_digest", flat=True).first()
+        if not options.get("force") and not dry_run and stored == digest:
+            self.stdout.write(self.style.SUCCESS(f"URLConf unchanged ({len(routes)} routes); nothing to sync"))
+            return
+
+        result = RouteRegistryService().sync(
+            routes,
+            application=application,
+            deactivate_missing=not options.get("keep_missing"),
+            dry_run=dry_run,
+        )
+        if not dry_run:
+            ACLApplication.objects.filter(name=application).update(routes_digest=digest)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Discovered {len(routes)} routes: created={result.created} updated={result.updated} "
+                f"deactivated={result.deactivated} unchanged={result.unchanged}{' (dry-run)' if dry_run else ''}"
+            )
+        )
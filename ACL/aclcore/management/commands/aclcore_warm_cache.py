@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aclcore.services import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute decisions and staff route lists for the hottest users/routes (after a deploy or a cache "
+        "restart). Keys already in the cache are skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            choices=warmup.SOURCES,
+            default="auto",
+            help="Hot keys from the saved top-K file, the access log, or the file with access-log fallback (auto)",
+        )
+        parser.add_argument("--application", type=str, default=None, help="Only keys of this application")
+        parser.add_argument("--limit", type=int, default=None, help="Number of hot keys (default: ACLCORE_WARMUP_TOP_K)")
+        parser.add_argument("--hours", type=float, default=None, help="Access-log lookback (default: ACLCORE_WARMUP_LOOKBACK_HOURS)")
+        parser.add_argument("--workers", type=int, default=None, help="Worker threads (default: ACLCORE_WARMUP_WORKERS)")
+        parser.add_argument("--batch-size", type=int, default=200, help="Keys per get_many/set_many round trip")
+        parser.add_argument(
+            "--max-per-second",
+            type=float,
+            default=None,
+            help="Entries computed per second across workers (default: ACLCORE_WARMUP_MAX_PER_SECOND; 0 = unlimited)",
+        )
+        parser.add_argument("--no-decisions", action="store_true", help="Skip decisions")
+        parser.add_argument("--no-routes", action="store_true", help="Skip staff route lists")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the hot keys")
+
+    def handle(self, *args, **options):
+        try:
+            keys = warmup.load_hot_keys(
+                options["source"], limit=options["limit"], hours=options["hours"], application=options["application"]
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["dry_run"]:
+            for key in keys:
+                self.stdout.write(f"{key.hits:>8}  {key.application or '-'}  {key.user_id}  {key.method} {key.normalized_path}")
+            self.stdout.write(self.style.WARNING(f"[dry-run] {len(keys)} hot keys"))
+            return
+        if not keys:
+            self.stdout.write("No hot keys found")
+            return
+
+        result = warmup.warm(
+            keys,
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            max_per_second=options["max_per_second"],
+            decisions=not options["no_decisions"],
+            routes=not options["no_routes"],
+        )
+        if result.skipped_reason:
+            raise CommandError(f"Warm-up skipped: {result.skipped_reason}")
+        self.stdout.write(
+            f"{result.keys} hot keys: cached {result.decisions} decisions and {result.route_lists} route lists, "
+            f"{result.already_cached} already cached, {result.errors} errors in {result.seconds:.1f}s"
+        )
+        self.stdout.write(self.style.SUCCESS("Done"))
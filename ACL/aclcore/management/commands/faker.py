@@ -1,103 +1,329 @@
 from __future__ import annotations
 
+import bisect
 import random
-from typing import List
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import accumulate
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
 
 from aclcore.models import (
+    ACLAccessLog,
     ACLApplication,
+    ACLEffectivePermission,
+    ACLPermission,
     ACLRoute,
     ACLRole,
+    ACLRoleClosure,
+    ACLRoleParent,
     ACLRoleRoutePermission,
     ACLUserRole,
 )
-from aclcore.services import RouteRegistryService, RoleService
+from aclcore.services import default_normalize_path, role_hierarchy
+
+
+RESOURCES = [
+    "users", "orders", "invoices", "products", "carts", "payments", "reports", "teams",
+    "projects", "tickets", "comments", "files", "settings", "roles", "audits", "events",
+    "messages", "devices", "sessions", "webhooks", "tokens", "plans", "coupons", "stores",
+]
+TEMPLATES = [
+    "/api/{app}/{resource}/",
+    "/api/{app}/{resource}/{{id}}/",
+    "/api/{app}/{resource}/{{id}}/history/",
+    "/api/{app}/{resource}/{{id}}/export/",
+]
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+
+@dataclass
+class SeedOptions:
+    app_name: str
+    seed: int
+    routes: int
+    roles: int
+    users: int
+    allow_rate: float
+    binding_density: float
+    max_roles_per_user: int
+    zipf_s: float
+    super_roles: int
+    default_roles: int
+    super_user_rate: float
+    batch_size: int
+    templates: Tuple[str, ...] = tuple(TEMPLATES)
+
+
+# fixed so that the same seed gives the same ids
+_UUID7_EPOCH_MS = 1_700_000_000_000
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+class _TimeOrderedIds:
+    """
+    UUIDv7s for the time-ordered tables (bindings, user roles), laid out like
+    ``base.models.uuid7`` but with the counter and random bits taken from the
+    seeded RNG: increasing in generation order and reproducible.
+    """
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.sequence = 0
+
+    def __call__(self) -> uuid.UUID:
+        ms, counter = divmod(self.sequence, 0x1000)
+        self.sequence += 1
+        rand_b = self.rng.getrandbits(62)
+        return uuid.UUID(int=(_UUID7_EPOCH_MS + ms) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b)
+
+
+def _zipf_cdf(n: int, s: float) -> List[float]:
+    weights = [1.0 / (k ** s) for k in range(1, n + 1)]
+    total = sum(weights)
+    return [w / total for w in accumulate(weights)]
+
+
+def _draw(rng: random.Random, cdf: List[float]) -> int:
+    return min(bisect.bisect_left(cdf, rng.random()), len(cdf) - 1)
+
+
+class _Writer:
+    """Buffer model instances and flush them with bulk_create in large batches."""
+
+    def __init__(self, model, batch_size: int) -> None:
+        self.model = model
+        self.batch_size = batch_size
+        self.pending: List = []
+        self.written = 0
+
+    def add(self, obj) -> None:
+        self.pending.append(obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            with transaction.atomic():
+                self.model.objects.bulk_create(self.pending, batch_size=self.batch_size)
+            self.written += len(self.pending)
+            self.pending = []
+
+
+def seed_application(opts: SeedOptions) -> Dict[str, float]:
+    """
+    Generate one application's policy from ``opts.seed``; same seed, same data.
+    """
+    started = time.perf_counter()
+    rng = random.Random(opts.seed)
+    time_ordered_id = _TimeOrderedIds(rng)
+    app = ACLApplication.objects.create(id=_uuid(rng), name=opts.app_name)
+
+    routes: List[ACLRoute] = []
+    for i in range(opts.routes):
+        resource = RESOURCES[i % len(RESOURCES)] + (str(i // len(RESOURCES)) if i >= len(RESOURCES) else "")
+        path = rng.choice(opts.templates).format(app=opts.app_name, resource=resource)
+        routes.append(
+            ACLRoute(
+                id=_uuid(rng),
+                application=app,
+                path=path,
+                method=rng.choice(METHODS),
+                normalized_path=default_normalize_path(path),
+                is_active=True,
+            )
+        )
+    route_writer = _Writer(ACLRoute, opts.batch_size)
+    for route in routes:
+        route_writer.add(route)
+    route_writer.flush()
+
+    roles: List[ACLRole] = []
+    for r in range(opts.roles):
+        roles.append(ACLRole(id=_uuid(rng), application=app, name=f"{opts.app_name.upper()}_ROLE_{r + 1}"))
+    for r in range(opts.super_roles):
+        roles.append(ACLRole(id=_uuid(rng), application=app, name=f"ADMIN_{r + 1}" if r else "ADMIN", is_super_role=True))
+    default_roles = [
+        ACLRole(id=_uuid(rng), application=app, name=f"VIEWER_{r + 1}" if r else "VIEWER", is_default=True)
+        for r in range(opts.default_roles)
+    ]
+    roles.extend(default_roles)
+    ACLRole.objects.bulk_create(roles, batch_size=opts.batch_size)
+    role_hierarchy.add_roles(role.pk for role in roles)
+
+    binding_writer = _Writer(ACLRoleRoutePermission, opts.batch_size)
+    for role in roles:
+        if role.is_super_role:
+            bound = routes
+        elif opts.binding_density >= 1.0:
+            bound = routes
+        else:
+            k = max(1, int(len(routes) * opts.binding_density))
+            bound = rng.sample(routes, k=min(k, len(routes)))
+        for route in bound:
+            allow = True if role.is_super_role else rng.random() < opts.allow_rate
+            binding_writer.add(ACLRoleRoutePermission(id=time_ordered_id(), role=role, route=route, is_allowed=allow))
+    binding_writer.flush()
+
+    # role popularity and roles-per-user are both Zipf-distributed
+    regular = [role for role in roles if not role.is_super_role and not role.is_default]
+    popularity_cdf = _zipf_cdf(len(regular), opts.zipf_s) if regular else []
+    per_user_cdf = _zipf_cdf(max(1, opts.max_roles_per_user), opts.zipf_s)
+    super_roles = [role for role in roles if role.is_super_role]
+
+    assignment_writer = _Writer(ACLUserRole, opts.batch_size)
+    for _ in range(opts.users):
+        user_id = f"user-{_uuid(rng)}"
+        chosen: Dict[object, ACLRole] = {}
+        if regular:
+            wanted = min(_draw(rng, per_user_cdf) + 1, len(regular))
+            while len(chosen) < wanted:
+                role = regular[_draw(rng, popularity_cdf)]
+                chosen[role.pk] = role
+        for role in default_roles:
+            chosen[role.pk] = role
+        if super_roles and rng.random() < opts.super_user_rate:
+            role = rng.choice(super_roles)
+            chosen[role.pk] = role
+        for role in chosen.values():
+            assignment_writer.add(ACLUserRole(id=time_ordered_id(), user_id=user_id, application=app, role=role))
+    assignment_writer.flush()
+
+    return {
+        "routes": route_writer.written,
+        "roles": len(roles),
+        "bindings": binding_writer.written,
+        "assignments": assignment_writer.written,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def purge_applications(names: List[str]) -> None:
+    """
+    Remove previously seeded applications with set-based deletes, child tables
+    first. A cascading ``.delete()`` would load and signal every row.
+    """
+    app_ids = list(ACLApplication.objects.filter(name__in=names).values_list("id", flat=True))
+    if not app_ids:
+        return
+    with transaction.atomic():
+        ACLAccessLog.objects.filter(route__application_id__in=app_ids).update(route=None)
+        querysets = [
+            ACLEffectivePermission.objects.filter(application_id__in=app_ids),
+            ACLUserRole.objects.filter(application_id__in=app_ids),
+            ACLRoleRoutePermission.objects.filter(role__application_id__in=app_ids),
+            ACLRoleClosure.objects.filter(descendant__application_id__in=app_ids),
+            ACLRoleParent.objects.filter(role__application_id__in=app_ids),
+            ACLRole.objects.filter(application_id__in=app_ids),
+            ACLRoute.objects.filter(application_id__in=app_ids),
+            ACLPermission.objects.filter(application_id__in=app_ids),
+            ACLApplication.objects.filter(id__in=app_ids),
+        ]
+        for qs in querysets:
+            qs._raw_delete(qs.db)
+
+
+def _seed_in_child(opts: SeedOptions) -> Tuple[str, Dict[str, float]]:
+    try:
+        return opts.app_name, seed_application(opts)
+    finally:
+        connections.close_all()
 
 
 class Command(BaseCommand):
-    help = "Seed ACLCore with fake data (applications, routes, roles, permissions, user roles). Requires 'Faker' package."
+    help = "Seed ACLCore with deterministic fake data in bulk (applications, routes, roles, permissions, user roles)"
 
     def add_arguments(self, parser):
         parser.add_argument("--applications", type=int, default=1, help="Number of applications to create")
         parser.add_argument("--routes", type=int, default=15, help="Routes per application")
         parser.add_argument("--users", type=int, default=10, help="Number of fake users per application")
-        parser.add_argument("--roles", type=int, default=2, help="Number of roles per application")
-        parser.add_argument("--allow-rate", type=float, default=0.6, help="Probability of allow per (role,route) binding")
+        parser.add_argument("--roles", type=int, default=2, help="Number of regular roles per application")
+        parser.add_argument("--allow-rate", type=float, default=0.6, help="Probability of allow per (role,route) binding; the rest are denies")
+        parser.add_argument("--binding-density", type=float, default=1.0, help="Fraction of routes each regular role is bound to")
+        parser.add_argument("--max-roles-per-user", type=int, default=2, help="Upper bound of the Zipf roles-per-user distribution")
+        parser.add_argument("--zipf-s", type=float, default=1.2, help="Zipf exponent for role popularity and roles per user")
+        parser.add_argument("--super-roles", type=int, default=1, help="Super roles per application (allow every route)")
+        parser.add_argument("--default-roles", type=int, default=1, help="Default roles assigned to every user")
+        parser.add_argument("--super-user-rate", type=float, default=0.01, help="Probability a user also holds a super role")
         parser.add_argument("--app-prefix", type=str, default="app", help="Application name prefix")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; identical seeds generate identical data")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument("--processes", type=int, default=1, help="Seed applications in parallel processes")
+        parser.add_argument("--replace", action="store_true", help="Delete existing applications with the same names first")
+        parser.add_argument(
+            "--route-template",
+            action="append",
+            dest="route_templates",
+            help="Route path template, repeatable; {app} and {resource} are filled in, write path parameters as "
+            "{{id}} (default: the built-in REST-style templates)",
+        )
 
     def handle(self, *args, **options):
-        try:
-            from faker import Faker
-        except Exception as exc:
-            self.stderr.write(self.style.ERROR("Faker is not installed. Install with: pip install Faker"))
-            raise SystemExit(1) from exc
+        app_prefix = str(options["app_prefix"]).strip() or "app"
+        num_apps = int(options["applications"])
+        names = [f"{app_prefix}{i + 1}" for i in range(num_apps)]
 
-        fake = Faker()
-        Faker.seed(42)
-        random.seed(42)
+        templates = tuple(options.get("route_templates") or TEMPLATES)
+        for template in templates:
+            # {resource} keeps every generated (path, method) unique
+            if "{resource}" not in template:
+                raise CommandError(f"Route template {template!r} must contain {{resource}}")
+            try:
+                template.format(app="app", resource="resource")
+            except (KeyError, IndexError, ValueError) as exc:
+                raise CommandError(f"Invalid route template {template!r}: {exc}") from exc
 
-        num_apps = int(options["applications"])
-        routes_per_app = int(options["routes"])
-        users_per_app = int(options["users"])
-        roles_per_app = max(1, int(options["roles"]))
-        allow_rate = float(options["allow_rate"])
-        app_prefix = str(options["app_prefix"]).strip() or "app"
+        existing = list(ACLApplication.objects.filter(name__in=names).values_list("name", flat=True))
+        if existing:
+            if not options["replace"]:
+                raise CommandError(f"Applications already exist: {', '.join(sorted(existing))} (use --replace)")
+            purge_applications(existing)
+
+        jobs = [
+            SeedOptions(
+                app_name=name,
+                seed=int(options["seed"]) + i,
+                routes=int(options["routes"]),
+                roles=max(0, int(options["roles"])),
+                users=int(options["users"]),
+                allow_rate=float(options["allow_rate"]),
+                binding_density=float(options["binding_density"]),
+                max_roles_per_user=max(1, int(options["max_roles_per_user"])),
+                zipf_s=float(options["zipf_s"]),
+                super_roles=max(0, int(options["super_roles"])),
+                default_roles=max(0, int(options["default_roles"])),
+                super_user_rate=float(options["super_user_rate"]),
+                batch_size=max(1, int(options["batch_size"])),
+                templates=templates,
+            )
+            for i, name in enumerate(names)
+        ]
 
-        registry = RouteRegistryService()
-        rolesvc = RoleService()
-
-        created_apps: List[ACLApplication] = []
-        for i in range(num_apps):
-            app_name = f"{app_prefix}{i+1}"
-            app, _ = ACLApplication.objects.get_or_create(name=app_name)
-            created_apps.append(app)
-            self.stdout.write(self.style.SUCCESS(f"[+] Application: {app_name}"))
-
-            # create routes
-            methods = ["GET", "POST", "PUT", "DELETE"]
-            created_routes: List[ACLRoute] = []
-            for _ in range(routes_per_app):
-                path = f"/api/{app_name}/{fake.word().lower()}/"
-                method = random.choice(methods)
-                route = registry.register(path=path, method=method, application=app_name, is_sensitive=False, is_ignored=False)
-                created_routes.append(route)
-            self.stdout.write(f"    Routes created: {len(created_routes)}")
-
-            # roles
-            created_roles: List[ACLRole] = []
-            for r in range(roles_per_app):
-                role_code = f"{app_name.upper()}_ROLE_{r+1}"
-                role = rolesvc.ensure_role(role_code, application=app_name, is_super_role=(r == 0 and roles_per_app == 1))
-                created_roles.append(role)
-            # always include ADMIN and VIEWER convenience roles
-            created_roles.append(rolesvc.ensure_role("ADMIN", application=app_name, is_super_role=True))
-            created_roles.append(rolesvc.ensure_role("VIEWER", application=app_name, is_super_role=False))
-            self.stdout.write(f"    Roles created: {len(created_roles)}")
-
-            # role-route bindings (random allow/deny)
-            bindings = 0
-            for role in created_roles:
-                for route in created_routes:
-                    allow = random.random() < allow_rate
-                    ACLRoleRoutePermission.objects.update_or_create(
-                        role=role,
-                        route=route,
-                        defaults={"is_allowed": allow},
-                    )
-                    bindings += 1
-            self.stdout.write(f"    Role-route bindings: {bindings}")
-
-            # assign roles to users
-            assigned = 0
-            for _ in range(users_per_app):
-                user_id = f"user-{fake.uuid4()}"
-                # each user gets 1-2 roles
-                for role in random.sample(created_roles, k=min(len(created_roles), random.choice([1, 2]))):
-                    ACLUserRole.objects.get_or_create(user_id=user_id, application=app, role=role)
-                    assigned += 1
-            self.stdout.write(f"    User-role assignments: {assigned}")
-
-        self.stdout.write(self.style.SUCCESS("Seeding complete."))
+        started = time.perf_counter()
+        processes = max(1, int(options["processes"]))
+        if processes > 1 and len(jobs) > 1:
+            # children must not inherit the parent's open connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("fork")) as pool:
+                results = list(pool.map(_seed_in_child, jobs))
+        else:
+            results = [(job.app_name, seed_application(job)) for job in jobs]
 
+        for name, stats in results:
+            self.stdout.write(self.style.SUCCESS(f"[+] Application: {name} ({stats['seconds']:.1f}s)"))
+            self.stdout.write(f"    Routes created: {stats['routes']}")
+            self.stdout.write(f"    Roles created: {stats['roles']}")
+            self.stdout.write(f"    Role-route bindings: {stats['bindings']}")
+            self.stdout.write(f"    User-role assignments: {stats['assignments']}")
 
+        elapsed = time.perf_counter() - started
+        total = sum(stats["routes"] + stats["roles"] + stats["bindings"] + stats["assignments"] for _n, stats in results)
+        self.stdout.write(self.style.SUCCESS(f"Seeding complete: {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)"))
@@ -1,70 +1,111 @@
 from __future__ import annotations
 
-from typing import Iterable, Optional
+import json
+import logging
+from typing import Dict, Tuple
 
-from django.http import JsonResponse, HttpRequest
-from django.utils.deprecation import MiddlewareMixin
+from django.http import HttpRequest, HttpResponse
 from django.conf import settings
 
-from aclcore.services import EvaluationService, default_normalize_path
+from aclcore.services import EvaluationService, default_normalize_path, profiler
 from .signals import access_checked
 
 
+logger = logging.getLogger(__name__)
+
+_REASONS = ("route-not-registered", "no-roles", "explicit-deny", "no-matching-rule", "cache-hit", "degraded")
+_MISSING_USER_BODY = json.dumps({"detail": "missing user id"}).encode()
+
+
 def _get_setting(name: str, default):
     return getattr(settings, name, default)
 
 
-class HttpAclMiddleware(MiddlewareMixin):
+def _deny_body(reason: str) -> bytes:
+    return json.dumps({"detail": "forbidden", "reason": reason}).encode()
+
+
+class HttpAclMiddleware:
     """
     Lightweight ACL middleware:
     - Extract application name and user_id via configurable sources
     - Normalize path
     - Enforce allow/deny with cache
+
+    Everything that does not depend on the request (bypass prefixes, deny
+    bodies, whether anyone listens to ``access_checked``) is settled once
+    in ``__init__`` so an allowed cache hit only does the lookup.
     """
 
-    def __init__(self, get_response=None):
-        super().__init__(get_response)
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
         self.eval = EvaluationService()
         self.normalize = _get_setting("ACLCORE_ROUTE_NORMALIZER", default_normalize_path)
         self.default_app = _get_setting("ACLCORE_DEFAULT_APPLICATION", None)
-        self.bypass_prefixes: Iterable[str] = _get_setting("ACLCORE_BYPASS_PREFIXES", ["/health", "/static", "/media"])
+        # str.startswith(tuple) checks every prefix in a single C call
+        self.bypass_prefixes: Tuple[str, ...] = tuple(
+            p for p in _get_setting("ACLCORE_BYPASS_PREFIXES", ["/health", "/static", "/media"]) if p
+        )
         self.user_id_header: str = _get_setting("ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")
         self.app_header: str = _get_setting("ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")
         self.log_sampling: float = float(_get_setting("ACLCORE_LOG_SAMPLING_RATE", 1.0))
+        self.profile_rate: float = profiler.sample_rate()
+        self._deny_bodies: Dict[str, bytes] = {reason: _deny_body(reason) for reason in _REASONS}
+
+    def __call__(self, request: HttpRequest):
+        if self.profile_rate and profiler.should_sample(self.profile_rate):
+            with profiler.RequestProfile("http", request.method, request.path):
+                response = self._check(request)
+        else:
+            response = self._check(request)
+        return response or self.get_response(request)
+
+    def _json(self, body: bytes, status: int) -> HttpResponse:
+        return HttpResponse(body, status=status, content_type="application/json")
 
-    def process_request(self, request: HttpRequest):
+    def _check(self, request: HttpRequest):
         path = request.path or "/"
-        for pfx in self.bypass_prefixes:
-            if pfx and path.startswith(pfx):
-                return None
+        if self.bypass_prefixes and path.startswith(self.bypass_prefixes):
+            return None
 
-        user_id = request.META.get(self.user_id_header)
+        meta = request.META
+        user_id = meta.get(self.user_id_header)
         if not user_id:
-            return JsonResponse({"detail": "missing user id"}, status=401)
+            return self._json(_MISSING_USER_BODY, 401)
 
-        application = request.META.get(self.app_header) or self.default_app
-        method = request.method.upper()
+        application = meta.get(self.app_header) or self.default_app
+        method = request.method
 
-        result = self.eval.evaluate(user_id=user_id, method=method, path=path, application=application)
-
-        # signal for observability (sampling internal)
         try:
-            access_checked.send(
-                sender=self.__class__,
-                allowed=result.allowed,
-                reason=result.reason,
-                user_id=user_id,
-                application=application,
-                method=method,
-                path=path,
-                matched_route_id=result.matched_route_id,
-                sampling_rate=self.log_sampling,
-            )
+            result = self.eval.evaluate(user_id=user_id, method=method, path=path, application=application)
         except Exception:
-            pass
+            # e.g. the database is down as well; answer by the degraded policy instead of a 500
+            logger.exception("ACL evaluation failed for %s %s", method, path)
+            result = self.eval.degraded()
+
+        # signal for observability (sampling internal); skipped when nobody listens
+        if access_checked.receivers:
+            try:
+                access_checked.send(
+                    sender=self.__class__,
+                    allowed=result.allowed,
+                    reason=result.reason,
+                    user_id=user_id,
+                    application=application,
+                    method=method,
+                    path=path,
+                    matched_route_id=result.matched_route_id,
+                    sampling_rate=self.log_sampling,
+                )
+            except Exception:
+                pass
 
         if not result.allowed:
-            return JsonResponse({"detail": "forbidden", "reason": result.reason}, status=403)
+            body = self._deny_bodies.get(result.reason)
+            if body is None:
+                body = self._deny_bodies[result.reason] = _deny_body(result.reason)
+            return self._json(body, 403)
         return None
-
-
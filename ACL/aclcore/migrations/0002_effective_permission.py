@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:26
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ACLEffectivePermission',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user_id', models.CharField(max_length=100)),
+                ('method', models.CharField(max_length=16)),
+                ('normalized_path', models.CharField(max_length=320)),
+                ('is_allowed', models.BooleanField(default=False)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to='aclcore.aclapplication')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to='aclcore.aclroute')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['application', 'user_id', 'normalized_path', 'method'], name='aclcore_acl_applica_b3b273_idx')],
+                'unique_together': {('application', 'user_id', 'route')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:59
+
+import base.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0002_effective_permission'),
+    ]
+
+    # Python-side default only: no schema change, so skip the table rebuilds
+    # some backends (SQLite) would otherwise do for an AlterField on the pk
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='aclaccesslog',
+                    name='id',
+                    field=models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='aclcacheentry',
+                    name='id',
+                    field=models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='acleffectivepermission',
+                    name='id',
+                    field=models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='aclroleroutepermission',
+                    name='id',
+                    field=models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='acluserrole',
+                    name='id',
+                    field=models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+                ),
+            ],
+        ),
+    ]
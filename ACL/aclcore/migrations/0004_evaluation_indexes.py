@@ -0,0 +1,91 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0003_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='aclrole',
+            name='aclcore_acl_applica_088414_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='aclroleroutepermission',
+            name='aclcore_acl_role_id_d97374_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='aclroute',
+            name='aclcore_acl_applica_34bdf3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='aclroute',
+            name='aclcore_acl_applica_3f7ee8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='acluserrole',
+            name='aclcore_acl_user_id_d08b0c_idx',
+        ),
+        migrations.AlterField(
+            model_name='acleffectivepermission',
+            name='application',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to='aclcore.aclapplication'),
+        ),
+        migrations.AlterField(
+            model_name='aclrole',
+            name='application',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='roles', to='aclcore.aclapplication'),
+        ),
+        migrations.AlterField(
+            model_name='aclroleroutepermission',
+            name='role',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='route_permissions', to='aclcore.aclrole'),
+        ),
+        migrations.AlterField(
+            model_name='aclroleroutepermission',
+            name='route',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='role_permissions', to='aclcore.aclroute'),
+        ),
+        migrations.AlterField(
+            model_name='aclroute',
+            name='application',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='routes', to='aclcore.aclapplication'),
+        ),
+        migrations.AlterField(
+            model_name='aclroute',
+            name='method',
+            field=models.CharField(max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='aclroute',
+            name='normalized_path',
+            field=models.CharField(blank=True, max_length=320, null=True),
+        ),
+        migrations.AlterField(
+            model_name='aclroute',
+            name='path',
+            field=models.CharField(max_length=300),
+        ),
+        migrations.AlterField(
+            model_name='acluserrole',
+            name='user_id',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='aclroleroutepermission',
+            index=models.Index(fields=['route', 'role', 'is_allowed'], name='aclcore_rrp_route_lookup'),
+        ),
+        migrations.AddIndex(
+            model_name='aclroleroutepermission',
+            index=models.Index(condition=models.Q(('is_allowed', False)), fields=['role', 'route', 'is_allowed'], name='aclcore_rrp_role_denies'),
+        ),
+        migrations.AddIndex(
+            model_name='aclroute',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['application', 'normalized_path', 'method', 'is_active', 'is_ignored', 'id'], name='aclcore_route_active_lookup'),
+        ),
+    ]
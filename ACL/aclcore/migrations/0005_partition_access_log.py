@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+
+from django.db import migrations
+
+TABLE = "aclcore_aclaccesslog"
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _midnight(day):
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def _set_aside(cursor, legacy):
+    """Rename the table to ``legacy``; returns its secondary indexes and foreign keys, dropped first."""
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+        "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+        [TABLE, TABLE],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+
+    # names move with the old table, so free them before recreating
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    for name, _ in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DROP CONSTRAINT "{name}"')
+    cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+    return indexes, foreign_keys
+
+
+def partition_access_log(apps, schema_editor):
+    """
+    Rebuild the access log as a table range-partitioned on timestamp (PostgreSQL only).
+
+    Copies existing rows in one statement; run it in a maintenance window on
+    large tables. Later partitions come from ``aclcore_access_log --ensure``.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    cursor = schema_editor.connection.cursor()
+    if _is_partitioned(cursor):
+        return
+
+    legacy = f"{TABLE}_legacy"
+    indexes, foreign_keys = _set_aside(cursor, legacy)
+
+    # the partition key must be part of the primary key; ids stay unique as uuid7
+    cursor.execute(
+        f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE ("timestamp")'
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey_ts" PRIMARY KEY ("id", "timestamp")')
+    cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+    cursor.execute(f'SELECT min("timestamp"), max("timestamp") FROM "{legacy}"')
+    oldest, newest = cursor.fetchone()
+    today = datetime.now(timezone.utc).date()
+    start = (oldest.date() if oldest else today).replace(day=1)
+    last = max(newest.date() if newest else today, today)
+    while start <= last:
+        end = _next_month(start)
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}_p{start:%Y%m%d}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+            [_midnight(start), _midnight(end)],
+        )
+        start = end
+
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+    cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+    cursor.execute(f'DROP TABLE "{legacy}"')
+
+
+def unpartition_access_log(apps, schema_editor):
+    """
+    Reverse: copy the rows back into a plain table keyed on ``id`` with the
+    same secondary indexes and foreign keys, then drop the partitions.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    cursor = schema_editor.connection.cursor()
+    if not _is_partitioned(cursor):
+        return
+
+    partitioned = f"{TABLE}_partitioned"
+    # partitioned indexes are dropped with their per-partition children
+    indexes, foreign_keys = _set_aside(cursor, partitioned)
+    cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{partitioned}" INCLUDING DEFAULTS INCLUDING STORAGE)')
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id")')
+    for _, definition in indexes:
+        cursor.execute(definition.replace(" ONLY ", " "))
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+    cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{partitioned}"')
+    cursor.execute(f'DROP TABLE "{partitioned}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0004_evaluation_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_access_log, unpartition_access_log),
+    ]
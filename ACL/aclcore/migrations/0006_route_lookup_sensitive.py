@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0005_partition_access_log'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='aclroute',
+            name='aclcore_route_active_lookup',
+        ),
+        migrations.AddIndex(
+            model_name='aclroute',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['application', 'normalized_path', 'method', 'is_active', 'is_ignored', 'is_sensitive', 'id'], name='aclcore_route_active_lookup'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:28
+
+import base.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_self_rows(apps, schema_editor):
+    # every role is its own ancestor; existing roles have no parents yet
+    ACLRole = apps.get_model('aclcore', 'ACLRole')
+    ACLRoleClosure = apps.get_model('aclcore', 'ACLRoleClosure')
+    role_ids = ACLRole.objects.values_list('id', flat=True).iterator(chunk_size=5000)
+    batch = []
+    for role_id in role_ids:
+        batch.append(ACLRoleClosure(id=base.models.uuid7(), descendant_id=role_id, ancestor_id=role_id))
+        if len(batch) >= 5000:
+            ACLRoleClosure.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        ACLRoleClosure.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0006_route_lookup_sensitive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ACLRoleParent',
+            fields=[
+                ('id', models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='child_links', to='aclcore.aclrole')),
+                ('role', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='parent_links', to='aclcore.aclrole')),
+            ],
+            options={
+                'unique_together': {('role', 'parent')},
+            },
+        ),
+        migrations.AddField(
+            model_name='aclrole',
+            name='parents',
+            field=models.ManyToManyField(blank=True, related_name='children', through='aclcore.ACLRoleParent', to='aclcore.aclrole'),
+        ),
+        migrations.CreateModel(
+            name='ACLRoleClosure',
+            fields=[
+                ('id', models.UUIDField(default=base.models.uuid7, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_rows', to='aclcore.aclrole')),
+                ('descendant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_rows', to='aclcore.aclrole')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'descendant'], name='aclcore_closure_descendants')],
+                'unique_together': {('descendant', 'ancestor')},
+            },
+        ),
+        migrations.RunPython(add_self_rows, migrations.RunPython.noop),
+    ]
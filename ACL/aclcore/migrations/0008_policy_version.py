@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0007_role_hierarchy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aclapplication',
+            name='policy_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:50
+
+from django.db import migrations, models
+
+
+def drop_duplicates(apps, schema_editor):
+    # keep the entry that expires last for each (user, route)
+    ACLCacheEntry = apps.get_model('aclcore', 'ACLCacheEntry')
+    pairs = (
+        ACLCacheEntry.objects.values('user_id', 'route_hash')
+        .annotate(n=models.Count('id'))
+        .filter(n__gt=1)
+        .values_list('user_id', 'route_hash')
+    )
+    for user_id, route_hash in pairs.iterator():
+        ids = list(
+            ACLCacheEntry.objects.filter(user_id=user_id, route_hash=route_hash)
+            .order_by('-expires_at')
+            .values_list('id', flat=True)
+        )
+        ACLCacheEntry.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0008_policy_version'),
+    ]
+
+    operations = [
+        # dropped rows are only expired or superseded cache entries
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='aclcacheentry',
+            name='aclcore_acl_user_id_fd9b1d_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='aclcacheentry',
+            constraint=models.UniqueConstraint(fields=('user_id', 'route_hash'), name='aclcore_cacheentry_user_route'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0009_cache_entry_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aclapplication',
+            name='routes_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
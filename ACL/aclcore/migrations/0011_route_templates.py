@@ -0,0 +1,85 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:52
+
+import re
+
+from django.db import migrations
+from django.db.models import F
+
+
+# frozen copies of route_registry.pattern_to_template / default_normalize_path
+_NAMED_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+_UNNAMED_GROUP = re.compile(r"\([^)]*\)")
+_PATH_CONVERTER = re.compile(r"<(?:\w+:)?(\w+)>")
+
+
+def _template(pattern):
+    template = _NAMED_GROUP.sub(r"{\1}", pattern)
+    template = _UNNAMED_GROUP.sub("{arg}", template)
+    template = _PATH_CONVERTER.sub(r"{\1}", template)
+    template = template.replace("^", "").replace("$", "").replace("\\", "").replace("/?", "/")
+    return "/" + template.lstrip("/")
+
+
+def _normalize(path):
+    p = path.strip()
+    if p != "/" and p.endswith("/"):
+        p = p[:-1]
+    while "//" in p:
+        p = p.replace("//", "/")
+    return p or "/"
+
+
+def adopt_templates(apps, schema_editor):
+    """
+    aclcore_sync_routes used to store raw URLConf patterns (``api/users/<int:pk>/``,
+    ``^api/items/(?P<pk>[^/.]+)/$``, always GET); the template sync deactivates
+    those rows and their bindings are left on dead rows. Rename each such route
+    to its template, or, when the sync already created the template route, move
+    the bindings onto it (bindings already there win) and drop the old row.
+
+    This keeps bindings attached to the synced routes; it does not make them
+    match requests. Evaluation looks routes up by exact ``normalized_path``, so
+    a parameterised template (``/api/users/{pk}``) only matches once
+    ACLCORE_ROUTE_NORMALIZER maps request paths onto templates; parameter-free
+    routes match as before. Neither the old pattern rows nor the templates
+    matched real requests without that.
+
+    With ACLCORE_EFFECTIVE_PERMISSIONS on, run
+    ``aclcore_effective_permissions --rebuild`` afterwards.
+    """
+    ACLApplication = apps.get_model('aclcore', 'ACLApplication')
+    ACLRoute = apps.get_model('aclcore', 'ACLRoute')
+    ACLRoleRoutePermission = apps.get_model('aclcore', 'ACLRoleRoutePermission')
+
+    touched = set()
+    # templates and middleware-registered paths start with "/", URLConf patterns never do
+    legacy_ids = list(ACLRoute.objects.exclude(path__startswith='/').values_list('id', flat=True))
+    for route in ACLRoute.objects.filter(id__in=legacy_ids).iterator():
+        path = _template(route.path)
+        touched.add(route.application_id)
+        target = ACLRoute.objects.filter(application_id=route.application_id, path=path, method=route.method).first()
+        if target is None:
+            route.path = path
+            route.normalized_path = _normalize(path)
+            route.save(update_fields=['path', 'normalized_path'])
+            continue
+        bound = ACLRoleRoutePermission.objects.filter(route_id=target.pk).values_list('role_id', flat=True)
+        ACLRoleRoutePermission.objects.filter(route_id=route.pk).exclude(role_id__in=list(bound)).update(route_id=target.pk)
+        if route.is_active and not target.is_active:
+            target.is_active = True
+            target.save(update_fields=['is_active'])
+        route.delete()
+    # cached snapshots of these applications are stale now
+    ACLApplication.objects.filter(pk__in=touched).update(policy_version=F('policy_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0010_routes_digest'),
+    ]
+
+    operations = [
+        # renamed rows are valid templates; leaving them on the way back is harmless
+        migrations.RunPython(adopt_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-19 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aclcore', '0011_route_templates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aclaccesslog',
+            name='method',
+            field=models.CharField(max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='aclaccesslog',
+            name='user_id',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='aclcacheentry',
+            name='expires_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='aclcacheentry',
+            name='user_id',
+            field=models.CharField(max_length=100),
+        ),
+    ]
@@ -1,32 +1,81 @@
 from django.db import models
 from django.conf import settings
 
-from base.models import BaseIDModel, BaseModel, BaseActiveModel
+from base.models import BaseIDModel, BaseModel, BaseActiveModel, BaseTimeOrderedIDModel
 
 
 class ACLApplication(BaseIDModel, BaseModel):
     name = models.CharField(max_length=150, unique=True, db_index=True)
     description = models.TextField(null=True, blank=True)
+    # bumped on every policy change; see aclcore.services.policy_version
+    policy_version = models.PositiveBigIntegerField(default=0, editable=False)
+    # URLConf digest of the last aclcore_sync_routes run; unchanged URLConfs are skipped
+    routes_digest = models.CharField(max_length=64, blank=True, default="", editable=False)
 
     def __str__(self):
         return self.name
 
 
 class ACLRole(BaseIDModel, BaseModel):
-    application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="roles")
+    # (application, name) unique index serves application lookups
+    application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="roles", db_index=False)
     name = models.CharField(max_length=150, db_index=True)
     is_super_role = models.BooleanField(default=False)
     is_default = models.BooleanField(default=False)
     description = models.TextField(null=True, blank=True)
+    # a role inherits every binding of its parents (transitively); see aclcore.services.role_hierarchy
+    parents = models.ManyToManyField(
+        "self", through="ACLRoleParent", symmetrical=False, related_name="children", blank=True
+    )
 
     class Meta:
         unique_together = ("application", "name")
-        indexes = [models.Index(fields=["application", "name"])]
 
     def __str__(self):
         return f"{self.application}:{self.name}"
 
 
+class ACLRoleParent(BaseTimeOrderedIDModel, BaseModel):
+    # (role, parent) unique index serves the role FK
+    role = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="parent_links", db_index=False)
+    parent = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="child_links")
+
+    class Meta:
+        unique_together = ("role", "parent")
+
+    def __str__(self):
+        return f"{self.role} < {self.parent}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from aclcore.services.role_hierarchy import RoleHierarchyError, check_parent
+
+        if self.role_id and self.parent_id:
+            try:
+                check_parent(self.role_id, self.parent_id)
+            except RoleHierarchyError as exc:
+                raise ValidationError(str(exc))
+
+
+class ACLRoleClosure(BaseTimeOrderedIDModel, BaseModel):
+    """
+    Transitive closure of ``ACLRole.parents``: one row per (descendant,
+    ancestor) pair, including each role with itself, so a user's effective
+    roles are one indexed lookup. Maintained by aclcore.services.role_hierarchy.
+    """
+
+    descendant = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="ancestor_rows", db_index=False)
+    ancestor = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="descendant_rows", db_index=False)
+
+    class Meta:
+        # evaluation: ancestors of the user's roles, index-only
+        unique_together = ("descendant", "ancestor")
+        indexes = [
+            # invalidation: descendants of a changed role
+            models.Index(fields=["ancestor", "descendant"], name="aclcore_closure_descendants"),
+        ]
+
+
 class ACLPermission(BaseIDModel, BaseModel):
     application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="permissions")
     code = models.CharField(max_length=200, unique=True, db_index=True)
@@ -37,17 +86,22 @@ class ACLPermission(BaseIDModel, BaseModel):
 
 
 class ACLRoute(BaseIDModel, BaseModel, BaseActiveModel):
-    application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="routes")
-    path = models.CharField(max_length=300, db_index=True)
-    method = models.CharField(max_length=16, db_index=True)
-    normalized_path = models.CharField(max_length=320, db_index=True, null=True, blank=True)
+    application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="routes", db_index=False)
+    path = models.CharField(max_length=300)
+    method = models.CharField(max_length=16)
+    normalized_path = models.CharField(max_length=320, null=True, blank=True)
     is_sensitive = models.BooleanField(default=False)
     is_ignored = models.BooleanField(default=False)
 
     class Meta:
         indexes = [
-            models.Index(fields=["application", "method"]),
-            models.Index(fields=["application", "normalized_path"]),
+            # EvaluationService route lookup. Every selected/filtered column is a key
+            # column so the lookup is index-only on SQLite too (INCLUDE is PostgreSQL-only)
+            models.Index(
+                fields=["application", "normalized_path", "method", "is_active", "is_ignored", "is_sensitive", "id"],
+                condition=models.Q(is_active=True),
+                name="aclcore_route_active_lookup",
+            ),
         ]
         unique_together = ("application", "path", "method")
 
@@ -55,46 +109,83 @@ class ACLRoute(BaseIDModel, BaseModel, BaseActiveModel):
         return f"{self.application}:{self.method} {self.path}"
 
 
-class ACLRoleRoutePermission(BaseIDModel, BaseModel):
-    role = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="route_permissions")
-    route = models.ForeignKey(ACLRoute, on_delete=models.CASCADE, related_name="role_permissions")
+class ACLRoleRoutePermission(BaseTimeOrderedIDModel, BaseModel):
+    # both FKs are leading columns of the indexes below
+    role = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="route_permissions", db_index=False)
+    route = models.ForeignKey(ACLRoute, on_delete=models.CASCADE, related_name="role_permissions", db_index=False)
     is_allowed = models.BooleanField(default=True)
     conditions = models.JSONField(null=True, blank=True)
 
     class Meta:
         unique_together = ("role", "route")
-        indexes = [models.Index(fields=["role", "route"])]
+        indexes = [
+            # evaluation: rule states for one route and the user's roles; also the route FK index
+            models.Index(fields=["route", "role", "is_allowed"], name="aclcore_rrp_route_lookup"),
+            # staff routes: denied routes of the user's roles
+            # is_allowed is implied by the condition, but SQLite only treats key columns as covered
+            models.Index(
+                fields=["role", "route", "is_allowed"],
+                condition=models.Q(is_allowed=False),
+                name="aclcore_rrp_role_denies",
+            ),
+        ]
 
 
-class ACLUserRole(BaseIDModel, BaseModel):
-    user_id = models.CharField(max_length=100, db_index=True)
+class ACLUserRole(BaseTimeOrderedIDModel, BaseModel):
+    # (user_id, application, role) unique index serves per-user lookups index-only
+    user_id = models.CharField(max_length=100)
     application = models.ForeignKey(ACLApplication, on_delete=models.CASCADE, related_name="user_roles")
     role = models.ForeignKey(ACLRole, on_delete=models.CASCADE, related_name="user_roles")
 
     class Meta:
+        unique_together = ("user_id", "application", "role")
+
+
+class ACLEffectivePermission(BaseTimeOrderedIDModel, BaseModel):
+    """
+    Denormalized user → route decision, maintained incrementally by
+    aclcore.services.effective when roles, bindings or routes change.
+    Only active, non-ignored routes with at least one binding are stored.
+    """
+
+    application = models.ForeignKey(
+        ACLApplication, on_delete=models.CASCADE, related_name="effective_permissions", db_index=False
+    )
+    user_id = models.CharField(max_length=100)
+    route = models.ForeignKey(ACLRoute, on_delete=models.CASCADE, related_name="effective_permissions")
+    method = models.CharField(max_length=16)
+    normalized_path = models.CharField(max_length=320)
+    is_allowed = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("application", "user_id", "route")
         indexes = [
-            models.Index(fields=["user_id", "application"]),
+            models.Index(fields=["application", "user_id", "normalized_path", "method"]),
         ]
-        unique_together = ("user_id", "application", "role")
 
 
-class ACLCacheEntry(BaseIDModel, BaseModel):
-    user_id = models.CharField(max_length=100, db_index=True)
+class ACLCacheEntry(BaseTimeOrderedIDModel, BaseModel):
+    # (user_id, route_hash) unique constraint serves user_id lookups
+    user_id = models.CharField(max_length=100)
     route_hash = models.CharField(max_length=200, db_index=True)
     is_allowed = models.BooleanField(default=False)
-    expires_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField()
 
     class Meta:
+        constraints = [
+            # one row per decision: CacheService.set_secondary upserts on it
+            models.UniqueConstraint(fields=["user_id", "route_hash"], name="aclcore_cacheentry_user_route"),
+        ]
         indexes = [
-            models.Index(fields=["user_id", "route_hash"]),
             models.Index(fields=["expires_at"]),
         ]
 
 
-class ACLAccessLog(BaseIDModel, BaseModel):
-    user_id = models.CharField(max_length=100, db_index=True)
+class ACLAccessLog(BaseTimeOrderedIDModel, BaseModel):
+    # user_id and method lookups use the (…, timestamp) composites below
+    user_id = models.CharField(max_length=100)
     route = models.ForeignKey(ACLRoute, on_delete=models.SET_NULL, null=True, blank=True, related_name="access_logs")
-    method = models.CharField(max_length=16, db_index=True)
+    method = models.CharField(max_length=16)
     allowed = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True, db_index=True)
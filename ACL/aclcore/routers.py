@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from django.db import DEFAULT_DB_ALIAS
+
+from aclcore.services.replicas import current_alias
+
+
+class ReadReplicaRouter:
+    """Reads inside ``replica_reads()`` go to the chosen replica; everything else to ``default``."""
+
+    def db_for_read(self, model, **hints: Any) -> Optional[str]:
+        return current_alias()
+
+    def db_for_write(self, model, **hints: Any) -> Optional[str]:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints: Any) -> Optional[bool]:
+        # replicas mirror the primary, so objects from any alias may be related
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints: Any) -> Optional[bool]:
+        return db == DEFAULT_DB_ALIAS
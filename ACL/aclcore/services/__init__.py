@@ -1,12 +1,23 @@
 from .evaluation import EvaluationService
+from .effective import EffectivePermissionService
 from .route_registry import RouteRegistryService, default_normalize_path
 from .roles import RoleService
 from .cache import CacheService
+from .breaker import cache_breaker
 from .staff_routes import (
     build_routes_for_user,
     clear_routes_for_user,
     get_routes_for_user,
 )
-from .metrics import increment, reset, snapshot
+from .manifest import (
+    build_manifest,
+    get_manifest,
+    invalidate_manifest,
+    manifest_delta,
+    schedule_manifest_build,
+)
+from .metrics import increment, increment_many, reset, snapshot
+from .writebehind import write_behind
+from . import profiler
 from .throttle import AdminRequestRateLimiter, LoginAttemptLimiter
 
@@ -0,0 +1,234 @@
+"""
+Partition maintenance and retention for ``ACLAccessLog``.
+
+On PostgreSQL migration 0005 turns the table into a declarative range-
+partitioned table on ``timestamp`` (primary key ``(id, timestamp)``, one
+partition per ``ACLCORE_ACCESS_LOG_PARTITION_INTERVAL`` plus a DEFAULT
+partition for stray rows). ``ensure_partitions`` creates upcoming partitions
+ahead of time, moving rows the DEFAULT partition already holds for them, and
+``purge`` drops partitions that lie entirely before the cutoff, so retention
+never runs a large DELETE; only expired stray rows in DEFAULT are deleted in
+batches. Queries with a ``timestamp`` bound only touch the partitions they
+need.
+
+Everywhere else ``purge`` deletes expired rows in bounded batches of
+primary-key ranges.
+"""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from aclcore.models import ACLAccessLog
+
+
+TABLE = ACLAccessLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PK = ACLAccessLog._meta.pk.column
+_TIMESTAMP = ACLAccessLog._meta.get_field("timestamp").column
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class PurgeResult:
+    dropped_partitions: List[str]
+    deleted_rows: int
+    seconds: float
+
+
+def _interval() -> str:
+    interval = getattr(settings, "ACLCORE_ACCESS_LOG_PARTITION_INTERVAL", "month")
+    if interval not in ("day", "month"):
+        raise ValueError(f"ACLCORE_ACCESS_LOG_PARTITION_INTERVAL must be 'day' or 'month', not {interval!r}")
+    return interval
+
+
+def period_start(day: date, interval: Optional[str] = None) -> date:
+    return day.replace(day=1) if (interval or _interval()) == "month" else day
+
+
+def next_period(start: date, interval: Optional[str] = None) -> date:
+    if (interval or _interval()) == "day":
+        return start + timedelta(days=1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_for(start: date, interval: Optional[str] = None) -> Partition:
+    return Partition(
+        name=f"{TABLE}_p{start:%Y%m%d}",
+        start=_midnight(start),
+        end=_midnight(next_period(start, interval)),
+    )
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[Partition]:
+    """Range partitions with their bounds, oldest first (the DEFAULT partition is not listed)."""
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS.search(bound or "")
+        if match:
+            start, end = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append(Partition(name=name, start=start, end=end))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def _has_default_partition(cursor) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [f'"{DEFAULT_PARTITION}"'])
+    return cursor.fetchone()[0]
+
+
+def ensure_partitions(ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """Create the current partition and ``ahead`` more; returns the names created."""
+    if not is_partitioned():
+        return []
+    ahead = int(getattr(settings, "ACLCORE_ACCESS_LOG_PARTITIONS_AHEAD", 3) if ahead is None else ahead)
+    existing = list_partitions()
+    start = period_start(today or datetime.now(timezone.utc).date())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        has_default = _has_default_partition(cursor)
+        for _ in range(ahead + 1):
+            partition = partition_for(start)
+            # periods already covered (e.g. monthly partitions after switching to daily) are skipped
+            if not any(p.start < partition.end and partition.start < p.end for p in existing):
+                _create_partition(cursor, partition, has_default)
+                created.append(partition.name)
+            start = next_period(start)
+    return created
+
+
+def _create_partition(cursor, partition: Partition, has_default: bool) -> None:
+    bounds = [partition.start, partition.end]
+    in_range = f'"{_TIMESTAMP}" >= %s AND "{_TIMESTAMP}" < %s'
+    stray = False
+    if has_default:
+        cursor.execute(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE {in_range} LIMIT 1', bounds)
+        stray = cursor.fetchone() is not None
+    if not stray:
+        cursor.execute(
+            f'CREATE TABLE "{partition.name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)', bounds
+        )
+        return
+    # CREATE ... PARTITION OF fails while DEFAULT holds rows of the new range: detach it, move them, reattach
+    columns = ", ".join(f'"{field.column}"' for field in ACLAccessLog._meta.concrete_fields)
+    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+    cursor.execute(f'CREATE TABLE "{partition.name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)', bounds)
+    cursor.execute(
+        f'INSERT INTO "{partition.name}" ({columns}) SELECT {columns} FROM "{DEFAULT_PARTITION}" WHERE {in_range}',
+        bounds,
+    )
+    cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_range}', bounds)
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+
+
+def purge(
+    before: datetime,
+    batch_size: int = 5000,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> PurgeResult:
+    """Remove access logs older than ``before``."""
+    started = time.monotonic()
+    if is_partitioned():
+        expired = [p for p in list_partitions() if p.end <= before]
+        if not dry_run:
+            for partition in expired:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{partition.name}"')
+                    cursor.execute(f'DROP TABLE "{partition.name}"')
+        with connection.cursor() as cursor:
+            has_default = _has_default_partition(cursor)
+        # stray rows outside every range partition are never dropped with one
+        deleted = (
+            _delete_in_batches(before, max(1, batch_size), pause, dry_run, partition=DEFAULT_PARTITION)
+            if has_default
+            else 0
+        )
+        return PurgeResult([p.name for p in expired], deleted, time.monotonic() - started)
+    deleted = _delete_in_batches(before, max(1, batch_size), pause, dry_run)
+    return PurgeResult([], deleted, time.monotonic() - started)
+
+
+def _delete_in_batches(
+    before: datetime, batch_size: int, pause: float, dry_run: bool, partition: Optional[str] = None
+) -> int:
+    deleted = 0
+    cursor = None
+    while True:
+        pks = _expired_pks(before, batch_size, cursor, partition)
+        if not pks:
+            return deleted
+        cursor = pks[-1]
+        if dry_run:
+            deleted += len(pks)
+            continue
+        # a pk range keeps each DELETE short and on the primary key index; each commits on its own
+        deleted += _delete_range(pks[0], pks[-1], before, partition)
+        if pause:
+            time.sleep(pause)
+
+
+def _expired_pks(before: datetime, batch_size: int, after, partition: Optional[str]) -> list:
+    if partition is None:
+        qs = ACLAccessLog.objects.filter(timestamp__lt=before).order_by("pk")
+        if after is not None:
+            qs = qs.filter(pk__gt=after)
+        return list(qs.values_list("pk", flat=True)[:batch_size])
+    sql = f'SELECT "{_PK}" FROM "{partition}" WHERE "{_TIMESTAMP}" < %s'
+    params = [before]
+    if after is not None:
+        sql += f' AND "{_PK}" > %s'
+        params.append(after)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} ORDER BY "{_PK}" LIMIT %s', params + [batch_size])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _delete_range(first, last, before: datetime, partition: Optional[str]) -> int:
+    if partition is None:
+        return ACLAccessLog.objects.filter(pk__gte=first, pk__lte=last, timestamp__lt=before).delete()[0]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM "{partition}" WHERE "{_PK}" BETWEEN %s AND %s AND "{_TIMESTAMP}" < %s',
+            [first, last, before],
+        )
+        return cursor.rowcount
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
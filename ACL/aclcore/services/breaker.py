@@ -0,0 +1,135 @@
+"""
+Circuit breaker for aclcore's shared-cache calls.
+
+After ``ACLCORE_CACHE_BREAKER_FAILURES`` consecutive errors or calls slower
+than ``ACLCORE_CACHE_SLOW_MS``, the breaker opens: cache calls return their
+fallback immediately for ``ACLCORE_CACHE_BREAKER_RESET_SECONDS``, then one
+probe call is let through (half-open) and its outcome closes or re-opens the
+breaker. State is per process; transitions are logged and counted, and the
+counts are published as metrics once the cache is reachable again.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, TypeVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        # counted while the cache may be down, published on recovery
+        self._unpublished: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {"opened": 0, "short_circuited": 0, "failures": 0, "slow": 0}
+
+    @staticmethod
+    def _threshold() -> int:
+        return int(getattr(settings, "ACLCORE_CACHE_BREAKER_FAILURES", 5))
+
+    @staticmethod
+    def _reset_seconds() -> float:
+        return float(getattr(settings, "ACLCORE_CACHE_BREAKER_RESET_SECONDS", 5.0))
+
+    @staticmethod
+    def _slow_seconds() -> float:
+        return float(getattr(settings, "ACLCORE_CACHE_SLOW_MS", 50)) / 1000.0
+
+    def _count(self, name: str) -> None:
+        self.totals[name] += 1
+        self._unpublished[name] = self._unpublished.get(name, 0) + 1
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being short-circuited (a pending probe counts as open)."""
+        return self.state != CLOSED
+
+    def _acquire(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self._reset_seconds():
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._count("short_circuited")
+            return False
+
+    def _record(self, ok: bool, slow: bool) -> bool:
+        """Returns True when this call closed a half-open breaker."""
+        if ok and not slow and self.state == CLOSED and not self._failures:
+            # healthy steady state: nothing to update, so no lock on the hot path
+            return False
+        with self._lock:
+            probing, self._probing = self._probing, False
+            if ok and not slow:
+                recovered = self.state != CLOSED
+                self.state = CLOSED
+                self._failures = 0
+                return recovered
+            self._count("slow" if ok else "failures")
+            self._failures += 1
+            if probing or self._failures >= self._threshold():
+                if self.state != OPEN:
+                    self._count("opened")
+                    logger.warning("%s circuit breaker opened after %s failed/slow calls", self.name, self._failures)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            return False
+
+    def call(self, fn: Callable[..., T], *args: Any, fallback: Any = None, **kwargs: Any) -> T:
+        """Run ``fn`` unless the breaker is open; errors and open state return ``fallback``."""
+        if not self._acquire():
+            return fallback
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(ok=False, slow=False)
+            logger.debug("%s call failed", self.name, exc_info=True)
+            return fallback
+        if self._record(ok=True, slow=time.monotonic() - started > self._slow_seconds()):
+            logger.warning("%s circuit breaker closed", self.name)
+            self._publish()
+        return result
+
+    def _publish(self) -> None:
+        from .metrics import increment_many
+
+        with self._lock:
+            pending, self._unpublished = self._unpublished, {}
+        increment_many({f"aclcore_{self.name}_breaker_{name}_total": n for name, n in pending.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, "state": self.state, "consecutive_failures": self._failures, **self.totals}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+            self._unpublished = {}
+            self.totals = dict.fromkeys(self.totals, 0)
+
+
+cache_breaker = CircuitBreaker("cache")
@@ -1,25 +1,103 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import hashlib
+from datetime import timedelta
 from typing import Optional
 
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import caches
+from django.utils import timezone
+
+from .breaker import cache_breaker
+from .sharding import cache_for
 
 
 class CacheService:
+    """
+    Decision cache in the shared Django cache (the key's shard, see
+    ``sharding``), behind ``cache_breaker``.
+
+    While the breaker is open, decisions are read from and written to the
+    ``ACLCacheEntry`` table instead (``ACLCORE_SECONDARY_CACHE``).
+    """
+
     def __init__(self, ttl_seconds: Optional[int] = None) -> None:
         self.ttl_seconds = ttl_seconds or getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
+        self.breaker = cache_breaker
 
     @staticmethod
     def _key(application: str | None, user_id: str, method: str, normalized_path: str) -> str:
         app = application or "default"
         return f"aclcore:cache:{app}:{user_id}:{method}:{normalized_path}"
 
+    @staticmethod
+    def _route_hash(application: str | None, method: str, normalized_path: str) -> str:
+        return hashlib.sha1(f"{application or 'default'}:{method}:{normalized_path}".encode()).hexdigest()
+
+    @property
+    def degraded(self) -> bool:
+        return self.breaker.is_open
+
     def get(self, application: str | None, user_id: str, method: str, normalized_path: str) -> Optional[bool]:
-        return cache.get(self._key(application, user_id, method, normalized_path))
+        key = self._key(application, user_id, method, normalized_path)
+        return self.breaker.call(cache_for(key).get, key)
 
     def set(self, application: str | None, user_id: str, method: str, normalized_path: str, allowed: bool) -> None:
-        cache.set(self._key(application, user_id, method, normalized_path), allowed, timeout=self.ttl_seconds)
+        if self.breaker.is_open:
+            self.set_secondary(application, user_id, method, normalized_path, allowed)
+            return
+        key = self._key(application, user_id, method, normalized_path)
+        self.breaker.call(cache_for(key).set, key, allowed, timeout=self.ttl_seconds)
+
+    @staticmethod
+    def _secondary_enabled() -> bool:
+        return bool(getattr(settings, "ACLCORE_SECONDARY_CACHE", True))
+
+    def get_secondary(self, application: str | None, user_id: str, method: str, normalized_path: str) -> Optional[bool]:
+        if not self._secondary_enabled():
+            return None
+        from aclcore.models import ACLCacheEntry
+
+        return (
+            ACLCacheEntry.objects.filter(
+                user_id=user_id,
+                route_hash=self._route_hash(application, method, normalized_path),
+                expires_at__gt=timezone.now(),
+            )
+            .values_list("is_allowed", flat=True)
+            .first()
+        )
+
+    def set_secondary(self, application: str | None, user_id: str, method: str, normalized_path: str, allowed: bool) -> None:
+        if not self._secondary_enabled():
+            return
+        from aclcore.models import ACLCacheEntry
+
+        # single-statement upsert on (user_id, route_hash): no read, no race between workers
+        entry = ACLCacheEntry(
+            user_id=user_id,
+            route_hash=self._route_hash(application, method, normalized_path),
+            is_allowed=allowed,
+            expires_at=timezone.now() + timedelta(seconds=self.ttl_seconds),
+        )
+        ACLCacheEntry.objects.bulk_create(
+            [entry],
+            update_conflicts=True,
+            unique_fields=["user_id", "route_hash"],
+            update_fields=["is_allowed", "expires_at", "updated_at"],
+        )
+
 
+def redis_client(alias: str = "default"):
+    """
+    Raw redis-py client behind a cache alias (django-redis or Django's Redis
+    backend), or None for other backends.
+    """
+    backend = type(caches[alias]).__module__
+    if backend.startswith("django_redis"):
+        from django_redis import get_redis_connection
 
+        return get_redis_connection(alias)
+    if backend == "django.core.cache.backends.redis":
+        return caches[alias]._cache.get_client(write=True)
+    return None
@@ -0,0 +1,240 @@
+"""
+Incrementally maintained effective-permission table.
+
+Keeps ``ACLEffectivePermission`` in sync with user roles, role-route bindings
+and route state so the evaluation miss path can be a single indexed lookup.
+Every refresh recomputes only the (user, route) pairs in scope and applies the
+difference with bulk writes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from aclcore.models import (
+    ACLApplication,
+    ACLEffectivePermission,
+    ACLRoleRoutePermission,
+    ACLRoute,
+    ACLUserRole,
+)
+from . import role_hierarchy
+
+
+Pair = Tuple[str, str]  # (user_id, route_id)
+Decision = Tuple[bool, str, str]  # (is_allowed, method, normalized_path)
+
+_USER_BATCH = 1000
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, "ACLCORE_EFFECTIVE_PERMISSIONS", False))
+
+
+@dataclass
+class ConsistencyReport:
+    application: str
+    expected: int = 0
+    missing: int = 0
+    stale: int = 0
+    extra: int = 0
+
+    @property
+    def consistent(self) -> bool:
+        return not (self.missing or self.stale or self.extra)
+
+
+def _chunks(items: Sequence[str], size: int) -> Iterable[Sequence[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class EffectivePermissionService:
+    def _expected(
+        self,
+        app_id,
+        user_ids: Optional[Sequence[str]] = None,
+        route_ids: Optional[Sequence] = None,
+    ) -> Dict[Pair, Decision]:
+        """
+        Compute decisions for the scope: deny > allow across all of a user's
+        roles and the roles they inherit from.
+        """
+        user_roles = ACLUserRole.objects.filter(application_id=app_id)
+        if user_ids is not None:
+            user_roles = user_roles.filter(user_id__in=user_ids)
+        elif route_ids is not None:
+            # Only holders of roles bound to these routes (or inheriting them) can have a decision
+            bound_roles = ACLRoleRoutePermission.objects.filter(route_id__in=route_ids).values("role_id")
+            user_roles = user_roles.filter(role_id__in=role_hierarchy.descendants(bound_roles))
+
+        direct: Dict[str, List[str]] = {}
+        for user_id, role_id in user_roles.values_list("user_id", "role_id").iterator():
+            direct.setdefault(role_id, []).append(user_id)
+        if not direct:
+            return {}
+        # every role a holder inherits counts as held
+        users_by_role: Dict[str, Set[str]] = {}
+        closure = role_hierarchy.expand(list(direct)).values_list("descendant_id", "ancestor_id")
+        for descendant_id, ancestor_id in closure.iterator():
+            users_by_role.setdefault(ancestor_id, set()).update(direct[descendant_id])
+
+        perms = ACLRoleRoutePermission.objects.filter(
+            role_id__in=list(users_by_role),
+            route__application_id=app_id,
+            route__is_active=True,
+            route__is_ignored=False,
+        )
+        if route_ids is not None:
+            perms = perms.filter(route_id__in=route_ids)
+
+        expected: Dict[Pair, Decision] = {}
+        rows = perms.values_list("role_id", "route_id", "is_allowed", "route__method", "route__normalized_path")
+        for role_id, route_id, is_allowed, method, normalized_path in rows.iterator():
+            route_key = str(route_id)
+            for user_id in users_by_role[role_id]:
+                key = (user_id, route_key)
+                current = expected.get(key)
+                allowed = is_allowed if current is None else (current[0] and is_allowed)
+                expected[key] = (allowed, method, normalized_path or "")
+        return expected
+
+    def _existing(self, app_id, user_ids=None, route_ids=None):
+        qs = ACLEffectivePermission.objects.filter(application_id=app_id)
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=user_ids)
+        if route_ids is not None:
+            qs = qs.filter(route_id__in=route_ids)
+        existing = {}
+        for pk, user_id, route_id, is_allowed, method, normalized_path in qs.values_list(
+            "id", "user_id", "route_id", "is_allowed", "method", "normalized_path"
+        ).iterator():
+            existing[(user_id, str(route_id))] = (pk, (is_allowed, method, normalized_path))
+        return existing
+
+    def _apply(self, app_id, user_ids=None, route_ids=None) -> int:
+        expected = self._expected(app_id, user_ids=user_ids, route_ids=route_ids)
+        existing = self._existing(app_id, user_ids=user_ids, route_ids=route_ids)
+
+        to_create: List[ACLEffectivePermission] = []
+        to_update: List[ACLEffectivePermission] = []
+        for (user_id, route_id), decision in expected.items():
+            current = existing.pop((user_id, route_id), None)
+            allowed, method, normalized_path = decision
+            if current is None:
+                to_create.append(
+                    ACLEffectivePermission(
+                        application_id=app_id,
+                        user_id=user_id,
+                        route_id=route_id,
+                        is_allowed=allowed,
+                        method=method,
+                        normalized_path=normalized_path,
+                    )
+                )
+            elif current[1] != decision:
+                to_update.append(
+                    ACLEffectivePermission(
+                        id=current[0], is_allowed=allowed, method=method, normalized_path=normalized_path
+                    )
+                )
+        stale_ids = [pk for pk, _decision in existing.values()]
+
+        with transaction.atomic():
+            if stale_ids:
+                ACLEffectivePermission.objects.filter(id__in=stale_ids).delete()
+            if to_create:
+                ACLEffectivePermission.objects.bulk_create(to_create, batch_size=_USER_BATCH)
+            if to_update:
+                ACLEffectivePermission.objects.bulk_update(
+                    to_update, ["is_allowed", "method", "normalized_path"], batch_size=_USER_BATCH
+                )
+        return len(to_create) + len(to_update) + len(stale_ids)
+
+    def refresh_users(self, app_id, user_ids: Iterable[str], route_ids: Optional[Sequence] = None) -> int:
+        changed = 0
+        for batch in _chunks(sorted(set(user_ids)), _USER_BATCH):
+            changed += self._apply(app_id, user_ids=batch, route_ids=route_ids)
+        return changed
+
+    def refresh_routes(self, app_id, route_ids: Sequence) -> int:
+        return self._apply(app_id, route_ids=route_ids)
+
+    def refresh_role_route(self, role_id, route_id) -> int:
+        """
+        A single binding changed: only holders of the role or of roles inheriting it, only that route.
+        """
+        holders: Dict[object, Set[str]] = {}
+        user_roles = ACLUserRole.objects.filter(role_id__in=role_hierarchy.descendants([role_id]))
+        for app_id, user_id in user_roles.values_list("application_id", "user_id").iterator():
+            holders.setdefault(app_id, set()).add(user_id)
+        changed = 0
+        for app_id, user_ids in holders.items():
+            changed += self.refresh_users(app_id, user_ids, route_ids=[route_id])
+        return changed
+
+    def rebuild(self, application: Optional[str] = None) -> int:
+        changed = 0
+        for app in self._applications(application):
+            user_ids = list(
+                ACLUserRole.objects.filter(application=app).values_list("user_id", flat=True).distinct()
+            )
+            changed += self.refresh_users(app.pk, user_ids)
+            # Rows for users who no longer hold any role in this application
+            orphaned = ACLEffectivePermission.objects.filter(application=app).exclude(
+                user_id__in=ACLUserRole.objects.filter(application=app).values("user_id")
+            )
+            changed += orphaned.delete()[0]
+        return changed
+
+    def check(self, application: Optional[str] = None) -> List[ConsistencyReport]:
+        reports: List[ConsistencyReport] = []
+        for app in self._applications(application):
+            report = ConsistencyReport(application=app.name)
+            user_ids = list(
+                ACLUserRole.objects.filter(application=app).values_list("user_id", flat=True).distinct()
+            )
+            seen = 0
+            for batch in _chunks(sorted(set(user_ids)), _USER_BATCH):
+                expected = self._expected(app.pk, user_ids=batch)
+                existing = self._existing(app.pk, user_ids=batch)
+                report.expected += len(expected)
+                seen += len(existing)
+                for key, decision in expected.items():
+                    current = existing.get(key)
+                    if current is None:
+                        report.missing += 1
+                    elif current[1] != decision:
+                        report.stale += 1
+                report.extra += sum(1 for key in existing if key not in expected)
+            total = ACLEffectivePermission.objects.filter(application=app).count()
+            report.extra += total - seen
+            reports.append(report)
+        return reports
+
+    @staticmethod
+    def _applications(application: Optional[str]):
+        qs = ACLApplication.objects.all().order_by("name")
+        if application:
+            qs = qs.filter(name=application)
+        return qs
+
+    @staticmethod
+    def lookup(application: str | None, user_id: str, method: str, normalized_path: str):
+        """
+        Single indexed lookup used by the evaluation miss path.
+        Returns (is_allowed, route_id) or None when no row exists.
+        """
+        return (
+            ACLEffectivePermission.objects.filter(
+                application__name=application,
+                user_id=user_id,
+                normalized_path=normalized_path,
+                method=method,
+            )
+            .values_list("is_allowed", "route_id")
+            .first()
+        )
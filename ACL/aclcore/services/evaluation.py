@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Optional
 
@@ -7,64 +8,141 @@ from django.conf import settings
 
 from aclcore.models import ACLApplication, ACLRoute, ACLRoleRoutePermission, ACLUserRole
 from .cache import CacheService
+from .replicas import replica_reads
+from . import effective, role_hierarchy
+from .snapshot import snapshot_store
 from .route_registry import default_normalize_path
+from .warmup import hot_keys
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EvaluationResult:
     allowed: bool
     reason: str
     matched_route_id: Optional[str] = None
 
 
+# cache hits carry no route id, so two shared instances cover every hit
+CACHE_HIT_ALLOW = EvaluationResult(allowed=True, reason="cache-hit")
+CACHE_HIT_DENY = EvaluationResult(allowed=False, reason="cache-hit")
+
+
 class EvaluationService:
     def __init__(self, cache: Optional[CacheService] = None) -> None:
         self.cache = cache or CacheService()
         self.normalize = getattr(settings, "ACLCORE_ROUTE_NORMALIZER", default_normalize_path)
+        # time budget per evaluation, checked between lookups (0 = none)
+        self.deadline_seconds = float(getattr(settings, "ACLCORE_EVALUATION_DEADLINE_MS", 0)) / 1000.0
+        # per-process demand counts, saved at exit for the cache warm-up
+        self.hot_keys = hot_keys if hot_keys.enabled() else None
+
+    @staticmethod
+    def degraded(is_sensitive: Optional[bool] = None, route_id: Optional[str] = None) -> EvaluationResult:
+        """
+        Decision when no source answered in time (or evaluation failed):
+        ``ACLCORE_DEGRADED_POLICY`` for ordinary routes and
+        ``ACLCORE_DEGRADED_POLICY_SENSITIVE`` for sensitive or unknown ones,
+        each "open" (allow) or "closed" (deny). Not cached.
+        """
+        if is_sensitive is False:
+            policy = getattr(settings, "ACLCORE_DEGRADED_POLICY", "closed")
+        else:
+            policy = getattr(settings, "ACLCORE_DEGRADED_POLICY_SENSITIVE", "closed")
+        return EvaluationResult(allowed=policy == "open", reason="degraded", matched_route_id=route_id)
 
     def _get_application(self, name: str | None) -> ACLApplication | None:
         if not name:
             return None
+        # plain read first so the miss path can be served by a replica; only creation hits the primary
+        found = list(ACLApplication.objects.filter(name=name)[:1])
+        if found:
+            return found[0]
         app, _ = ACLApplication.objects.get_or_create(name=name)
         return app
 
     def evaluate(self, user_id: str, method: str, path: str, application: str | None = None) -> EvaluationResult:
         normalized = self.normalize(path)
         method_u = method.upper()
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+        if self.hot_keys is not None:
+            self.hot_keys.record(application, user_id, method_u, normalized)
 
         cached = self.cache.get(application, user_id, method_u, normalized)
         if cached is not None:
-            return EvaluationResult(allowed=bool(cached), reason="cache-hit", matched_route_id=None)
+            return CACHE_HIT_ALLOW if cached else CACHE_HIT_DENY
+
+        snap = snapshot_store.get(application)
+        if snap is not None:
+            allowed, reason, route_id = snap.evaluate(user_id, method_u, normalized)
+            self.cache.set(application, user_id, method_u, normalized, allowed)
+            return EvaluationResult(allowed=allowed, reason=reason, matched_route_id=route_id)
+
+        if self.cache.degraded:
+            # shared cache is tripped: ACLCacheEntry stands in for it
+            secondary = self.cache.get_secondary(application, user_id, method_u, normalized)
+            if secondary is not None:
+                return EvaluationResult(allowed=secondary, reason="secondary-cache-hit")
+
+        if deadline is not None and time.monotonic() > deadline:
+            return self.degraded()
+
+        with replica_reads():
+            return self._evaluate_db(application, user_id, method_u, normalized, deadline)
+
+    def _evaluate_db(
+        self, application: str | None, user_id: str, method_u: str, normalized: str, deadline: Optional[float]
+    ) -> EvaluationResult:
+        if effective.is_enabled():
+            # Denormalized table answers explicit allow/deny in one lookup;
+            # anything else falls through to the full chain below
+            hit = effective.EffectivePermissionService.lookup(application, user_id, method_u, normalized)
+            if hit is not None:
+                allowed, route_id = hit
+                self.cache.set(application, user_id, method_u, normalized, allowed)
+                reason = "explicit-allow" if allowed else "explicit-deny"
+                return EvaluationResult(allowed=allowed, reason=reason, matched_route_id=str(route_id))
 
         app = self._get_application(application)
-        try:
-            route = ACLRoute.objects.get(application=app, normalized_path=normalized, method=method_u, is_active=True)
-        except ACLRoute.DoesNotExist:
+        # only the columns of aclcore_route_active_lookup, so the lookup is index-only
+        match = list(
+            ACLRoute.objects.filter(application=app, normalized_path=normalized, method=method_u, is_active=True)
+            .values_list("pk", "is_ignored", "is_sensitive")[:1]
+        )
+        if not match:
             self.cache.set(application, user_id, method_u, normalized, False)
             return EvaluationResult(allowed=False, reason="route-not-registered", matched_route_id=None)
+        route_pk, is_ignored, is_sensitive = match[0]
+        route_id = str(route_pk)
 
-        if route.is_ignored:
+        if is_ignored:
             self.cache.set(application, user_id, method_u, normalized, True)
-            return EvaluationResult(allowed=True, reason="route-ignored", matched_route_id=str(route.pk))
+            return EvaluationResult(allowed=True, reason="route-ignored", matched_route_id=route_id)
+
+        if deadline is not None and time.monotonic() > deadline:
+            return self.degraded(is_sensitive, route_id)
 
         # Check user roles → role-route permissions
-        roles = ACLUserRole.objects.filter(user_id=user_id, application=app).values_list("role_id", flat=True)
+        roles = list(ACLUserRole.objects.filter(user_id=user_id, application=app).values_list("role_id", flat=True))
         if not roles:
             self.cache.set(application, user_id, method_u, normalized, False)
-            return EvaluationResult(allowed=False, reason="no-roles", matched_route_id=str(route.pk))
-
-        # deny > allow
-        denies = ACLRoleRoutePermission.objects.filter(role_id__in=roles, route=route, is_allowed=False).exists()
-        if denies:
+            return EvaluationResult(allowed=False, reason="no-roles", matched_route_id=route_id)
+
+        # deny > allow over the user's roles and everything they inherit (one closure lookup);
+        # one index-only read of the rule states instead of two EXISTS
+        states = set(
+            ACLRoleRoutePermission.objects.filter(
+                role_id__in=role_hierarchy.expand(roles), route_id=route_pk
+            ).values_list("is_allowed", flat=True)
+        )
+        if False in states:
             self.cache.set(application, user_id, method_u, normalized, False)
-            return EvaluationResult(allowed=False, reason="explicit-deny", matched_route_id=str(route.pk))
+            return EvaluationResult(allowed=False, reason="explicit-deny", matched_route_id=route_id)
 
-        allows = ACLRoleRoutePermission.objects.filter(role_id__in=roles, route=route, is_allowed=True).exists()
-        if allows:
+        if True in states:
             self.cache.set(application, user_id, method_u, normalized, True)
-            return EvaluationResult(allowed=True, reason="explicit-allow", matched_route_id=str(route.pk))
+            return EvaluationResult(allowed=True, reason="explicit-allow", matched_route_id=route_id)
 
         self.cache.set(application, user_id, method_u, normalized, False)
-        return EvaluationResult(allowed=False, reason="no-matching-rule", matched_route_id=str(route.pk))
+        return EvaluationResult(allowed=False, reason="no-matching-rule", matched_route_id=route_id)
 
 
@@ -0,0 +1,96 @@
+"""
+Deferred manifest / route-list invalidation for policy changes.
+
+Signal receivers only record what changed: a user's roles, a role's
+bindings or inheritance, a route. Once per transaction, after it commits,
+``_Pending.flush`` resolves the affected users (holders of the roles, or of
+a role inheriting them) in one query and drops their cached route lists and
+manifests with one ``delete_many`` per cache node. A rolled-back
+transaction invalidates nothing; outside a transaction the flush runs
+immediately.
+
+Application names are looked up once per process by id; ``forget_application``
+drops an entry when an application is renamed or deleted.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db import connection, transaction
+
+from aclcore.models import ACLApplication, ACLRoleRoutePermission, ACLUserRole
+
+
+_local = threading.local()
+_app_names: Dict[object, Optional[str]] = {}
+
+
+def application_name(app_id) -> Optional[str]:
+    if app_id is None:
+        return None
+    if app_id not in _app_names:
+        names = list(ACLApplication.objects.filter(pk=app_id).values_list("name", flat=True)[:1])
+        if not names:
+            return None
+        _app_names[app_id] = names[0]
+    return _app_names[app_id]
+
+
+def forget_application(app_id) -> None:
+    _app_names.pop(app_id, None)
+
+
+class _Pending:
+    """Invalidations recorded in the current transaction."""
+
+    def __init__(self) -> None:
+        self.users: Set[Tuple[str, Optional[str]]] = set()
+        self.role_ids: Set[object] = set()
+        self.route_ids: Set[object] = set()
+
+    def flush(self) -> None:
+        from aclcore.services import role_hierarchy
+        from aclcore.services.manifest import invalidate_manifests
+
+        if getattr(_local, "pending", None) is self:
+            _local.pending = None
+        role_ids = set(self.role_ids)
+        if self.route_ids:
+            role_ids |= set(
+                ACLRoleRoutePermission.objects.filter(route_id__in=self.route_ids).values_list("role_id", flat=True)
+            )
+        users = set(self.users)
+        if role_ids:
+            holders = ACLUserRole.objects.filter(role_id__in=role_hierarchy.descendants(list(role_ids)))
+            for user_id, app_id in holders.values_list("user_id", "application_id").distinct().iterator():
+                users.add((user_id, application_name(app_id)))
+        # login builds the app-less route list; app-scoped lists may also be cached
+        pairs = {(user_id, None) for user_id, _ in users} | {pair for pair in users if pair[1]}
+        invalidate_manifests(pairs)
+
+
+def _pending() -> Optional[_Pending]:
+    if not connection.in_atomic_block:
+        return None
+    pending = getattr(_local, "pending", None)
+    # flush already ran (or was discarded by a rollback): start a new batch
+    if pending is None or not any(entry[1] == pending.flush for entry in connection.run_on_commit):
+        pending = _local.pending = _Pending()
+        transaction.on_commit(pending.flush)
+    return pending
+
+
+def record(
+    users: Iterable[Tuple[str, Optional[str]]] = (),
+    role_ids: Iterable = (),
+    route_ids: Iterable = (),
+) -> None:
+    """Queue invalidation for (user_id, application) pairs and for holders of roles / routes."""
+    pending = _pending()
+    batch = pending or _Pending()
+    batch.users.update(users)
+    batch.role_ids.update(pk for pk in role_ids if pk is not None)
+    batch.route_ids.update(pk for pk in route_ids if pk is not None)
+    if pending is None:
+        batch.flush()
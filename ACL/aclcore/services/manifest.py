@@ -0,0 +1,147 @@
+"""
+Versioned route manifests for staff clients.
+
+A manifest wraps the allowed-route list produced by ``build_routes_for_user``
+with a content-derived policy version. Clients revalidate with
+``ETag``/``If-None-Match`` and can ask for a delta since an older version.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import sharding
+from .breaker import cache_breaker
+from .metrics import increment as metric_increment
+from .sharding import cache_for
+from .staff_routes import _routes_cache_key, build_routes_for_user, clear_routes_for_user
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _app_label(application: Optional[str]) -> str:
+    return application or getattr(settings, "ACLCORE_DEFAULT_APPLICATION", "") or "default"
+
+
+def _manifest_key(user_id: str, application: Optional[str]) -> str:
+    return f"aclcore:manifest:{_app_label(application)}:{user_id}"
+
+
+def _history_key(user_id: str, application: Optional[str], version: str) -> str:
+    return f"aclcore:manifest:{_app_label(application)}:{user_id}:v:{version}"
+
+
+def _route_digest(route: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(route, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _version_for(digests: Dict[str, str]) -> str:
+    payload = "\n".join(f"{route_id}:{digests[route_id]}" for route_id in sorted(digests))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def build_manifest(user_id: str, application: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build (or rebuild) the manifest for a user and cache it.
+
+    The version is a digest of the serialized routes, so it changes when the
+    route set or any route's path, method or flags change, and is identical on
+    every worker. History keeps one digest per route id for deltas.
+    """
+    routes = build_routes_for_user(user_id, application=application)
+    digests = {r["id"]: _route_digest(r) for r in routes}
+    version = _version_for(digests)
+    manifest = {"version": version, "routes": routes}
+
+    ttl = getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
+    history_ttl = getattr(settings, "ACLCORE_MANIFEST_HISTORY_TTL_SECONDS", 7 * 24 * 3600)
+    key = _manifest_key(user_id, application)
+    shard = cache_for(key)
+    shard.set(key, manifest, timeout=ttl)
+    shard.set(_history_key(user_id, application, version), digests, timeout=history_ttl)
+    metric_increment("admin_login_routes_generated_total", len(routes))
+    return manifest
+
+
+def get_manifest(user_id: str, application: Optional[str] = None) -> Dict[str, Any]:
+    key = _manifest_key(user_id, application)
+    cached = cache_for(key).get(key)
+    if cached is not None:
+        return cached
+    return build_manifest(user_id, application=application)
+
+
+def manifest_delta(manifest: Dict[str, Any], user_id: str, since: str, application: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Return added and changed routes and removed route ids between ``since`` and
+    ``manifest``. Returns None when the old version is unknown; callers should
+    send the full manifest.
+    """
+    key = _history_key(user_id, application, since)
+    previous = cache_for(key).get(key)
+    # id-only history from before per-route digests cannot show changes
+    if not isinstance(previous, dict):
+        return None
+    current_ids = {r["id"] for r in manifest["routes"]}
+    return {
+        "version": manifest["version"],
+        "since": since,
+        "added": [r for r in manifest["routes"] if r["id"] not in previous],
+        "changed": [
+            r for r in manifest["routes"] if r["id"] in previous and previous[r["id"]] != _route_digest(r)
+        ],
+        "removed": sorted(set(previous) - current_ids),
+    }
+
+
+def invalidate_manifest(user_id: str, application: Optional[str] = None) -> None:
+    """
+    Drop the cached route list and manifest; version history is kept for deltas.
+    """
+    clear_routes_for_user(user_id, application=application)
+    key = _manifest_key(user_id, application)
+    cache_breaker.call(cache_for(key).delete, key)
+
+
+def invalidate_manifests(pairs: Iterable[Tuple[str, Optional[str]]]) -> None:
+    """``invalidate_manifest`` for many (user_id, application) pairs, one ``delete_many`` per cache node."""
+    keys = set()
+    for user_id, application in pairs:
+        keys.add(_routes_cache_key(user_id, application))
+        keys.add(_manifest_key(user_id, application))
+    if keys:
+        cache_breaker.call(sharding.delete_many, sorted(keys))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(getattr(settings, "ACLCORE_MANIFEST_BUILD_WORKERS", 2))
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="aclcore-manifest")
+        return _executor
+
+
+def _build_in_background(user_id: str, application: Optional[str]) -> None:
+    try:
+        build_manifest(user_id, application=application)
+    except Exception:
+        # Manifest is rebuilt lazily on the next fetch anyway
+        pass
+    finally:
+        connection.close()
+
+
+def schedule_manifest_build(user_id: str, application: Optional[str] = None) -> None:
+    """
+    Build the manifest off the request thread once the current transaction commits.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_build_in_background, user_id, application))
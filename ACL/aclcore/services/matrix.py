@@ -0,0 +1,345 @@
+"""
+Role × route and user × role matrices for who-can-access and impact analysis.
+
+One application's policy is loaded with four streaming queries into sparse
+index arrays; set algebra happens on Python ints used as bitsets (over
+routes for forward queries, over users for reverse queries), so unions and
+differences across millions of users run at C speed. Decisions mirror
+EvaluationService: only active routes, ignored routes allow everyone,
+deny beats allow across held and inherited roles, no roles means deny.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from aclcore.models import ACLApplication, ACLRole, ACLRoleParent, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+from .replicas import replica_reads
+from .role_hierarchy import ancestor_map
+from .route_registry import default_normalize_path
+
+
+_CHUNK = 20000
+
+
+class MatrixError(Exception):
+    pass
+
+
+def _bits(indices, size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def iter_bits(value: int) -> Iterator[int]:
+    base = 0
+    for byte in value.to_bytes((value.bit_length() + 7) // 8, "little"):
+        while byte:
+            low = byte & -byte
+            yield base + low.bit_length() - 1
+            byte ^= low
+        base += 8
+
+
+@dataclass
+class RouteImpact:
+    route_id: str
+    method: str
+    path: str
+    lost: int
+    gained: int
+
+
+@dataclass
+class ImpactReport:
+    description: str
+    routes: List[RouteImpact] = field(default_factory=list)
+    affected_users: int = 0
+    sample_users: List[str] = field(default_factory=list)
+
+
+class PolicyMatrix:
+    def __init__(self, application: str) -> None:
+        with replica_reads():
+            self._load(application)
+
+    def _load(self, application: str) -> None:
+        app = ACLApplication.objects.filter(name=application).first()
+        if app is None:
+            raise MatrixError(f"Application '{application}' not found")
+        self.application = application
+        self.normalize = getattr(settings, "ACLCORE_ROUTE_NORMALIZER", default_normalize_path)
+
+        # routes (active only) and their (method, normalized path) index
+        self.route_ids: List[str] = []
+        self.route_keys: List[Tuple[str, str]] = []
+        self.route_paths: List[str] = []
+        self.route_index: Dict[str, int] = {}
+        self.route_by_key: Dict[Tuple[str, str], int] = {}
+        ignored: List[int] = []
+        rows = ACLRoute.objects.filter(application=app, is_active=True).values_list(
+            "id", "method", "path", "normalized_path", "is_ignored"
+        )
+        for pk, method, path, normalized, is_ignored in rows.iterator(chunk_size=_CHUNK):
+            idx = len(self.route_ids)
+            self.route_ids.append(str(pk))
+            self.route_paths.append(path)
+            key = (method.upper(), normalized or self.normalize(path))
+            self.route_keys.append(key)
+            self.route_index[str(pk)] = idx
+            self.route_by_key[key] = idx
+            if is_ignored:
+                ignored.append(idx)
+        self.n_routes = len(self.route_ids)
+        self.ignored_bits = _bits(ignored, self.n_routes)
+
+        self.role_names: List[str] = []
+        self.role_index: Dict[str, int] = {}
+        role_pk_index: Dict[object, int] = {}
+        for pk, name in ACLRole.objects.filter(application=app).values_list("id", "name").iterator(chunk_size=_CHUNK):
+            role_pk_index[pk] = len(self.role_names)
+            self.role_index[name] = len(self.role_names)
+            self.role_names.append(name)
+        self.n_roles = len(self.role_names)
+
+        # inheritance: closure rows for lookups, parent edges for "what if this role went away"
+        self.role_ancestors: List[Tuple[int, ...]] = [(k,) for k in range(self.n_roles)]
+        for role_pk, ancestor_pks in ancestor_map(app.pk).items():
+            k = role_pk_index.get(role_pk)
+            if k is not None:
+                self.role_ancestors[k] = tuple(role_pk_index[a] for a in ancestor_pks if a in role_pk_index)
+        self.role_parents: List[List[int]] = [[] for _ in range(self.n_roles)]
+        edges = ACLRoleParent.objects.filter(role__application=app).values_list("role_id", "parent_id")
+        for role_pk, parent_pk in edges.iterator(chunk_size=_CHUNK):
+            if role_pk in role_pk_index and parent_pk in role_pk_index:
+                self.role_parents[role_pk_index[role_pk]].append(role_pk_index[parent_pk])
+
+        # role → routes (sparse) and route → roles (bitsets over roles)
+        role_allow: List[array] = [array("I") for _ in range(self.n_roles)]
+        role_deny: List[array] = [array("I") for _ in range(self.n_roles)]
+        self.route_allow_roles: List[int] = [0] * self.n_routes
+        self.route_deny_roles: List[int] = [0] * self.n_routes
+        perms = ACLRoleRoutePermission.objects.filter(role__application=app, route__application=app, route__is_active=True)
+        for role_pk, route_pk, is_allowed in perms.values_list("role_id", "route_id", "is_allowed").iterator(chunk_size=_CHUNK):
+            k = role_pk_index.get(role_pk)
+            r = self.route_index.get(str(route_pk))
+            if k is None or r is None:
+                continue
+            if is_allowed:
+                role_allow[k].append(r)
+                self.route_allow_roles[r] |= 1 << k
+            else:
+                role_deny[k].append(r)
+                self.route_deny_roles[r] |= 1 << k
+        self.role_allow_routes = [_bits(a, self.n_routes) for a in role_allow]
+        self.role_deny_routes = [_bits(a, self.n_routes) for a in role_deny]
+
+        # user → assigned roles; role → users holding it directly or by inheritance.
+        # Per-role user bitsets are built on demand
+        self.user_ids: List[str] = []
+        self.user_index: Dict[str, int] = {}
+        self.user_roles: List[array] = []
+        self.role_users: List[array] = [array("I") for _ in range(self.n_roles)]
+        held: List[set] = []
+        assignments = ACLUserRole.objects.filter(application=app).values_list("user_id", "role_id")
+        for user_id, role_pk in assignments.iterator(chunk_size=_CHUNK):
+            k = role_pk_index.get(role_pk)
+            if k is None:
+                continue
+            u = self.user_index.get(user_id)
+            if u is None:
+                u = self.user_index[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+                self.user_roles.append(array("I"))
+                held.append(set())
+            self.user_roles[u].append(k)
+            for a in self.role_ancestors[k]:
+                if a not in held[u]:
+                    held[u].add(a)
+                    self.role_users[a].append(u)
+        self.n_users = len(self.user_ids)
+        self._role_user_bits = lru_cache(maxsize=256)(self._build_role_user_bits)
+
+    # ------------------------------------------------------------------ lookups
+
+    def find_route(self, route: str) -> int:
+        """``"DELETE /api/x/"`` → route index."""
+        parts = route.strip().split(None, 1)
+        if len(parts) != 2:
+            raise MatrixError(f"Route must look like 'METHOD /path', got '{route}'")
+        key = (parts[0].upper(), self.normalize(parts[1]))
+        idx = self.route_by_key.get(key)
+        if idx is None:
+            raise MatrixError(f"Route '{route}' is not an active route of '{self.application}'")
+        return idx
+
+    def find_role(self, name: str) -> int:
+        idx = self.role_index.get(name)
+        if idx is None:
+            raise MatrixError(f"Role '{name}' not found in '{self.application}'")
+        return idx
+
+    def route_label(self, r: int) -> str:
+        return f"{self.route_keys[r][0]} {self.route_paths[r]}"
+
+    def _build_role_user_bits(self, k: int) -> int:
+        return _bits(self.role_users[k], self.n_users)
+
+    def _users_with_any(self, role_bits: int, exclude_role: Optional[int] = None) -> int:
+        out = 0
+        for k in iter_bits(role_bits):
+            if k != exclude_role:
+                out |= self._role_user_bits(k)
+        return out
+
+    def _expanded(self, assigned, without_role: Optional[int] = None) -> set:
+        """Assigned roles (minus an assignment) and everything they inherit."""
+        out: set = set()
+        for k in assigned:
+            if k != without_role:
+                out.update(self.role_ancestors[k])
+        return out
+
+    def _expanded_without(self, assigned, removed: int) -> set:
+        """Roles reachable from ``assigned`` if role ``removed`` no longer existed."""
+        seen: set = set()
+        stack = [k for k in assigned if k != removed]
+        while stack:
+            k = stack.pop()
+            if k in seen:
+                continue
+            seen.add(k)
+            stack.extend(p for p in self.role_parents[k] if p != removed)
+        return seen
+
+    def _routes_of(self, roles) -> int:
+        allow = deny = 0
+        for k in roles:
+            allow |= self.role_allow_routes[k]
+            deny |= self.role_deny_routes[k]
+        return (allow & ~deny) | self.ignored_bits
+
+    # ------------------------------------------------------------------ queries
+
+    def routes_for_user(self, user_id: str, without_role: Optional[int] = None) -> int:
+        """
+        Bitset of route indices the user may call (ignored routes included);
+        ``without_role`` drops that assignment and what only it inherited.
+        """
+        u = self.user_index.get(user_id)
+        if u is None:
+            return self.ignored_bits
+        return self._routes_of(self._expanded(self.user_roles[u], without_role))
+
+    def users_for_route(
+        self,
+        r: int,
+        allow_roles: Optional[int] = None,
+        deny_roles: Optional[int] = None,
+        exclude_role: Optional[int] = None,
+    ) -> int:
+        """
+        Bitset of user indices allowed on route ``r``. For ignored routes every
+        known user is returned (anyone is allowed).
+        """
+        if self.ignored_bits >> r & 1:
+            return (1 << self.n_users) - 1
+        allow_roles = self.route_allow_roles[r] if allow_roles is None else allow_roles
+        deny_roles = self.route_deny_roles[r] if deny_roles is None else deny_roles
+        allowed = self._users_with_any(allow_roles, exclude_role)
+        if allowed and deny_roles:
+            allowed &= ~self._users_with_any(deny_roles, exclude_role)
+        return allowed
+
+    def user_ids_of(self, bits: int, limit: Optional[int] = None) -> List[str]:
+        out: List[str] = []
+        for u in iter_bits(bits):
+            out.append(self.user_ids[u])
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    # ------------------------------------------------------------------ impact
+
+    def _report(self, description: str, diffs: List[Tuple[int, int, int]], sample: int) -> ImpactReport:
+        report = ImpactReport(description=description)
+        affected = 0
+        for r, lost, gained in diffs:
+            if lost or gained:
+                report.routes.append(
+                    RouteImpact(self.route_ids[r], self.route_keys[r][0], self.route_paths[r], lost.bit_count(), gained.bit_count())
+                )
+                affected |= lost | gained
+        report.routes.sort(key=lambda row: row.lost + row.gained, reverse=True)
+        report.affected_users = affected.bit_count()
+        report.sample_users = self.user_ids_of(affected, sample)
+        return report
+
+    def impact_remove_role(self, role: str, sample: int = 20) -> ImpactReport:
+        """Revoke ``role`` from every holder (or delete it)."""
+        k = self.find_role(role)
+        if self.role_parents[k]:
+            return self._impact_remove_inheriting_role(role, k, sample)
+        touched = self.role_allow_routes[k] | self.role_deny_routes[k]
+        diffs = []
+        for r in iter_bits(touched & ~self.ignored_bits):
+            before = self.users_for_route(r)
+            after = self.users_for_route(r, exclude_role=k)
+            diffs.append((r, before & ~after, after & ~before))
+        return self._report(f"remove role {role}", diffs, sample)
+
+    def _impact_remove_inheriting_role(self, role: str, k: int, sample: int) -> ImpactReport:
+        # holders below ``k`` may also lose what they inherited through it: diff them one by one
+        lost: Dict[int, int] = {}
+        gained: Dict[int, int] = {}
+        for u in self.role_users[k]:
+            assigned = self.user_roles[u]
+            before = self._routes_of(self._expanded(assigned))
+            after = self._routes_of(self._expanded_without(assigned, k))
+            user_bit = 1 << u
+            for r in iter_bits(before & ~after):
+                lost[r] = lost.get(r, 0) | user_bit
+            for r in iter_bits(after & ~before):
+                gained[r] = gained.get(r, 0) | user_bit
+        diffs = [(r, lost.get(r, 0), gained.get(r, 0)) for r in set(lost) | set(gained)]
+        return self._report(f"remove role {role}", diffs, sample)
+
+    def impact_set_permission(self, role: str, route: str, state: str, sample: int = 20) -> ImpactReport:
+        """Set ``role``'s binding on ``route`` to allow, deny or none."""
+        if state not in {"allow", "deny", "none"}:
+            raise MatrixError("state must be one of allow, deny, none")
+        k = self.find_role(role)
+        r = self.find_route(route)
+        bit = 1 << k
+        allow_roles = self.route_allow_roles[r] & ~bit
+        deny_roles = self.route_deny_roles[r] & ~bit
+        if state == "allow":
+            allow_roles |= bit
+        elif state == "deny":
+            deny_roles |= bit
+        diffs = []
+        if not self.ignored_bits >> r & 1:
+            before = self.users_for_route(r)
+            after = self.users_for_route(r, allow_roles=allow_roles, deny_roles=deny_roles)
+            diffs.append((r, before & ~after, after & ~before))
+        return self._report(f"set {role} on {route} to {state}", diffs, sample)
+
+    def impact_revoke_user_role(self, user_id: str, role: str, sample: int = 20) -> ImpactReport:
+        """Remove a single assignment; the diff is over that user's routes."""
+        k = self.find_role(role)
+        u = self.user_index.get(user_id)
+        report = ImpactReport(description=f"revoke {role} from {user_id}")
+        if u is None or k not in self.user_roles[u]:
+            return report
+        before = self.routes_for_user(user_id)
+        after = self.routes_for_user(user_id, without_role=k)
+        user_bit = 1 << u
+        diffs = [(r, user_bit, 0) for r in iter_bits(before & ~after)]
+        diffs += [(r, 0, user_bit) for r in iter_bits(after & ~before)]
+        return self._report(report.description, diffs, sample)
@@ -1,15 +1,19 @@
 """
 Metric tracking service for ACL operations.
 
-Uses Django cache to store simple integer counters with TTL.
+Uses Django cache to store simple integer counters with TTL; with cache
+sharding each counter lives on the node its key hashes to.
 """
 from __future__ import annotations
 
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Mapping
 
-from django.core.cache import cache
+from django.core.cache import caches
 from django.conf import settings
 
+from .cache import redis_client
+from .sharding import cache_for, group_by_alias
+
 
 _DEFAULT_TTL = getattr(settings, "ACL_METRIC_DEFAULT_TTL", 3600)
 
@@ -25,6 +29,7 @@ def increment(name: str, amount: int = 1, ttl: int | None = None) -> None:
     key = _metric_key(name)
     ttl = ttl or _DEFAULT_TTL
     try:
+        cache = cache_for(key)
         current = cache.get(key, 0)
         cache.set(key, int(current) + int(amount), timeout=ttl)
     except Exception:
@@ -32,12 +37,41 @@ def increment(name: str, amount: int = 1, ttl: int | None = None) -> None:
         return
 
 
+def increment_many(amounts: Mapping[str, int], ttl: int | None = None) -> None:
+    """
+    Apply several increments in one round trip per cache node: a pipelined
+    INCRBY/EXPIRE on Redis, otherwise one get_many plus one set_many.
+    """
+    deltas = {_metric_key(name): int(amount) for name, amount in amounts.items() if amount}
+    if not deltas:
+        return
+    ttl = ttl or _DEFAULT_TTL
+    try:
+        for alias, keys in group_by_alias(deltas).items():
+            cache = caches[alias]
+            client = redis_client(alias)
+            if client is not None:
+                pipe = client.pipeline(transaction=False)
+                for key in keys:
+                    raw = cache.make_key(key)
+                    pipe.incrby(raw, deltas[key])
+                    pipe.expire(raw, ttl)
+                pipe.execute()
+                continue
+            current = cache.get_many(keys)
+            cache.set_many({key: int(current.get(key, 0)) + deltas[key] for key in keys}, timeout=ttl)
+    except Exception:
+        # Metrics must never break request flow
+        return
+
+
 def reset(name: str) -> None:
     """
     Reset a metric to zero.
     """
     try:
-        cache.delete(_metric_key(name))
+        key = _metric_key(name)
+        cache_for(key).delete(key)
     except Exception:
         return
 
@@ -49,7 +83,8 @@ def snapshot(names: Iterable[str]) -> Dict[str, int]:
     result: Dict[str, int] = {}
     for name in names:
         try:
-            result[name] = int(cache.get(_metric_key(name), 0))
+            key = _metric_key(name)
+            result[name] = int(cache_for(key).get(key, 0))
         except Exception:
             result[name] = 0
     return result
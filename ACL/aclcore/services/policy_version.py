@@ -0,0 +1,105 @@
+"""
+Per-application policy generation.
+
+``ACLApplication.policy_version`` is bumped in the same transaction as any
+role, route, binding, user-role or inheritance change (once per application
+per transaction). Derived artefacts stamped with the version they were built
+from, such as the mmap policy snapshots, compare it with ``current`` and are
+ignored once the policy has moved on.
+
+``current`` reads through the shared cache so the check costs no query on
+the hot path; a bump deletes the cached value both immediately and after
+commit, so a reader racing the transaction cannot keep the old one.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Iterable, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+
+from aclcore.models import ACLApplication, ACLRole
+from .breaker import cache_breaker
+
+
+_local = threading.local()
+
+
+def _key(application: str) -> str:
+    return f"aclcore:policy_version:{application}"
+
+
+def current(application: Optional[str]) -> Optional[int]:
+    """The application's policy version, or None if it does not exist."""
+    if not application:
+        return None
+    key = _key(application)
+    cached = cache_breaker.call(cache.get, key)
+    if cached is not None:
+        return cached
+    found = list(ACLApplication.objects.filter(name=application).values_list("policy_version", flat=True)[:1])
+    if not found:
+        return None
+    ttl = getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
+    cache_breaker.call(cache.set, key, found[0], timeout=ttl)
+    return found[0]
+
+
+class _Bumped:
+    """Applications already bumped in the current transaction."""
+
+    def __init__(self) -> None:
+        self.app_ids: Set[object] = set()
+        self.names: Set[str] = set()
+        self.role_ids: Set[object] = set()
+
+    def on_commit(self) -> None:
+        if self.names:
+            cache_breaker.call(cache.delete_many, [_key(name) for name in self.names])
+
+
+def _pending() -> _Bumped:
+    pending = getattr(_local, "pending", None)
+    # on_commit already ran (or was discarded by a rollback): start a new set
+    if pending is None or not any(entry[1] == pending.on_commit for entry in connection.run_on_commit):
+        pending = _local.pending = _Bumped()
+        if connection.in_atomic_block:
+            transaction.on_commit(pending.on_commit)
+    return pending
+
+
+def bump(app_ids: Iterable) -> None:
+    """Advance the policy version of ``app_ids`` (no-op for ids already bumped in this transaction)."""
+    pending = _pending()
+    new = {pk for pk in app_ids if pk is not None} - pending.app_ids
+    if not new:
+        return
+    pending.app_ids |= new
+    ACLApplication.objects.filter(pk__in=new).update(policy_version=F("policy_version") + 1)
+    names = set(ACLApplication.objects.filter(pk__in=new).values_list("name", flat=True))
+    pending.names |= names
+    cache_breaker.call(cache.delete_many, [_key(name) for name in names])
+
+
+def bump_for_roles(role_ids: Iterable) -> None:
+    """``bump`` for the applications of ``role_ids`` (bindings and inheritance links carry no application)."""
+    pending = _pending()
+    new = {pk for pk in role_ids if pk is not None} - pending.role_ids
+    if not new:
+        return
+    pending.role_ids |= new
+    bump(ACLRole.objects.filter(pk__in=new).values_list("application_id", flat=True).distinct())
+
+
+def forget(app_id) -> None:
+    """
+    Something was just built from ``app_id``'s current version inside this
+    transaction: later changes in the same transaction must bump again.
+    """
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending.app_ids.discard(app_id)
+        pending.role_ids.clear()
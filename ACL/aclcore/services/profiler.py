@@ -0,0 +1,252 @@
+"""
+Sampled per-request profiler for the ACL decision path.
+
+While a sampled request is inside ``RequestProfile`` every query on the
+current connection and every call on the current cache clients (``default``
+and every ``ACLCORE_CACHE_SHARDS`` alias) is timed.
+SQL is reduced to a fingerprint (literals and placeholder lists collapsed)
+so identical statements aggregate together. Each process keeps its own
+aggregate and publishes it to the cache; readers merge all processes.
+
+Unsampled requests never enter this module: callers check the sample rate first.
+"""
+from __future__ import annotations
+
+import os
+import random
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+
+from . import sharding
+
+
+_PROCS_KEY = "aclcore:profiler:procs"
+# bumped by reset(); processes drop their in-memory aggregate when it changes
+_EPOCH_KEY = "aclcore:profiler:epoch"
+_CACHE_OPS = ("get", "set", "add", "delete", "get_many", "set_many", "delete_many", "has_key", "incr", "decr", "touch")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def sample_rate() -> float:
+    return float(getattr(settings, "ACLCORE_PROFILER_SAMPLE_RATE", 0.0) or 0.0)
+
+
+def should_sample(rate: float) -> bool:
+    return rate > 0.0 and (rate >= 1.0 or random.random() < rate)
+
+
+def fingerprint(sql: str) -> str:
+    """``WHERE id IN (%s, %s) AND name = 'x'`` → ``WHERE id IN (?+) AND name = ?``"""
+    fp = _STRING.sub("?", sql).replace("%s", "?")
+    fp = _NUMBER.sub("?", fp)
+    fp = _VALUE_LIST.sub("(?+)", fp)
+    return _SPACES.sub(" ", fp).strip()[:500]
+
+
+def _proc_key(proc: str) -> str:
+    return f"aclcore:profiler:proc:{proc}"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "ACLCORE_PROFILER_TTL_SECONDS", 3600))
+
+
+def _bump(table: Dict[str, List[float]], key: str, ms: float, hit: int = 0) -> None:
+    row = table.get(key)
+    if row is None:
+        table[key] = [1, ms, ms, hit]
+    else:
+        row[0] += 1
+        row[1] += ms
+        row[2] = max(row[2], ms)
+        row[3] += hit
+
+
+class _Aggregate:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self, epoch: int = 0) -> None:
+        self.epoch = epoch
+        self.requests = 0
+        self.total_ms = 0.0
+        self.sql: Dict[str, List[float]] = {}
+        self.cache: Dict[str, List[float]] = {}
+        self.slowest: List[Dict[str, Any]] = []
+
+    def add(self, profile: "RequestProfile", top_n: int, epoch: int) -> Dict[str, Any]:
+        with self.lock:
+            if epoch != self.epoch:
+                self.clear(epoch)
+            self.requests += 1
+            self.total_ms += profile.elapsed_ms
+            for fp, ms in profile.queries:
+                _bump(self.sql, fp, ms)
+            for op, ms, hit in profile.cache_calls:
+                _bump(self.cache, op, ms, hit)
+            self.slowest.append(profile.summary())
+            self.slowest.sort(key=lambda r: r["ms"], reverse=True)
+            del self.slowest[top_n:]
+            return {
+                "requests": self.requests,
+                "total_ms": self.total_ms,
+                "sql": dict(self.sql),
+                "cache": dict(self.cache),
+                "slowest": list(self.slowest),
+            }
+
+
+_aggregate = _Aggregate()
+
+
+class RequestProfile:
+    """
+    Context manager around one sampled request's ACL processing.
+    """
+
+    def __init__(self, source: str, method: str, path: str, using: str = "default") -> None:
+        self.source = source
+        self.method = method
+        self.path = path
+        self.using = using
+        self.queries: List[tuple] = []
+        self.cache_calls: List[tuple] = []
+        self.elapsed_ms = 0.0
+        self._patched: List[Tuple[BaseCache, str]] = []
+
+    def _record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((fingerprint(sql), (time.perf_counter() - started) * 1000))
+
+    def _wrap_cache_op(self, name: str, fn):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            hit = int(name == "get" and result is not None)
+            self.cache_calls.append((name, (time.perf_counter() - started) * 1000, hit))
+            return result
+
+        return wrapper
+
+    def __enter__(self) -> "RequestProfile":
+        # caches/connections are per thread (per context under ASGI), so the
+        # patches below only see this request's calls
+        self._cache = caches["default"]
+        for alias in sharding.all_aliases():
+            backend = caches[alias]
+            for name in _CACHE_OPS:
+                fn = getattr(backend, name, None)
+                if fn is not None:
+                    setattr(backend, name, self._wrap_cache_op(name, fn))
+                    self._patched.append((backend, name))
+        self._conn = connections[self.using]
+        self._conn.execute_wrappers.append(self._record_query)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed_ms = (time.perf_counter() - self._started) * 1000
+        self._conn.execute_wrappers.remove(self._record_query)
+        for backend, name in self._patched:
+            backend.__dict__.pop(name, None)
+        try:
+            epoch = int(self._cache.get(_EPOCH_KEY) or 0)
+            _publish(_aggregate.add(self, int(getattr(settings, "ACLCORE_PROFILER_TOP_N", 20)), epoch))
+        except Exception:
+            # profiling must never break request flow
+            pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "method": self.method,
+            "path": self.path,
+            "ms": round(self.elapsed_ms, 3),
+            "queries": len(self.queries),
+            "query_ms": round(sum(ms for _fp, ms in self.queries), 3),
+            "cache_calls": len(self.cache_calls),
+            "cache_ms": round(sum(ms for _op, ms, _hit in self.cache_calls), 3),
+        }
+
+
+def _publish(state: Dict[str, Any]) -> None:
+    cache = caches["default"]
+    proc = f"{socket.gethostname()}:{os.getpid()}"
+    cache.set(_proc_key(proc), state, timeout=_ttl())
+    procs = cache.get(_PROCS_KEY) or []
+    if proc not in procs:
+        cache.set(_PROCS_KEY, [*procs, proc], timeout=_ttl())
+
+
+def _top(table: Dict[str, List[float]], label: str, top_n: int) -> List[Dict[str, Any]]:
+    rows = sorted(table.items(), key=lambda item: item[1][1], reverse=True)[:top_n]
+    out = []
+    for key, (count, total, worst, hits) in rows:
+        row = {label: key, "count": int(count), "total_ms": round(total, 3), "avg_ms": round(total / count, 3), "max_ms": round(worst, 3)}
+        if label == "op" and key == "get":
+            row["hits"] = int(hits)
+        out.append(row)
+    return out
+
+
+def report(top_n: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Merge every process' aggregate into top-N tables.
+    """
+    top_n = top_n or int(getattr(settings, "ACLCORE_PROFILER_TOP_N", 20))
+    cache = caches["default"]
+    procs = cache.get(_PROCS_KEY) or []
+    states = cache.get_many([_proc_key(proc) for proc in procs]).values() if procs else []
+
+    requests = 0
+    total_ms = 0.0
+    sql: Dict[str, List[float]] = {}
+    cache_ops: Dict[str, List[float]] = {}
+    slowest: List[Dict[str, Any]] = []
+    for state in states:
+        requests += state["requests"]
+        total_ms += state["total_ms"]
+        for merged, table in ((sql, state["sql"]), (cache_ops, state["cache"])):
+            for key, (count, total, worst, hits) in table.items():
+                row = merged.setdefault(key, [0, 0.0, 0.0, 0])
+                row[0] += count
+                row[1] += total
+                row[2] = max(row[2], worst)
+                row[3] += hits
+        slowest.extend(state["slowest"])
+    slowest.sort(key=lambda r: r["ms"], reverse=True)
+
+    return {
+        "sample_rate": sample_rate(),
+        "processes": len(states),
+        "requests": requests,
+        "avg_ms": round(total_ms / requests, 3) if requests else 0.0,
+        "sql": _top(sql, "fingerprint", top_n),
+        "cache": _top(cache_ops, "op", top_n),
+        "slowest": slowest[:top_n],
+    }
+
+
+def reset() -> None:
+    cache = caches["default"]
+    procs = cache.get(_PROCS_KEY) or []
+    cache.delete_many([_proc_key(proc) for proc in procs] + [_PROCS_KEY])
+    cache.set(_EPOCH_KEY, time.time_ns(), timeout=None)
+    with _aggregate.lock:
+        _aggregate.clear()
@@ -0,0 +1,201 @@
+"""
+Scoped deletion of ACLCore cache keys.
+
+Keys are selected by family (decisions, route lists, metrics, throttles)
+and narrowed by application, user and route. On Redis the matching keys are
+found with ``SCAN`` and removed with ``UNLINK`` in pipelined batches, paced to
+a maximum delete rate so a large purge does not stall live traffic. LocMem
+caches are matched in-process; other backends cannot enumerate keys. Unless
+one alias is given, every node aclcore keys may live on is purged
+(``default`` and the ``ACLCORE_CACHE_SHARDS``).
+"""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import redis_client
+from .sharding import all_aliases
+from .route_registry import default_normalize_path
+
+
+FAMILIES = ("decisions", "routes", "metrics", "throttles")
+DEFAULT_FAMILIES = ("decisions", "routes")
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+
+class PurgeNotSupported(Exception):
+    pass
+
+
+@dataclass
+class PurgeResult:
+    matched: int = 0
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+
+def _glob_escape(value: str) -> str:
+    return _GLOB_SPECIAL.sub(r"\\\1", value)
+
+
+def _glob_to_regex(pattern: str) -> "re.Pattern[str]":
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        out.append(".*" if ch == "*" else "." if ch == "?" else re.escape(ch))
+        i += 1
+    return re.compile("".join(out) + r"\Z", re.S)
+
+
+def parse_route(route: str) -> tuple:
+    """``"GET /api/items/"`` → ("GET", "/api/items"); a bare path matches any method."""
+    parts = route.strip().split(None, 1)
+    if len(parts) == 2 and parts[1].startswith("/"):
+        method, path = parts[0].upper(), parts[1]
+    else:
+        method, path = None, route.strip()
+    normalize = getattr(settings, "ACLCORE_ROUTE_NORMALIZER", default_normalize_path)
+    return method, normalize(path)
+
+
+def key_patterns(
+    families: Sequence[str],
+    application: Optional[str] = None,
+    user_id: Optional[str] = None,
+    route: Optional[str] = None,
+) -> List[str]:
+    """
+    Glob patterns (before the cache backend's key prefix) for the requested scope.
+    """
+    app = _glob_escape(application) if application else "*"
+    user = _glob_escape(user_id) if user_id else "*"
+    patterns: List[str] = []
+    if "decisions" in families:
+        method, path = parse_route(route) if route else (None, None)
+        method_p = _glob_escape(method) if method else "*"
+        path_p = _glob_escape(path) if path else "*"
+        patterns.append(f"aclcore:cache:{app}:{user}:{method_p}:{path_p}")
+    if "routes" in families:
+        # a changed route can appear in any user's list, so --route does not narrow these
+        patterns.append(f"aclcore:routes:{app}:{user}")
+        patterns.append(f"aclcore:manifest:{app}:{user}")
+        patterns.append(f"aclcore:manifest:{app}:{user}:v:*")
+    if "metrics" in families:
+        patterns.append("aclcore:metric:*")
+        patterns.append("aclcore:profiler:*")
+    if "throttles" in families:
+        patterns.append(f"aclcore:login_attempts:{user}")
+        patterns.append("aclcore:admin_rate:*")
+    return patterns
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CachePurger:
+    def __init__(
+        self,
+        alias: Optional[str] = None,
+        batch_size: int = 500,
+        max_deletes_per_second: float = 0,
+        dry_run: bool = False,
+    ) -> None:
+        self.aliases = [alias] if alias else all_aliases()
+        self.batch_size = max(1, int(batch_size))
+        self.max_rate = float(max_deletes_per_second or 0)
+        self.dry_run = dry_run
+
+    def _pace(self, started: float, deleted: int) -> None:
+        if self.max_rate > 0:
+            ahead = deleted / self.max_rate - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def purge(self, patterns: Sequence[str]) -> PurgeResult:
+        result = PurgeResult()
+        started = time.monotonic()
+        for alias in self.aliases:
+            cache = caches[alias]
+            # the backend prefixes keys (KEY_PREFIX, VERSION); patterns must match stored keys
+            raw_patterns = [cache.make_key(p) for p in patterns]
+            client = redis_client(alias)
+            if client is not None:
+                self._purge_redis(cache, client, raw_patterns, result, started)
+            elif hasattr(cache, "_cache") and hasattr(cache, "_lock") and isinstance(cache._cache, dict):
+                self._purge_locmem(cache, raw_patterns, result, started)
+            else:
+                raise PurgeNotSupported(
+                    f"Cache backend {type(cache).__name__} cannot enumerate keys; use --all to clear it"
+                )
+        result.seconds = time.monotonic() - started
+        return result
+
+    def _purge_redis(self, cache, client, patterns: Sequence[str], result: PurgeResult, started: float) -> None:
+        def scan() -> Iterator[str]:
+            # SCAN walks the keyspace incrementally (KEYS would block the server);
+            # several patterns share one pass over the aclcore namespace
+            if len(patterns) == 1:
+                yield from client.scan_iter(match=patterns[0], count=self.batch_size)
+                return
+            regexes = [_glob_to_regex(p) for p in patterns]
+            for key in client.scan_iter(match=cache.make_key("aclcore:*"), count=self.batch_size):
+                text = key.decode() if isinstance(key, bytes) else key
+                if any(r.match(text) for r in regexes):
+                    yield key
+
+        for batch in _batched(scan(), self.batch_size):
+            result.matched += len(batch)
+            if self.dry_run:
+                continue
+            pipe = client.pipeline(transaction=False)
+            for chunk in _batched(batch, 100):
+                # UNLINK frees memory in a background thread
+                pipe.unlink(*chunk)
+            result.deleted += sum(int(n or 0) for n in pipe.execute())
+            result.batches += 1
+            self._pace(started, result.deleted)
+
+    def _purge_locmem(self, cache, patterns: Sequence[str], result: PurgeResult, started: float) -> None:
+        regexes = [_glob_to_regex(p) for p in patterns]
+        with cache._lock:
+            keys = [k for k in list(cache._cache) if any(r.match(k) for r in regexes)]
+        for batch in _batched(keys, self.batch_size):
+            result.matched += len(batch)
+            if self.dry_run:
+                continue
+            with cache._lock:
+                for key in batch:
+                    if cache._delete(key):
+                        result.deleted += 1
+            result.batches += 1
+            self._pace(started, result.deleted)
+
+
+def purge(
+    families: Sequence[str] = DEFAULT_FAMILIES,
+    application: Optional[str] = None,
+    user_id: Optional[str] = None,
+    route: Optional[str] = None,
+    **purger_options,
+) -> PurgeResult:
+    return CachePurger(**purger_options).purge(key_patterns(families, application, user_id, route))
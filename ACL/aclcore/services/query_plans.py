@@ -0,0 +1,130 @@
+"""
+EXPLAIN harness for the ACL hot-path queries.
+
+Runs a service call, captures the SELECTs it issues and classifies every table
+access in their plans as ``scan``, ``index`` or ``index-only``. Supports
+SQLite (``EXPLAIN QUERY PLAN``) and PostgreSQL (``EXPLAIN (FORMAT JSON)``
+with ``enable_seqscan`` off, so small test tables still show the index the
+planner would use at production sizes).
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .cache import CacheService
+from .sharding import cache_for
+
+
+SCAN = "scan"
+INDEX = "index"
+INDEX_ONLY = "index-only"
+
+_SQLITE_ACCESS = re.compile(r"^(SCAN|SEARCH) (\S+)(?: AS \S+)?(?: USING (COVERING INDEX|INDEX|INTEGER PRIMARY KEY|PRIMARY KEY)\s*(\S*))?")
+_PG_KINDS = {"Seq Scan": SCAN, "Index Scan": INDEX, "Bitmap Heap Scan": INDEX, "Index Only Scan": INDEX_ONLY}
+
+
+@dataclass(frozen=True)
+class TableAccess:
+    table: str
+    kind: str
+    index: Optional[str] = None
+
+
+@dataclass
+class QueryPlan:
+    sql: str
+    accesses: List[TableAccess] = field(default_factory=list)
+
+    def kind_for(self, table: str) -> Optional[str]:
+        """Weakest access to ``table`` in this plan (scan < index < index-only)."""
+        order = (SCAN, INDEX, INDEX_ONLY)
+        kinds = [a.kind for a in self.accesses if a.table == table]
+        return min(kinds, key=order.index) if kinds else None
+
+    @property
+    def scans(self) -> List[str]:
+        return [a.table for a in self.accesses if a.kind == SCAN]
+
+
+_SQL_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+
+
+def _explain_sqlite(sql: str) -> List[TableAccess]:
+    # SQLite reports subquery tables by alias (U0, V0, T3, ...)
+    aliases = dict((alias, table) for table, alias in _SQL_ALIAS.findall(sql))
+    accesses = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        for row in cursor.fetchall():
+            match = _SQLITE_ACCESS.match(row[-1])
+            if not match:
+                continue
+            verb, table, using, index = match.groups()
+            if verb == "SCAN" and not using:
+                kind = SCAN
+            elif using == "COVERING INDEX":
+                kind = INDEX_ONLY
+            else:
+                kind = INDEX
+            accesses.append(TableAccess(table=aliases.get(table, table), kind=kind, index=index or None))
+    return accesses
+
+
+def _pg_nodes(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _pg_nodes(child)
+
+
+def _explain_postgresql(sql: str) -> List[TableAccess]:
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        raw = cursor.fetchone()[0]
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    accesses = []
+    for node in _pg_nodes(plan):
+        kind = _PG_KINDS.get(node.get("Node Type"))
+        if kind and node.get("Relation Name"):
+            accesses.append(TableAccess(table=node["Relation Name"], kind=kind, index=node.get("Index Name")))
+    return accesses
+
+
+def explain(sql: str) -> List[TableAccess]:
+    if connection.vendor == "sqlite":
+        return _explain_sqlite(sql)
+    if connection.vendor == "postgresql":
+        return _explain_postgresql(sql)
+    raise NotImplementedError(f"query plans are not supported on {connection.vendor}")
+
+
+def capture_plans(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> List[QueryPlan]:
+    """Run ``fn`` and return the plan of every SELECT it issued, in order."""
+    with CaptureQueriesContext(connection) as ctx:
+        fn(*args, **kwargs)
+    selects = [q["sql"] for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")]
+    return [QueryPlan(sql=sql, accesses=explain(sql)) for sql in selects]
+
+
+def evaluation_plans(user_id: str, method: str, path: str, application: str | None = None) -> List[QueryPlan]:
+    """Plans of the full DB chain of ``EvaluationService.evaluate`` (decision cache, snapshot and table bypassed)."""
+    from .evaluation import EvaluationService
+
+    service = EvaluationService()
+    key = CacheService._key(application, user_id, method.upper(), service.normalize(path))
+    cache_for(key).delete(key)
+    with override_settings(ACLCORE_EFFECTIVE_PERMISSIONS=False, ACLCORE_SNAPSHOT_DIR=None):
+        return capture_plans(service.evaluate, user_id, method, path, application=application)
+
+
+def staff_routes_plans(user_id: str, application: str | None = None) -> List[QueryPlan]:
+    from .staff_routes import build_routes_for_user, clear_routes_for_user
+
+    clear_routes_for_user(user_id, application)
+    return capture_plans(build_routes_for_user, user_id, application)
@@ -0,0 +1,111 @@
+"""
+Read-replica selection for ACL reads (see ``aclcore.routers.ReadReplicaRouter``).
+
+Only code wrapped in ``replica_reads()`` (the evaluation miss path, staff
+route lists, matrix/listing commands) reads from the aliases in
+``ACLCORE_READ_REPLICAS``; every other query and all writes stay on
+``default``. Replica reads are skipped:
+
+- for ``ACLCORE_REPLICA_STICKY_SECONDS`` after a policy write (role, route,
+  binding or user-role change) anywhere, so editors read their own writes
+  despite replication lag. The pin is shared through the cache;
+- inside a transaction on ``default``;
+- for ``ACLCORE_REPLICA_RETRY_SECONDS`` after a replica failed to connect.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .breaker import cache_breaker
+
+
+logger = logging.getLogger(__name__)
+
+_PIN_KEY = "aclcore:replica:pinned_until"
+
+_read_alias: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("aclcore_read_alias", default=None)
+_round_robin = itertools.count()
+_down_until: Dict[str, float] = {}
+_pinned_until = 0.0
+_lock = threading.Lock()
+
+
+def _replicas() -> list:
+    return list(getattr(settings, "ACLCORE_READ_REPLICAS", ()))
+
+
+def _sticky_seconds() -> float:
+    return float(getattr(settings, "ACLCORE_REPLICA_STICKY_SECONDS", 5.0))
+
+
+def mark_policy_write() -> None:
+    """Pin ACL reads to the primary for the sticky window (all processes)."""
+    global _pinned_until
+    if not _replicas():
+        return
+    until = time.time() + _sticky_seconds()
+    _pinned_until = until
+    cache_breaker.call(cache.set, _PIN_KEY, until, timeout=int(_sticky_seconds()) + 1)
+
+
+def clear_pin() -> None:
+    global _pinned_until
+    _pinned_until = 0.0
+    cache_breaker.call(cache.delete, _PIN_KEY)
+
+
+def _pinned() -> bool:
+    now = time.time()
+    if _pinned_until > now:
+        return True
+    # unknown (cache down) counts as pinned: stale reads are worse than primary load
+    until = cache_breaker.call(cache.get, _PIN_KEY, fallback=now + 1)
+    return bool(until) and float(until) > now
+
+
+def _pick_replica() -> Optional[str]:
+    replicas = _replicas()
+    if not replicas:
+        return None
+    now = time.monotonic()
+    for _ in range(len(replicas)):
+        alias = replicas[next(_round_robin) % len(replicas)]
+        if _down_until.get(alias, 0.0) > now:
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except Exception:
+            retry = float(getattr(settings, "ACLCORE_REPLICA_RETRY_SECONDS", 30.0))
+            with _lock:
+                _down_until[alias] = now + retry
+            logger.warning("read replica %s unavailable; using the primary for %ss", alias, retry)
+            continue
+        return alias
+    return None
+
+
+@contextlib.contextmanager
+def replica_reads() -> Iterator[Optional[str]]:
+    """Route reads in this block to a healthy replica when that is safe; yields the alias used."""
+    alias = None
+    if _replicas() and not connections[DEFAULT_DB_ALIAS].in_atomic_block and not _pinned():
+        alias = _pick_replica()
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def current_alias() -> Optional[str]:
+    return _read_alias.get()
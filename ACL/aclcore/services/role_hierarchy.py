@@ -0,0 +1,208 @@
+"""
+Role inheritance through a maintained transitive closure.
+
+``ACLRole.parents`` links a role to the roles it extends (VIEWER ⊂ EDITOR ⊂
+ADMIN: EDITOR's parent is VIEWER, ADMIN's parent is EDITOR), so shared
+bindings are stored once on the most general role. ``ACLRoleClosure`` holds
+one row per (descendant, ancestor) pair, each role included as its own
+ancestor, and is kept current by the signal handlers: a changed edge
+recomputes the closure of the role below it and of that role's descendants
+only. Readers expand a user's roles with one indexed lookup (``expand``)
+and never walk the graph.
+
+Deny precedence spans the hierarchy: a deny bound to any role in the
+expanded set denies, so a child cannot re-allow a route its parent denies.
+Parents must belong to the same application and edges that would close a
+cycle are rejected with ``RoleHierarchyError``.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from aclcore.models import ACLApplication, ACLRole, ACLRoleClosure, ACLRoleParent
+
+
+_BATCH = 5000
+
+# roles being deleted in this thread: the cascade removes their own rows
+_deleting = threading.local()
+
+
+class RoleHierarchyError(Exception):
+    pass
+
+
+@dataclass
+class ClosureReport:
+    application: str
+    roles: int = 0
+    edges: int = 0
+    rows: int = 0
+    missing: int = 0
+    extra: int = 0
+
+    @property
+    def consistent(self) -> bool:
+        return not (self.missing or self.extra)
+
+
+def expand(role_ids) -> QuerySet:
+    """Ids of ``role_ids`` and every role they inherit from; usable as a subquery."""
+    return ACLRoleClosure.objects.filter(descendant_id__in=role_ids).values_list("ancestor_id", flat=True)
+
+
+def descendants(role_ids) -> QuerySet:
+    """Ids of ``role_ids`` and every role inheriting from them; usable as a subquery."""
+    return ACLRoleClosure.objects.filter(ancestor_id__in=role_ids).values_list("descendant_id", flat=True)
+
+
+def ancestor_map(application_id) -> Dict[object, List[object]]:
+    """role id → ids of the role and its ancestors, for one application's in-memory evaluators."""
+    out: Dict[object, List[object]] = {}
+    rows = ACLRoleClosure.objects.filter(descendant__application_id=application_id).values_list(
+        "descendant_id", "ancestor_id"
+    )
+    for descendant_id, ancestor_id in rows.iterator(chunk_size=_BATCH):
+        out.setdefault(descendant_id, []).append(ancestor_id)
+    return out
+
+
+def add_roles(role_ids: Iterable) -> None:
+    """Self rows for new roles (``bulk_create`` skips the post_save handler)."""
+    rows = [ACLRoleClosure(descendant_id=pk, ancestor_id=pk) for pk in role_ids]
+    ACLRoleClosure.objects.bulk_create(rows, batch_size=_BATCH, ignore_conflicts=True)
+
+
+def check_parent(role_id, parent_id) -> None:
+    """Raise ``RoleHierarchyError`` unless ``parent_id`` may become a parent of ``role_id``."""
+    if role_id == parent_id:
+        raise RoleHierarchyError("A role cannot be its own parent")
+    apps = dict(ACLRole.objects.filter(pk__in=[role_id, parent_id]).values_list("pk", "application_id"))
+    if len(apps) != 2:
+        raise RoleHierarchyError("Both roles must exist")
+    if apps[role_id] != apps[parent_id]:
+        raise RoleHierarchyError("Parent roles must belong to the same application")
+    # role already being an ancestor of parent would close a cycle
+    if ACLRoleClosure.objects.filter(descendant_id=parent_id, ancestor_id=role_id).exists():
+        raise RoleHierarchyError("Role inheritance cannot contain cycles")
+
+
+def begin_delete(role_ids: Iterable) -> None:
+    pending = getattr(_deleting, "ids", None)
+    if pending is None:
+        pending = _deleting.ids = set()
+    pending.update(role_ids)
+
+
+def end_delete(role_ids: Iterable) -> None:
+    getattr(_deleting, "ids", set()).difference_update(role_ids)
+
+
+def is_deleting(role_id) -> bool:
+    return role_id in getattr(_deleting, "ids", ())
+
+
+def _ancestors(role_id, parents: Dict[object, List[object]]) -> Set[object]:
+    seen = {role_id}
+    stack = [role_id]
+    while stack:
+        for parent_id in parents.get(stack.pop(), ()):
+            if parent_id not in seen:
+                seen.add(parent_id)
+                stack.append(parent_id)
+    return seen
+
+
+def refresh(role_ids: Iterable) -> int:
+    """
+    Recompute the closure rows of ``role_ids`` and of every role below them
+    after their parents changed. Returns the number of rows written or removed.
+    """
+    role_ids = set(role_ids)
+    if not role_ids:
+        return 0
+    targets = role_ids | set(descendants(role_ids))
+    targets -= getattr(_deleting, "ids", set())
+    app_ids = set(ACLRole.objects.filter(pk__in=targets).values_list("application_id", flat=True))
+    return _apply(targets, app_ids)
+
+
+def _apply(targets: Set[object], app_ids: Set[object]) -> int:
+    existing: Dict[object, Dict[object, object]] = {}
+    rows = ACLRoleClosure.objects.filter(descendant_id__in=targets).values_list("id", "descendant_id", "ancestor_id")
+    for pk, descendant_id, ancestor_id in rows.iterator(chunk_size=_BATCH):
+        existing.setdefault(descendant_id, {})[ancestor_id] = pk
+
+    # one application's edges fit in memory; the walk happens here, not in SQL
+    parents: Dict[object, List[object]] = {}
+    edges = ACLRoleParent.objects.filter(role__application_id__in=app_ids).values_list("role_id", "parent_id")
+    for role_id, parent_id in edges.iterator(chunk_size=_BATCH):
+        parents.setdefault(role_id, []).append(parent_id)
+
+    live = set(ACLRole.objects.filter(pk__in=targets).values_list("pk", flat=True))
+    to_create: List[ACLRoleClosure] = []
+    stale: List[object] = []
+    for role_id in targets:
+        current = existing.get(role_id, {})
+        expected = _ancestors(role_id, parents) if role_id in live else set()
+        to_create += [ACLRoleClosure(descendant_id=role_id, ancestor_id=a) for a in expected if a not in current]
+        stale += [pk for a, pk in current.items() if a not in expected]
+
+    with transaction.atomic():
+        for start in range(0, len(stale), _BATCH):
+            ACLRoleClosure.objects.filter(id__in=stale[start : start + _BATCH]).delete()
+        ACLRoleClosure.objects.bulk_create(to_create, batch_size=_BATCH, ignore_conflicts=True)
+    return len(to_create) + len(stale)
+
+
+def set_parents(role: ACLRole, parents: Iterable[ACLRole]) -> None:
+    """Replace the parents of ``role``; every new edge is checked before any is written."""
+    wanted = {parent.pk for parent in parents}
+    current = set(ACLRoleParent.objects.filter(role=role).values_list("parent_id", flat=True))
+    with transaction.atomic():
+        for parent_id in current - wanted:
+            ACLRoleParent.objects.filter(role=role, parent_id=parent_id).delete()
+        for parent_id in wanted - current:
+            ACLRoleParent.objects.create(role=role, parent_id=parent_id)
+
+
+def _applications(application: Optional[str]):
+    qs = ACLApplication.objects.all().order_by("name")
+    if application:
+        qs = qs.filter(name=application)
+    return qs
+
+
+def rebuild(application: Optional[str] = None) -> int:
+    """Recompute the whole closure (after raw SQL edits or a restored dump)."""
+    changed = 0
+    for app in _applications(application):
+        targets = set(ACLRole.objects.filter(application=app).values_list("pk", flat=True))
+        changed += _apply(targets, {app.pk})
+    return changed
+
+
+def check(application: Optional[str] = None) -> List[ClosureReport]:
+    reports: List[ClosureReport] = []
+    for app in _applications(application):
+        report = ClosureReport(application=app.name)
+        role_ids = list(ACLRole.objects.filter(application=app).values_list("pk", flat=True))
+        parents: Dict[object, List[object]] = {}
+        for role_id, parent_id in ACLRoleParent.objects.filter(role__application=app).values_list("role_id", "parent_id"):
+            parents.setdefault(role_id, []).append(parent_id)
+            report.edges += 1
+        stored = ancestor_map(app.pk)
+        report.roles = len(role_ids)
+        for role_id in role_ids:
+            expected = _ancestors(role_id, parents)
+            have = set(stored.get(role_id, ()))
+            report.rows += len(have)
+            report.missing += len(expected - have)
+            report.extra += len(have - expected)
+        reports.append(report)
+    return reports
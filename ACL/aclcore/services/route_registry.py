@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-from typing import Callable, Optional
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
+from django.db import transaction
+from django.urls import URLPattern, URLResolver
 
 from aclcore.models import ACLApplication, ACLRoute
+from . import effective, invalidation, policy_version
+from .replicas import mark_policy_write
+
+_NAMED_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+_UNNAMED_GROUP = re.compile(r"\([^)]*\)")
+_PATH_CONVERTER = re.compile(r"<(?:\w+:)?(\w+)>")
+# Methods every view answers implicitly; never registered as routes
+_IMPLICIT_METHODS = {"options", "head"}
 
 
 def default_normalize_path(path: str) -> str:
@@ -18,6 +31,67 @@ def default_normalize_path(path: str) -> str:
     return p or "/"
 
 
+def pattern_to_template(pattern: str) -> str:
+    """
+    Turn a URLConf pattern into a normalized template:
+    ``^api/users/(?P<pk>[^/.]+)/$`` and ``api/users/<int:pk>/`` both become ``/api/users/{pk}/``.
+    """
+    template = _NAMED_GROUP.sub(r"{\1}", pattern)
+    template = _UNNAMED_GROUP.sub("{arg}", template)
+    template = _PATH_CONVERTER.sub(r"{\1}", template)
+    template = template.replace("^", "").replace("$", "").replace("\\", "").replace("/?", "/")
+    return "/" + template.lstrip("/")
+
+
+def discover_methods(callback) -> List[str]:
+    """
+    HTTP methods a URL callback serves: DRF viewset action maps, then
+    APIView/View handler methods, else GET for plain function views.
+    """
+    actions = getattr(callback, "actions", None)
+    if actions:
+        return sorted(m.upper() for m in actions if m not in _IMPLICIT_METHODS)
+    view_class = getattr(callback, "cls", None) or getattr(callback, "view_class", None)
+    if view_class is not None:
+        methods = [
+            m.upper()
+            for m in getattr(view_class, "http_method_names", [])
+            if m not in _IMPLICIT_METHODS and hasattr(view_class, m)
+        ]
+        return sorted(methods) or ["GET"]
+    return ["GET"]
+
+
+def iter_url_routes(urlpatterns, prefix: str = "") -> Iterator[Tuple[str, str]]:
+    """
+    Yield (template, method) for every concrete URL pattern.
+    Format-suffix duplicates (``.json`` variants added by DRF) are skipped.
+    """
+    for p in urlpatterns:
+        if isinstance(p, URLResolver):
+            yield from iter_url_routes(p.url_patterns, prefix + str(p.pattern))
+        elif isinstance(p, URLPattern):
+            if "format" in p.pattern.regex.groupindex:
+                continue
+            template = pattern_to_template(prefix + str(p.pattern))
+            for method in discover_methods(p.callback):
+                yield template, method
+
+
+def routes_digest(application: str | None, routes: Iterable[Tuple[str, str]]) -> str:
+    payload = "\n".join(f"{method} {path}" for path, method in sorted(set(routes)))
+    return hashlib.sha256(f"{application or ''}\n{payload}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RouteSyncResult:
+    created: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    unchanged: int = 0
+    changed_route_ids: List[str] = field(default_factory=list)
+
+
 class RouteRegistryService:
     def __init__(self, normalizer: Optional[Callable[[str], str]] = None) -> None:
         self.normalize = normalizer or getattr(settings, "ACLCORE_ROUTE_NORMALIZER", default_normalize_path)
@@ -56,4 +130,74 @@ class RouteRegistryService:
             route.save(update_fields=["normalized_path", "is_sensitive", "is_ignored"])
         return route
 
+    def sync(
+        self,
+        routes: Iterable[Tuple[str, str]],
+        application: str | None = None,
+        deactivate_missing: bool = True,
+        dry_run: bool = False,
+    ) -> RouteSyncResult:
+        """
+        Reconcile the application's routes with ``routes`` ((path, method) pairs)
+        using one read and bulk writes in a single transaction.
+        Admin-managed flags (is_sensitive/is_ignored) are left untouched.
+        """
+        desired: Dict[Tuple[str, str], str] = {}
+        for path, method in routes:
+            desired[(path, method.upper())] = self.normalize(path)
+
+        result = RouteSyncResult()
+        with transaction.atomic():
+            if dry_run:
+                app = ACLApplication.objects.filter(name=application).first() if application else None
+            else:
+                app = self._get_application(application)
+            existing = {} if app is None else {
+                (r.path, r.method): r
+                for r in ACLRoute.objects.filter(application=app).only("id", "path", "method", "normalized_path", "is_active")
+            }
+
+            to_create: List[ACLRoute] = []
+            to_update: List[ACLRoute] = []
+            for (path, method), normalized_path in desired.items():
+                route = existing.get((path, method))
+                if route is None:
+                    to_create.append(
+                        ACLRoute(application=app, path=path, method=method, normalized_path=normalized_path, is_active=True)
+                    )
+                elif route.normalized_path != normalized_path or not route.is_active:
+                    route.normalized_path = normalized_path
+                    route.is_active = True
+                    to_update.append(route)
+                else:
+                    result.unchanged += 1
+
+            vanished: List[ACLRoute] = []
+            if deactivate_missing:
+                for key, route in existing.items():
+                    if key not in desired and route.is_active:
+                        route.is_active = False
+                        vanished.append(route)
+
+            result.created = len(to_create)
+            result.updated = len(to_update)
+            result.deactivated = len(vanished)
+            if dry_run:
+                return result
+
+            if to_create:
+                ACLRoute.objects.bulk_create(to_create, batch_size=500)
+            if to_update or vanished:
+                ACLRoute.objects.bulk_update(to_update + vanished, ["normalized_path", "is_active"], batch_size=500)
+            result.changed_route_ids = [str(r.pk) for r in to_update + vanished]
+            if to_create or to_update or vanished:
+                mark_policy_write()
+                if app is not None:
+                    policy_version.bump([app.pk])
 
+            # bulk writes skip post_save; keep cached route lists and the effective table in step
+            if result.changed_route_ids:
+                invalidation.record(route_ids=result.changed_route_ids)
+            if effective.is_enabled() and result.changed_route_ids and app is not None:
+                effective.EffectivePermissionService().refresh_routes(app.pk, result.changed_route_ids)
+        return result
@@ -0,0 +1,233 @@
+"""
+Consistent-hash sharding of aclcore cache keys over several cache aliases.
+
+``ACLCORE_CACHE_SHARDS`` lists the cache aliases to spread over (one
+django-redis alias per Redis node, see ``ACLCORE_CACHE_SHARD_URLS``); empty
+keeps everything on ``default``. Each key has an owner, chosen by
+``ACLCORE_CACHE_SHARD_BY``:
+
+- ``user`` (default): one user's decisions, route lists, manifests and login
+  throttle live on one node, so batched calls for a user stay there;
+- ``application``: everything of one application lives on one node.
+
+Owners are placed on a hash ring with ``ACLCORE_CACHE_SHARD_VNODES`` points
+per alias, so adding or removing a node moves only about 1/N of them. Metric
+counters are spread by key. Coordination keys (replica pin, warm-up lock,
+profiler state, route-sync digests, admin rate limits) and sessions stay on
+``default``.
+
+Rebalancing: after the shard list changes, moved owners miss once, and
+copies left behind on their old node would come back, possibly stale, if
+the change were reverted. ``aclcore_cache_shards --rebalance`` moves every
+misplaced key to its owner (keeping its TTL where the backend reports one)
+and removes the old copy.
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import BaseCache
+
+
+# key families whose third and fourth segments are "<application>:<user>"
+_OWNED = frozenset(("cache", "routes", "manifest"))
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[str], vnodes: int = 160) -> None:
+        if not nodes:
+            raise ValueError("a hash ring needs at least one node")
+        points = sorted((_hash(f"{node}#{i}"), node) for node in dict.fromkeys(nodes) for i in range(max(1, vnodes)))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, owner: str) -> str:
+        idx = bisect.bisect(self._hashes, _hash(owner))
+        return self._nodes[idx % len(self._nodes)]
+
+
+@lru_cache(maxsize=8)
+def _ring(nodes: Tuple[str, ...], vnodes: int) -> HashRing:
+    return HashRing(nodes, vnodes)
+
+
+def shards() -> Tuple[str, ...]:
+    return tuple(getattr(settings, "ACLCORE_CACHE_SHARDS", None) or ())
+
+
+def all_aliases() -> List[str]:
+    """Every alias that may hold aclcore keys: ``default`` and the shards."""
+    return list(dict.fromkeys((DEFAULT_CACHE_ALIAS, *shards())))
+
+
+def ring(nodes: Optional[Sequence[str]] = None) -> HashRing:
+    vnodes = int(getattr(settings, "ACLCORE_CACHE_SHARD_VNODES", 160))
+    return _ring(tuple(nodes) if nodes is not None else shards(), vnodes)
+
+
+def owner_of(key: str) -> Optional[str]:
+    """Ring position of a key: its user or application, the key itself for metrics, None if unsharded."""
+    parts = key.split(":", 4)
+    if len(parts) < 3 or parts[0] != "aclcore":
+        return None
+    family = parts[1]
+    if family in _OWNED and len(parts) >= 4:
+        by_application = getattr(settings, "ACLCORE_CACHE_SHARD_BY", "user") == "application"
+        return parts[2] if by_application else parts[3]
+    if family == "login_attempts":
+        return key.split(":", 2)[2]
+    if family == "metric":
+        return key
+    return None
+
+
+def alias_for(key: str, nodes: Optional[Sequence[str]] = None) -> str:
+    nodes = shards() if nodes is None else tuple(nodes)
+    if not nodes:
+        return DEFAULT_CACHE_ALIAS
+    owner = owner_of(key)
+    if owner is None:
+        return DEFAULT_CACHE_ALIAS
+    return ring(nodes).node(owner)
+
+
+def cache_for(key: str) -> BaseCache:
+    """The cache that holds ``key`` (``default`` when unsharded)."""
+    if not getattr(settings, "ACLCORE_CACHE_SHARDS", None):
+        return caches[DEFAULT_CACHE_ALIAS]
+    return caches[alias_for(key)]
+
+
+def group_by_alias(keys: Iterable[str]) -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = {}
+    for key in keys:
+        groups.setdefault(alias_for(key), []).append(key)
+    return groups
+
+
+def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """``get_many`` with one round trip per node."""
+    found: Dict[str, Any] = {}
+    for alias, group in group_by_alias(keys).items():
+        found.update(caches[alias].get_many(group))
+    return found
+
+
+def set_many(values: Mapping[str, Any], timeout: Optional[int] = None) -> None:
+    """``set_many`` with one round trip per node."""
+    for alias, group in group_by_alias(values).items():
+        caches[alias].set_many({key: values[key] for key in group}, timeout=timeout)
+
+
+def delete_many(keys: Iterable[str]) -> None:
+    """``delete_many`` with one round trip per node."""
+    for alias, group in group_by_alias(keys).items():
+        caches[alias].delete_many(group)
+
+
+@dataclass
+class RebalanceResult:
+    scanned: int = 0
+    misplaced: int = 0
+    moved: int = 0
+    per_alias: Dict[str, int] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def iter_keys(alias: str, pattern: str = "aclcore:*", batch_size: int = 500) -> Iterator[str]:
+    """
+    aclcore keys stored in ``alias`` (without the backend's prefix/version):
+    ``SCAN`` on Redis, the in-process dict on LocMem.
+    """
+    from .cache import redis_client
+    from .purge import PurgeNotSupported, _glob_to_regex
+
+    backend = caches[alias]
+    prefix = backend.make_key("")
+    client = redis_client(alias)
+    if client is not None:
+        for raw in client.scan_iter(match=backend.make_key(pattern), count=batch_size):
+            text = raw.decode() if isinstance(raw, bytes) else raw
+            yield text[len(prefix):]
+        return
+    if hasattr(backend, "_cache") and hasattr(backend, "_lock") and isinstance(backend._cache, dict):
+        regex = _glob_to_regex(backend.make_key(pattern))
+        with backend._lock:
+            raw_keys = [k for k in backend._cache if regex.match(k)]
+        for raw in raw_keys:
+            yield raw[len(prefix):]
+        return
+    raise PurgeNotSupported(f"Cache backend {type(backend).__name__} cannot enumerate keys")
+
+
+def _remaining_ttl(backend: BaseCache, key: str) -> Optional[int]:
+    ttl = getattr(backend, "ttl", None)
+    if ttl is not None:
+        try:
+            seconds = ttl(key)
+        except Exception:
+            seconds = None
+        if isinstance(seconds, int) and seconds > 0:
+            return seconds
+    return getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
+
+
+def rebalance(
+    aliases: Optional[Sequence[str]] = None,
+    batch_size: int = 500,
+    max_moves_per_second: float = 0,
+    dry_run: bool = False,
+) -> RebalanceResult:
+    """
+    Move keys that are not on the node the current ring assigns them to.
+    ``aliases`` are the nodes to scan; by default every alias in CACHES, so
+    a node just removed from ``ACLCORE_CACHE_SHARDS`` is drained as long as
+    it is still configured. Backends that cannot list keys are skipped.
+    """
+    from .purge import PurgeNotSupported
+
+    result = RebalanceResult()
+    started = time.monotonic()
+    for alias in aliases or list(settings.CACHES):
+        backend = caches[alias]
+        count = 0
+        pending: List[str] = []
+        try:
+            for key in iter_keys(alias, batch_size=batch_size):
+                count += 1
+                if alias_for(key) != alias:
+                    pending.append(key)
+        except PurgeNotSupported:
+            result.skipped.append(alias)
+            continue
+        result.scanned += count
+        result.per_alias[alias] = count
+        result.misplaced += len(pending)
+        if dry_run:
+            continue
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            values = backend.get_many(batch)
+            for key, value in values.items():
+                # add(): a fresher value written to the owner meanwhile wins
+                cache_for(key).add(key, value, timeout=_remaining_ttl(backend, key))
+            result.moved += len(values)
+            backend.delete_many(batch)
+            if max_moves_per_second > 0:
+                ahead = result.moved / max_moves_per_second - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    result.seconds = time.monotonic() - started
+    return result
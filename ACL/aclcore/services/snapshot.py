@@ -0,0 +1,339 @@
+"""
+Memory-mapped binary policy snapshots.
+
+One file per application holds everything needed to evaluate a request
+without the database: interned strings, the active route table, per-role
+allow/deny bitsets over routes and user → role arrays. Workers open the
+file with ``mmap`` so every process on a host shares one page-cache copy.
+
+Layout (little-endian)::
+
+    header      magic, format version, policy version (ACLApplication.policy_version
+                at build time), counts, section offsets
+    strings     uint32 offsets[n+1] followed by the UTF-8 blob
+    routes      (key_str, route_id_str, flags) sorted by key = "METHOD path"
+    roles       per role: allow bitset, deny bitset (ceil(n_routes / 8) bytes each)
+    users       (user_str, first, count) sorted by user id
+    user_roles  uint32 role indices, inherited roles included
+
+Writers replace the file atomically (temp file + ``os.replace``); readers
+notice the new inode and reopen it. A snapshot older than the application's
+current policy version is not used: evaluation falls back to the database
+until ``aclcore_snapshot`` writes a fresh one.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from aclcore.models import ACLApplication, ACLRole, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+from . import policy_version
+from .role_hierarchy import ancestor_map
+
+
+MAGIC = b"ACLSNAP\x00"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<8sHHQIIII6Q")
+_ROUTE = struct.Struct("<IIB3x")
+_USER = struct.Struct("<III")
+_U32 = struct.Struct("<I")
+
+_FLAG_IGNORED = 1
+_FLAG_SENSITIVE = 2
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _route_key(method: str, normalized_path: str) -> str:
+    return f"{method} {normalized_path}"
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.index: Dict[str, int] = {}
+        self.values: List[bytes] = []
+
+    def intern(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self.index[value] = idx
+            self.values.append(value.encode("utf-8"))
+        return idx
+
+    def pack(self) -> bytes:
+        offsets = bytearray()
+        pos = 0
+        for value in self.values:
+            offsets += _U32.pack(pos)
+            pos += len(value)
+        offsets += _U32.pack(pos)
+        return bytes(offsets) + b"".join(self.values)
+
+
+def build_snapshot(application: str) -> bytes:
+    """
+    Serialize the current policy of ``application`` into snapshot bytes.
+    """
+    # read the version before the policy: a change committed in between only makes the file look stale
+    app = ACLApplication.objects.filter(name=application).first()
+    if app is None:
+        raise SnapshotError(f"Application '{application}' not found")
+    policy_version.forget(app.pk)
+
+    strings = _StringTable()
+    routes = sorted(
+        (
+            (_route_key(method, normalized_path or ""), str(pk), is_ignored, is_sensitive)
+            for pk, method, normalized_path, is_ignored, is_sensitive in ACLRoute.objects.filter(
+                application=app, is_active=True
+            ).values_list("id", "method", "normalized_path", "is_ignored", "is_sensitive")
+        ),
+        key=lambda r: r[0].encode("utf-8"),
+    )
+    route_index: Dict[str, int] = {}
+    route_blob = bytearray()
+    for idx, (key, route_id, is_ignored, is_sensitive) in enumerate(routes):
+        route_index[route_id] = idx
+        flags = (_FLAG_IGNORED if is_ignored else 0) | (_FLAG_SENSITIVE if is_sensitive else 0)
+        route_blob += _ROUTE.pack(strings.intern(key), strings.intern(route_id), flags)
+
+    role_ids = list(ACLRole.objects.filter(application=app).values_list("id", flat=True))
+    role_index = {role_id: idx for idx, role_id in enumerate(role_ids)}
+    bitset_len = (len(routes) + 7) // 8
+    role_blob = bytearray(len(role_ids) * 2 * bitset_len)
+    perms = ACLRoleRoutePermission.objects.filter(role__application=app, route__application=app, route__is_active=True)
+    for role_id, route_id, is_allowed in perms.values_list("role_id", "route_id", "is_allowed").iterator():
+        r_idx = route_index.get(str(route_id))
+        if r_idx is None:
+            continue
+        base = role_index[role_id] * 2 * bitset_len + (0 if is_allowed else bitset_len)
+        role_blob[base + (r_idx >> 3)] |= 1 << (r_idx & 7)
+
+    # users carry their inherited roles too, so readers need no hierarchy
+    ancestors = ancestor_map(app.pk)
+    users: Dict[str, List[int]] = {}
+    for user_id, role_id in ACLUserRole.objects.filter(application=app).values_list("user_id", "role_id").iterator():
+        for ancestor_id in ancestors.get(role_id, ()):
+            if ancestor_id in role_index:
+                users.setdefault(user_id, []).append(role_index[ancestor_id])
+    user_blob = bytearray()
+    user_role_blob = bytearray()
+    first = 0
+    for user_id in sorted(users, key=lambda u: u.encode("utf-8")):
+        indices = sorted(set(users[user_id]))
+        user_blob += _USER.pack(strings.intern(user_id), first, len(indices))
+        for r in indices:
+            user_role_blob += _U32.pack(r)
+        first += len(indices)
+
+    string_blob = strings.pack()
+    sections = [string_blob, bytes(route_blob), bytes(role_blob), bytes(user_blob), bytes(user_role_blob)]
+    offsets = []
+    pos = _HEADER.size
+    for section in sections:
+        offsets.append(pos)
+        pos += len(section)
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        app.policy_version,
+        len(strings.values),
+        len(routes),
+        len(role_ids),
+        len(users),
+        *offsets,
+        pos,
+    )
+    return header + b"".join(sections)
+
+
+def write_snapshot(application: str, path: str) -> int:
+    """
+    Build and atomically install a snapshot at ``path``. Returns its size in bytes.
+    """
+    data = build_snapshot(application)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".aclsnap-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(data)
+
+
+class PolicySnapshot:
+    """
+    Read-only view over a mapped snapshot file.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < _HEADER.size:
+            raise SnapshotError(f"{path}: truncated snapshot")
+        (
+            magic,
+            fmt,
+            _flags,
+            self.policy_version,
+            self.n_strings,
+            self.n_routes,
+            self.n_roles,
+            self.n_users,
+            self.strings_off,
+            self.routes_off,
+            self.roles_off,
+            self.users_off,
+            self.user_roles_off,
+            end,
+        ) = _HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: unsupported snapshot format")
+        if end != len(self.mm):
+            raise SnapshotError(f"{path}: size mismatch")
+        self.path = path
+        self.strings_blob_off = self.strings_off + 4 * (self.n_strings + 1)
+        self.bitset_len = (self.n_routes + 7) // 8
+
+    def _string_bytes(self, idx: int) -> bytes:
+        start, end = struct.unpack_from("<II", self.mm, self.strings_off + 4 * idx)
+        return self.mm[self.strings_blob_off + start:self.strings_blob_off + end]
+
+    def _find_route(self, key: bytes) -> Optional[Tuple[int, int, int]]:
+        lo, hi = 0, self.n_routes
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_idx, id_idx, flags = _ROUTE.unpack_from(self.mm, self.routes_off + mid * _ROUTE.size)
+            probe = self._string_bytes(key_idx)
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid, id_idx, flags
+        return None
+
+    def _find_user(self, user_id: bytes) -> Optional[Tuple[int, int]]:
+        lo, hi = 0, self.n_users
+        while lo < hi:
+            mid = (lo + hi) // 2
+            str_idx, first, count = _USER.unpack_from(self.mm, self.users_off + mid * _USER.size)
+            probe = self._string_bytes(str_idx)
+            if probe < user_id:
+                lo = mid + 1
+            elif probe > user_id:
+                hi = mid
+            else:
+                return first, count
+        return None
+
+    def _bit(self, role_idx: int, route_idx: int, deny: bool) -> bool:
+        base = self.roles_off + role_idx * 2 * self.bitset_len + (self.bitset_len if deny else 0)
+        return bool(self.mm[base + (route_idx >> 3)] & (1 << (route_idx & 7)))
+
+    def evaluate(self, user_id: str, method: str, normalized_path: str) -> Tuple[bool, str, Optional[str]]:
+        """
+        Same decision and reason codes as EvaluationService's database path.
+        Returns (allowed, reason, matched_route_id).
+        """
+        found = self._find_route(_route_key(method, normalized_path).encode("utf-8"))
+        if found is None:
+            return False, "route-not-registered", None
+        route_idx, id_idx, flags = found
+        route_id = self._string_bytes(id_idx).decode("utf-8")
+        if flags & _FLAG_IGNORED:
+            return True, "route-ignored", route_id
+
+        user = self._find_user(user_id.encode("utf-8"))
+        if user is None or user[1] == 0:
+            return False, "no-roles", route_id
+        first, count = user
+        role_indices = [
+            _U32.unpack_from(self.mm, self.user_roles_off + 4 * i)[0] for i in range(first, first + count)
+        ]
+        # deny > allow
+        if any(self._bit(r, route_idx, deny=True) for r in role_indices):
+            return False, "explicit-deny", route_id
+        if any(self._bit(r, route_idx, deny=False) for r in role_indices):
+            return True, "explicit-allow", route_id
+        return False, "no-matching-rule", route_id
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+def snapshot_path(application: str | None) -> Optional[str]:
+    directory = getattr(settings, "ACLCORE_SNAPSHOT_DIR", None)
+    if not directory:
+        return None
+    return os.path.join(directory, f"{application or 'default'}.aclsnap")
+
+
+class SnapshotStore:
+    """
+    Per-process cache of open snapshots. The file is re-stat'ed at most every
+    ``ACLCORE_SNAPSHOT_CHECK_SECONDS`` and reopened when it was replaced.
+    ``get`` only returns a snapshot built from the current policy version.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._open: Dict[str, Tuple[PolicySnapshot, float]] = {}
+
+    def get(self, application: str | None) -> Optional[PolicySnapshot]:
+        snap = self._open_snapshot(application)
+        if snap is None or snap.policy_version != policy_version.current(application):
+            return None
+        return snap
+
+    def _open_snapshot(self, application: str | None) -> Optional[PolicySnapshot]:
+        path = snapshot_path(application)
+        if path is None:
+            return None
+        now = time.monotonic()
+        entry = self._open.get(path)
+        interval = float(getattr(settings, "ACLCORE_SNAPSHOT_CHECK_SECONDS", 5))
+        if entry is not None and now - entry[1] < interval:
+            return entry[0]
+
+        with self._lock:
+            entry = self._open.get(path)
+            try:
+                inode = os.stat(path).st_ino
+            except FileNotFoundError:
+                self._open.pop(path, None)
+                return None
+            if entry is not None and entry[0].inode == inode:
+                self._open[path] = (entry[0], now)
+                return entry[0]
+            try:
+                snap = PolicySnapshot(path)
+            except (OSError, ValueError, SnapshotError):
+                # keep serving the previous snapshot if the new one is unreadable
+                return entry[0] if entry is not None else None
+            # the old mapping is released once no request holds it
+            self._open[path] = (snap, now)
+            return snap
+
+
+snapshot_store = SnapshotStore()
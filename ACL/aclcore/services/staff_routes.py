@@ -3,7 +3,6 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional, Set
 
 from django.conf import settings
-from django.core.cache import cache
 
 from aclcore.models import (
     ACLApplication,
@@ -11,6 +10,10 @@ from aclcore.models import (
     ACLRoute,
     ACLUserRole,
 )
+from .breaker import cache_breaker
+from .replicas import replica_reads
+from . import role_hierarchy
+from .sharding import cache_for
 
 
 def _routes_cache_key(user_id: str, application: Optional[str]) -> str:
@@ -44,24 +47,31 @@ def build_routes_for_user(user_id: str, application: Optional[str] = None) -> Li
     cache_ttl = getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
     cache_key = _routes_cache_key(user_id, application)
 
-    cached = cache.get(cache_key)
+    shard = cache_for(cache_key)
+    cached = cache_breaker.call(shard.get, cache_key)
     if cached is not None:
         return cached
 
+    with replica_reads():
+        routes = _query_routes(user_id, application)
+    cache_breaker.call(shard.set, cache_key, routes, timeout=cache_ttl)
+    return routes
+
+
+def _query_routes(user_id: str, application: Optional[str]) -> List[Dict[str, Any]]:
     app_obj: Optional[ACLApplication] = None
     if application:
         app_obj = ACLApplication.objects.filter(name=application).first()
         if app_obj is None:
-            cache.set(cache_key, [], timeout=cache_ttl)
             return []
 
     roles_qs = ACLUserRole.objects.filter(user_id=user_id)
     if app_obj:
         roles_qs = roles_qs.filter(application=app_obj)
 
-    role_ids = list(roles_qs.values_list("role_id", flat=True))
+    # the user's roles and every role they inherit from
+    role_ids = list(set(role_hierarchy.expand(roles_qs.values("role_id"))))
     if not role_ids:
-        cache.set(cache_key, [], timeout=cache_ttl)
         return []
 
     route_qs = ACLRoute.objects.filter(is_active=True)
@@ -96,6 +106,7 @@ def build_routes_for_user(user_id: str, application: Optional[str] = None) -> Li
 
         routes.append(
             {
+                "id": str(route.pk),
                 "application": route.application.name if route.application else None,
                 "path": route.path,
                 "normalized_path": route.normalized_path,
@@ -104,17 +115,17 @@ def build_routes_for_user(user_id: str, application: Optional[str] = None) -> Li
                 "is_sensitive": route.is_sensitive,
             }
         )
-
-    cache.set(cache_key, routes, timeout=cache_ttl)
     return routes
 
 
 def get_routes_for_user(user_id: str, application: Optional[str] = None):
-    return cache.get(_routes_cache_key(user_id, application))
+    cache_key = _routes_cache_key(user_id, application)
+    return cache_breaker.call(cache_for(cache_key).get, cache_key)
 
 
 def clear_routes_for_user(user_id: str, application: Optional[str] = None) -> None:
-    cache.delete(_routes_cache_key(user_id, application))
+    cache_key = _routes_cache_key(user_id, application)
+    cache_breaker.call(cache_for(cache_key).delete, cache_key)
 
 
 
@@ -9,7 +9,8 @@ from dataclasses import dataclass
 from typing import Optional
 
 from django.conf import settings
-from django.core.cache import cache
+
+from .sharding import cache_for
 
 
 @dataclass
@@ -25,7 +26,7 @@ def _get_cache_ttl(key: str, default: int) -> int:
     Returns default if TTL cannot be determined.
     """
     try:
-        ttl = cache.ttl(key)
+        ttl = cache_for(key).ttl(key)
         if isinstance(ttl, int) and ttl > 0:
             return ttl
     except (AttributeError, TypeError):
@@ -49,6 +50,7 @@ class LoginAttemptLimiter:
 
     def allow(self, username: str) -> RateLimitResult:
         key = self._key(username)
+        cache = cache_for(key)
         attempts = cache.get(key, 0)
         if attempts >= self.limit:
             # Remaining TTL approximates retry_after
@@ -65,7 +67,8 @@ class LoginAttemptLimiter:
         return RateLimitResult(allowed=True)
 
     def reset(self, username: str) -> None:
-        cache.delete(self._key(username))
+        key = self._key(username)
+        cache_for(key).delete(key)
 
 
 class AdminRequestRateLimiter:
@@ -82,6 +85,7 @@ class AdminRequestRateLimiter:
 
     def allow(self, identifier: str) -> RateLimitResult:
         key = self._key(identifier)
+        cache = cache_for(key)
         count = cache.get(key, 0)
         if count >= self.limit:
             retry_after = _get_cache_ttl(key, self.window)
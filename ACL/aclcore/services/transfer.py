@@ -0,0 +1,532 @@
+"""
+Streaming import/export of ACL policy dumps.
+
+Two on-disk formats are understood:
+
+- NDJSON: one ``{"table": "<name>", "row": {...}}`` object per line
+- the legacy export layout ``{"applications": [...], "routes": [...], ...}``,
+  parsed incrementally so only one row is held in memory at a time
+
+Files ending in ``.gz`` or ``.zst`` are (de)compressed on the fly.
+Rows must arrive in dependency order (``TABLES``), which is how
+``aclcore_export`` writes them.
+"""
+from __future__ import annotations
+
+import gzip
+import importlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from aclcore.models import ACLApplication, ACLRole, ACLRoleParent, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+from base.models import uuid7
+from . import invalidation, policy_version, role_hierarchy
+from .purge import PurgeNotSupported, purge
+from .replicas import mark_policy_write
+
+
+logger = logging.getLogger(__name__)
+
+# Dependency order: parents before the rows referencing them
+TABLES = ["applications", "routes", "roles", "role_parents", "role_route", "user_roles"]
+
+EXPORT_FIELDS = {
+    "applications": (ACLApplication, ("id", "name", "description")),
+    "routes": (ACLRoute, ("id", "application_id", "path", "normalized_path", "method", "is_active", "is_sensitive", "is_ignored")),
+    "roles": (ACLRole, ("id", "application_id", "name", "is_super_role", "is_default", "description")),
+    "role_parents": (ACLRoleParent, ("id", "role_id", "parent_id")),
+    "role_route": (ACLRoleRoutePermission, ("id", "role_id", "route_id", "is_allowed")),
+    "user_roles": (ACLUserRole, ("id", "user_id", "application_id", "role_id")),
+}
+
+_READ_CHUNK = 1 << 16
+_NDJSON_HEAD = re.compile(r'\s*\{\s*"table"\s*:')
+
+zstandard = None
+_zstd_spec = importlib.util.find_spec("zstandard")
+if _zstd_spec is not None:  # pragma: no cover
+    zstandard = importlib.import_module("zstandard")
+
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    """
+    Open ``path`` as UTF-8 text, transparently (de)compressing .gz/.zst files.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed. Install with: pip install zstandard")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class _IncrementalJsonReader:
+    """
+    Minimal pull parser for ``{"table": [row, row, ...], ...}`` documents.
+    Each row is decoded with ``raw_decode`` from a sliding buffer.
+    """
+
+    def __init__(self, fp: IO[str]) -> None:
+        self.fp = fp
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(_READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value ending exactly at the buffer edge may be truncated (numbers)
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            table = self._value()
+            self._expect(":")
+            if self._peek() == "[":
+                self.pos += 1
+                if self._peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield table, self._value()
+                        if self._peek() == ",":
+                            self.pos += 1
+                            continue
+                        self._expect("]")
+                        break
+            else:
+                self._value()  # non-list section: ignored
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            return
+
+
+def _iter_lines(head: str, fp: IO[str]) -> Iterator[str]:
+    pending = head
+    while True:
+        *lines, pending = pending.split("\n")
+        yield from lines
+        chunk = fp.read(_READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+    if pending:
+        yield pending
+
+
+def iter_records(fp: IO[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (table, row) pairs from an NDJSON or legacy JSON policy dump.
+    """
+    head = fp.read(_READ_CHUNK)
+    if _NDJSON_HEAD.match(head):
+        for line in _iter_lines(head, fp):
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                yield record["table"], record["row"]
+        return
+
+    yield from _IncrementalJsonReader(_Prepended(head, fp))
+
+
+class _Prepended(io.TextIOBase):
+    """Re-attach an already consumed head in front of a text stream."""
+
+    def __init__(self, head: str, fp: IO[str]) -> None:
+        self.head = head
+        self.fp = fp
+
+    def read(self, size: int = -1) -> str:
+        if self.head:
+            head, self.head = self.head, ""
+            return head
+        return self.fp.read(size)
+
+
+ProgressCallback = Callable[[str, int, float], None]
+
+
+class PolicyImporter:
+    """
+    Batched importer: ids from the dump are remapped through in-memory maps,
+    rows are written with ``bulk_create(ignore_conflicts=True)`` one
+    transaction per batch. Existing rows are kept as-is, so ``counts`` are
+    rows read per table, not rows inserted.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        use_copy: bool = False,
+        progress: Optional[ProgressCallback] = None,
+        progress_every: int = 100_000,
+    ) -> None:
+        self.batch_size = max(1, batch_size)
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.progress = progress
+        self.progress_every = max(1, progress_every)
+        self.app_map: Dict[Any, Any] = {}
+        self.route_map: Dict[Any, Any] = {}
+        self.role_map: Dict[Any, Any] = {}
+        self.counts: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+        self.touched_app_ids: set = set()
+        self.touched_users: set = set()
+        self.touched_role_ids: set = set()
+        self.touched_route_ids: set = set()
+        self._started: Dict[str, float] = {}
+        self._reported: Dict[str, int] = {}
+
+    # -- driver -------------------------------------------------------------
+
+    def run(self, records: Iterator[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        handlers = {
+            "applications": self._write_applications,
+            "routes": self._write_routes,
+            "roles": self._write_roles,
+            "role_parents": self._write_role_parents,
+            "role_route": self._write_role_routes,
+            "user_roles": self._write_user_roles,
+        }
+        current: Optional[str] = None
+        batch: List[Dict[str, Any]] = []
+        for table, row in records:
+            if table not in handlers:
+                continue
+            if table != current or len(batch) >= self.batch_size:
+                if batch:
+                    self._flush(current, batch, handlers[current])
+                batch = []
+                current = table
+            batch.append(row)
+        if batch:
+            self._flush(current, batch, handlers[current])
+        for table in list(self._started):
+            self._report(table, force=True)
+        # bulk_create sends no post_save: do what the signal receivers would
+        mark_policy_write()
+        policy_version.bump(self.touched_app_ids)
+        invalidation.record(
+            users=[(user_id, invalidation.application_name(app_id)) for user_id, app_id in self.touched_users],
+            role_ids=self.touched_role_ids,
+            route_ids=self.touched_route_ids,
+        )
+        self._purge_decisions()
+        return self.counts
+
+    def _purge_decisions(self) -> None:
+        # cached decisions are keyed per user and path; drop the touched applications' ones
+        for name in ACLApplication.objects.filter(pk__in=self.touched_app_ids).values_list("name", flat=True):
+            try:
+                purge(["decisions"], application=name)
+            except PurgeNotSupported:
+                logger.warning("Cached decisions for %s expire with their TTL: the cache cannot list keys", name)
+
+    def _flush(self, table: str, rows: List[Dict[str, Any]], handler) -> None:
+        self._started.setdefault(table, time.perf_counter())
+        with transaction.atomic():
+            handler(rows)
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        self._report(table)
+
+    def _report(self, table: str, force: bool = False) -> None:
+        if self.progress is None:
+            return
+        done = self.counts.get(table, 0)
+        if not force and done - self._reported.get(table, 0) < self.progress_every:
+            return
+        self._reported[table] = done
+        elapsed = max(time.perf_counter() - self._started[table], 1e-9)
+        self.progress(table, done, done / elapsed)
+
+    def _skip(self, table: str, n: int = 1) -> None:
+        self.skipped[table] = self.skipped.get(table, 0) + n
+
+    # -- tables -------------------------------------------------------------
+
+    def _write_applications(self, rows: List[Dict[str, Any]]) -> None:
+        ACLApplication.objects.bulk_create(
+            [ACLApplication(name=r["name"], description=r.get("description")) for r in rows],
+            ignore_conflicts=True,
+        )
+        ids = dict(ACLApplication.objects.filter(name__in=[r["name"] for r in rows]).values_list("name", "id"))
+        for r in rows:
+            self.app_map[r["id"]] = ids[r["name"]]
+            self.touched_app_ids.add(ids[r["name"]])
+
+    def _write_routes(self, rows: List[Dict[str, Any]]) -> None:
+        objs = []
+        for r in rows:
+            app_id = self.app_map.get(r.get("application_id"))
+            if app_id is None:
+                self._skip("routes")
+                continue
+            objs.append(
+                ACLRoute(
+                    application_id=app_id,
+                    path=r["path"],
+                    method=r["method"],
+                    normalized_path=r.get("normalized_path") or r["path"],
+                    is_active=r.get("is_active", True),
+                    is_sensitive=r.get("is_sensitive", False),
+                    is_ignored=r.get("is_ignored", False),
+                )
+            )
+        ACLRoute.objects.bulk_create(objs, ignore_conflicts=True)
+        existing = ACLRoute.objects.filter(
+            application_id__in={o.application_id for o in objs}, path__in={o.path for o in objs}
+        ).values_list("application_id", "path", "method", "id")
+        ids = {(a, p, m): pk for a, p, m, pk in existing}
+        for r in rows:
+            pk = ids.get((self.app_map.get(r.get("application_id")), r["path"], r["method"]))
+            if pk is not None:
+                self.route_map[r["id"]] = pk
+                self.touched_route_ids.add(pk)
+
+    def _write_roles(self, rows: List[Dict[str, Any]]) -> None:
+        objs = []
+        for r in rows:
+            app_id = self.app_map.get(r.get("application_id"))
+            if app_id is None:
+                self._skip("roles")
+                continue
+            objs.append(
+                ACLRole(
+                    application_id=app_id,
+                    name=r["name"],
+                    is_super_role=r.get("is_super_role", False),
+                    is_default=r.get("is_default", False),
+                    description=r.get("description"),
+                )
+            )
+        ACLRole.objects.bulk_create(objs, ignore_conflicts=True)
+        existing = ACLRole.objects.filter(
+            application_id__in={o.application_id for o in objs}, name__in={o.name for o in objs}
+        ).values_list("application_id", "name", "id")
+        ids = {(a, n): pk for a, n, pk in existing}
+        for r in rows:
+            pk = ids.get((self.app_map.get(r.get("application_id")), r["name"]))
+            if pk is not None:
+                self.role_map[r["id"]] = pk
+        # bulk_create sends no post_save: add the closure self rows here
+        role_hierarchy.add_roles(ids.values())
+
+    def _write_role_parents(self, rows: List[Dict[str, Any]]) -> None:
+        # few rows; saved one by one so each edge is cycle-checked and the closure kept current
+        for r in rows:
+            role_id = self.role_map.get(r["role_id"])
+            parent_id = self.role_map.get(r["parent_id"])
+            if role_id is None or parent_id is None:
+                self._skip("role_parents")
+                continue
+            if ACLRoleParent.objects.filter(role_id=role_id, parent_id=parent_id).exists():
+                continue
+            try:
+                with transaction.atomic():
+                    ACLRoleParent.objects.create(role_id=role_id, parent_id=parent_id)
+            except role_hierarchy.RoleHierarchyError:
+                self._skip("role_parents")
+
+    def _write_role_routes(self, rows: List[Dict[str, Any]]) -> None:
+        objs = []
+        for r in rows:
+            role_id = self.role_map.get(r["role_id"])
+            route_id = self.route_map.get(r["route_id"])
+            if role_id is None or route_id is None:
+                self._skip("role_route")
+                continue
+            objs.append(ACLRoleRoutePermission(role_id=role_id, route_id=route_id, is_allowed=r.get("is_allowed", True)))
+            self.touched_role_ids.add(role_id)
+        ACLRoleRoutePermission.objects.bulk_create(objs, ignore_conflicts=True)
+
+    def _write_user_roles(self, rows: List[Dict[str, Any]]) -> None:
+        resolved: List[Tuple[str, Any, Any]] = []
+        for r in rows:
+            app_id = self.app_map.get(r.get("application_id"))
+            role_id = self.role_map.get(r["role_id"])
+            if app_id is None or role_id is None:
+                self._skip("user_roles")
+                continue
+            resolved.append((r["user_id"], app_id, role_id))
+            self.touched_users.add((r["user_id"], app_id))
+        if self.use_copy:
+            self._copy_user_roles(resolved)
+            return
+        ACLUserRole.objects.bulk_create(
+            [ACLUserRole(user_id=u, application_id=a, role_id=r) for u, a, r in resolved],
+            ignore_conflicts=True,
+        )
+
+    def _copy_user_roles(self, resolved: List[Tuple[str, Any, Any]]) -> None:
+        """
+        Postgres fast path: COPY into a temp table, then one INSERT ... ON CONFLICT DO NOTHING.
+        """
+        table = ACLUserRole._meta.db_table
+        now = timezone.now().isoformat()
+        buf = io.StringIO()
+        for user_id, app_id, role_id in resolved:
+            buf.write(f"{uuid7()}\t{now}\t{now}\t{_copy_escape(user_id)}\t{app_id}\t{role_id}\n")
+        buf.seek(0)
+        columns = "id, created_at, updated_at, user_id, application_id, role_id"
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS _aclcore_import_user_roles (LIKE {table}) ON COMMIT DELETE ROWS")
+            copy_sql = f"COPY _aclcore_import_user_roles ({columns}) FROM STDIN"
+            if hasattr(cursor.cursor, "copy_expert"):
+                cursor.cursor.copy_expert(copy_sql, buf)
+            else:
+                with cursor.cursor.copy(copy_sql) as copy:
+                    copy.write(buf.getvalue())
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _aclcore_import_user_roles ON CONFLICT DO NOTHING"
+            )
+
+
+def _copy_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+# -- export -------------------------------------------------------------------
+
+
+def format_for_path(path: str) -> str:
+    base = path
+    for ext in (".gz", ".zst"):
+        if base.endswith(ext):
+            base = base[: -len(ext)]
+    return "ndjson" if base.endswith((".ndjson", ".jsonl")) else "json"
+
+
+def _dumps(row: Dict[str, Any]) -> str:
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _write_table_rows(out: IO[str], table: str, fmt: str, chunk_size: int) -> int:
+    """
+    Write one table's rows; NDJSON lines, or the comma-separated body of a JSON array.
+    """
+    model, fields = EXPORT_FIELDS[table]
+    rows = model.objects.order_by().values(*fields).iterator(chunk_size=chunk_size)
+    count = 0
+    for row in rows:
+        if fmt == "ndjson":
+            out.write('{"table":"%s","row":%s}\n' % (table, _dumps(row)))
+        else:
+            out.write(("," if count else "") + "\n" + _dumps(row))
+        count += 1
+    return count
+
+
+def _export_part(path: str, table: str, fmt: str, chunk_size: int) -> Tuple[int, float]:
+    started = time.perf_counter()
+    try:
+        with open(path, "w", encoding="utf-8") as out:
+            count = _write_table_rows(out, table, fmt, chunk_size)
+    finally:
+        # each worker thread holds its own connection
+        connection.close()
+    return count, time.perf_counter() - started
+
+
+def export_policy(
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 2000,
+    jobs: int = 1,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, int]:
+    """
+    Stream every table to ``path``. With ``jobs > 1`` tables are exported
+    concurrently on separate connections into temporary parts that are then
+    concatenated in dependency order. Separate connections mean the tables
+    are not read from one snapshot; use ``jobs=1`` on a live database if
+    that matters.
+    """
+    fmt = fmt or format_for_path(path)
+    counts: Dict[str, int] = {}
+    workdir = tempfile.mkdtemp(prefix="aclcore-export-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        parts = {table: os.path.join(workdir, f"{table}.part") for table in TABLES}
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="aclcore-export") as pool:
+                futures = {t: pool.submit(_export_part, parts[t], t, fmt, chunk_size) for t in TABLES}
+                results = {t: f.result() for t, f in futures.items()}
+        else:
+            results = {}
+            for table in TABLES:
+                started = time.perf_counter()
+                with open(parts[table], "w", encoding="utf-8") as out:
+                    results[table] = (_write_table_rows(out, table, fmt, chunk_size), time.perf_counter() - started)
+
+        with open_text(path, "w") as out:
+            if fmt == "json":
+                out.write("{")
+            for index, table in enumerate(TABLES):
+                if fmt == "json":
+                    out.write('%s\n"%s":[' % ("," if index else "", table))
+                with open(parts[table], "r", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, out, _READ_CHUNK)
+                if fmt == "json":
+                    out.write("\n]")
+                count, elapsed = results[table]
+                counts[table] = count
+                if progress is not None:
+                    progress(table, count, count / max(elapsed, 1e-9))
+            if fmt == "json":
+                out.write("\n}\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return counts
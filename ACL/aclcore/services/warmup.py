@@ -0,0 +1,365 @@
+"""
+Cache warm-up for decisions and staff route lists.
+
+After a deploy or a cache restart every first request misses at once. The
+hottest keys are precomputed instead: picked from recent ``ACLAccessLog``
+rows, or from the top-K list each web process tracks in memory and merges
+into ``ACLCORE_WARMUP_HOT_KEYS_FILE`` at exit. Work is split into batches on
+a thread pool; each batch skips keys that are already cached (one
+``get_many`` per cache node), evaluates the rest through the normal chain
+(snapshot, effective table, database, replicas when configured) and writes
+them with one ``set_many`` per node. ``max_per_second`` caps computed
+entries across all workers so the warm-up does not become the stampede it
+is meant to prevent.
+
+``aclcore_warm_cache`` runs it on demand; with ``ACLCORE_WARMUP_ON_STARTUP``
+the first request a process serves starts a background warm-up (one process
+at a time, via a cache lock).
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from aclcore.models import ACLAccessLog
+from .breaker import cache_breaker
+from .cache import CacheService
+from .replicas import replica_reads
+from . import sharding
+from .staff_routes import _query_routes, _routes_cache_key
+
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("auto", "access-log", "file")
+_LOCK_KEY = "aclcore:warmup:lock"
+
+
+@dataclass(frozen=True)
+class HotKey:
+    application: Optional[str]
+    user_id: str
+    method: str
+    normalized_path: str
+    hits: int = 0
+
+
+@dataclass
+class WarmupResult:
+    keys: int = 0
+    decisions: int = 0
+    route_lists: int = 0
+    already_cached: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    skipped_reason: Optional[str] = None
+
+
+def _top_k() -> int:
+    return int(getattr(settings, "ACLCORE_WARMUP_TOP_K", 5000))
+
+
+def _hot_keys_file() -> Optional[str]:
+    return getattr(settings, "ACLCORE_WARMUP_HOT_KEYS_FILE", None) or None
+
+
+class HotKeyTracker:
+    """
+    Approximate per-process top-K of evaluated keys: a Counter trimmed back
+    to the K most common whenever it grows to twice that.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    @staticmethod
+    def enabled() -> bool:
+        return _hot_keys_file() is not None
+
+    def record(self, application: Optional[str], user_id: str, method: str, normalized_path: str) -> None:
+        capacity = _top_k()
+        with self._lock:
+            self._counts[(application or "", user_id, method, normalized_path)] += 1
+            if len(self._counts) > 2 * capacity:
+                self._counts = Counter(dict(self._counts.most_common(capacity)))
+
+    def top(self, limit: Optional[int] = None) -> List[HotKey]:
+        with self._lock:
+            common = self._counts.most_common(limit or _top_k())
+        return [HotKey(app or None, user, method, path, hits) for (app, user, method, path), hits in common]
+
+    def save(self, path: Optional[str] = None) -> int:
+        """Merge this process's counts into the hot-keys file (atomic replace); returns keys written."""
+        path = path or _hot_keys_file()
+        if not path:
+            return 0
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+        for key in read_hot_keys(path):
+            counts[(key.application or "", key.user_id, key.method, key.normalized_path)] += key.hits
+        rows = [[app, user, method, norm, hits] for (app, user, method, norm), hits in counts.most_common(_top_k())]
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".hotkeys-")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"saved_at": timezone.now().isoformat(), "keys": rows}, fh)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return len(rows)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = Counter()
+
+
+hot_keys = HotKeyTracker()
+
+
+def _save_at_exit() -> None:
+    try:
+        hot_keys.save()
+    except Exception:
+        logger.exception("could not save ACL hot keys")
+
+
+atexit.register(_save_at_exit)
+
+
+def read_hot_keys(path: str, limit: Optional[int] = None) -> List[HotKey]:
+    try:
+        with open(path) as fh:
+            rows = json.load(fh).get("keys", [])
+    except FileNotFoundError:
+        return []
+    keys = [HotKey(app or None, user, method, norm, int(hits)) for app, user, method, norm, hits in rows]
+    return keys[:limit] if limit else keys
+
+
+def hot_keys_from_access_log(
+    hours: float = 24, limit: Optional[int] = None, application: Optional[str] = None
+) -> List[HotKey]:
+    """Most requested (user, route) pairs of the last ``hours``; the timestamp bound prunes partitions."""
+    qs = ACLAccessLog.objects.filter(
+        timestamp__gte=timezone.now() - timedelta(hours=hours),
+        route__isnull=False,
+        route__normalized_path__isnull=False,
+    )
+    if application:
+        qs = qs.filter(route__application__name=application)
+    rows = (
+        qs.values_list("user_id", "route__application__name", "route__method", "route__normalized_path")
+        .annotate(hits=Count("pk"))
+        .order_by("-hits")[: limit or _top_k()]
+    )
+    with replica_reads():
+        return [HotKey(app, user, method, norm, hits) for user, app, method, norm, hits in rows]
+
+
+def load_hot_keys(
+    source: str = "auto", limit: Optional[int] = None, hours: Optional[float] = None, application: Optional[str] = None
+) -> List[HotKey]:
+    """``auto`` prefers the saved top-K file and falls back to the access log."""
+    if source not in SOURCES:
+        raise ValueError(f"unknown hot key source {source!r}; expected one of {', '.join(SOURCES)}")
+    if source in ("auto", "file"):
+        path = _hot_keys_file()
+        keys = read_hot_keys(path) if path else []
+        if application:
+            keys = [k for k in keys if k.application == application]
+        if keys or source == "file":
+            return keys[: limit or _top_k()]
+    hours = float(getattr(settings, "ACLCORE_WARMUP_LOOKBACK_HOURS", 24) if hours is None else hours)
+    return hot_keys_from_access_log(hours=hours, limit=limit, application=application)
+
+
+class _BufferedCache(CacheService):
+    """Decision cache that never hits and collects writes for one ``set_many``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.values: Dict[str, bool] = {}
+
+    @property
+    def degraded(self) -> bool:
+        return False
+
+    def get(self, application, user_id, method, normalized_path):
+        return None
+
+    def set(self, application, user_id, method, normalized_path, allowed):
+        self.values[self._key(application, user_id, method, normalized_path)] = allowed
+
+
+class _Pacer:
+    """Shared budget of computed entries per second across worker threads."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = float(rate or 0)
+        self.started = time.monotonic()
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self.issued += 1
+            ahead = self.issued / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _batched(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _missing(keys: Sequence[str]) -> List[str]:
+    present = cache_breaker.call(sharding.get_many, keys, fallback={})
+    return [key for key in keys if key not in present]
+
+
+def _warm_decisions(batch: Sequence[HotKey], pacer: _Pacer) -> Tuple[int, int, int]:
+    from .evaluation import EvaluationService
+
+    by_key = {CacheService._key(k.application, k.user_id, k.method, k.normalized_path): k for k in batch}
+    missing = _missing(list(by_key))
+    buffer = _BufferedCache()
+    service = EvaluationService(cache=buffer)
+    service.hot_keys = None  # warm-up traffic is not demand
+    errors = 0
+    for key in missing:
+        hot = by_key[key]
+        pacer.wait()
+        try:
+            service.evaluate(hot.user_id, hot.method, hot.normalized_path, application=hot.application)
+        except Exception:
+            errors += 1
+            logger.debug("warm-up evaluation failed for %s", key, exc_info=True)
+    if buffer.values:
+        cache_breaker.call(sharding.set_many, buffer.values, timeout=buffer.ttl_seconds)
+    return len(buffer.values), len(by_key) - len(missing), errors
+
+
+def _warm_routes(batch: Sequence[Tuple[str, Optional[str]]], pacer: _Pacer) -> Tuple[int, int, int]:
+    by_key = {_routes_cache_key(user_id, application): (user_id, application) for user_id, application in batch}
+    missing = _missing(list(by_key))
+    values: Dict[str, Any] = {}
+    errors = 0
+    with replica_reads():
+        for key in missing:
+            pacer.wait()
+            try:
+                values[key] = _query_routes(*by_key[key])
+            except Exception:
+                errors += 1
+                logger.debug("warm-up route list failed for %s", key, exc_info=True)
+    if values:
+        ttl = getattr(settings, "ACLCORE_CACHE_TTL_SECONDS", 3600)
+        cache_breaker.call(sharding.set_many, values, timeout=ttl)
+    return len(values), len(by_key) - len(missing), errors
+
+
+def _in_worker(task: Callable[..., Tuple[int, int, int]], *args: Any) -> Tuple[int, int, int]:
+    try:
+        return task(*args)
+    finally:
+        # pool threads open their own connection; don't leave it behind
+        connection.close()
+
+
+def warm(
+    keys: Sequence[HotKey],
+    workers: Optional[int] = None,
+    batch_size: int = 200,
+    max_per_second: Optional[float] = None,
+    decisions: bool = True,
+    routes: bool = True,
+) -> WarmupResult:
+    """
+    Precompute decisions for ``keys`` and route lists for their users. With
+    ``workers`` <= 1 everything runs in the calling thread.
+    """
+    started = time.monotonic()
+    result = WarmupResult(keys=len(keys))
+    if cache_breaker.is_open:
+        result.skipped_reason = "cache circuit breaker is open"
+        return result
+    workers = int(getattr(settings, "ACLCORE_WARMUP_WORKERS", 4) if workers is None else workers)
+    if max_per_second is None:
+        max_per_second = float(getattr(settings, "ACLCORE_WARMUP_MAX_PER_SECOND", 200))
+    pacer = _Pacer(max_per_second)
+    batch_size = max(1, int(batch_size))
+
+    tasks: List[Tuple[Callable[..., Tuple[int, int, int]], Sequence[Any], str]] = []
+    if decisions:
+        tasks += [(_warm_decisions, batch, "decisions") for batch in _batched(list(keys), batch_size)]
+    if routes:
+        users = list(dict.fromkeys((k.user_id, k.application) for k in keys))
+        tasks += [(_warm_routes, batch, "route_lists") for batch in _batched(users, batch_size)]
+
+    if workers <= 1:
+        outcomes = [(kind, task(batch, pacer)) for task, batch, kind in tasks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aclcore-warmup") as pool:
+            futures = [(kind, pool.submit(_in_worker, task, batch, pacer)) for task, batch, kind in tasks]
+            outcomes = [(kind, future.result()) for kind, future in futures]
+
+    for kind, (written, cached, errors) in outcomes:
+        setattr(result, kind, getattr(result, kind) + written)
+        result.already_cached += cached
+        result.errors += errors
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def _startup_warmup() -> None:
+    # one process per deploy warms; the others find the lock taken
+    if not cache_breaker.call(cache.add, _LOCK_KEY, os.getpid(), timeout=600, fallback=False):
+        return
+    try:
+        result = warm(load_hot_keys())
+        logger.info(
+            "ACL cache warm-up: %s decisions, %s route lists (%s already cached, %s errors) in %.1fs",
+            result.decisions,
+            result.route_lists,
+            result.already_cached,
+            result.errors,
+            result.seconds,
+        )
+    except Exception:
+        logger.exception("ACL cache warm-up failed")
+    finally:
+        connection.close()
+
+
+def _warm_on_first_request(sender, **kwargs: Any) -> None:
+    request_started.disconnect(_warm_on_first_request, dispatch_uid="aclcore-warmup")
+    threading.Thread(target=_startup_warmup, name="aclcore-warmup", daemon=True).start()
+
+
+def schedule_startup_warmup() -> None:
+    """Warm the cache in the background once this process serves its first request."""
+    request_started.connect(_warm_on_first_request, dispatch_uid="aclcore-warmup")
@@ -0,0 +1,130 @@
+"""
+Per-process write-behind buffer for request bookkeeping.
+
+Login timestamps and counters are recorded in memory and flushed after a
+response has been sent (``request_finished``) once ``ACLCORE_WRITE_BEHIND_FLUSH_SECONDS``
+have passed or ``ACLCORE_WRITE_BEHIND_MAX_PENDING`` rows are buffered, and at
+process exit. Repeated updates to the same row coalesce; each model is
+written with one ``UPDATE ... SET col = CASE pk WHEN ... END`` and all counters
+with one pipelined round trip. A flush interval of 0 writes through.
+
+Buffered updates bypass ``save()`` and its signals, and are lost if the
+process is killed before flushing.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+
+from .metrics import increment_many
+
+
+logger = logging.getLogger(__name__)
+
+RowKey = Tuple[Type[models.Model], Any]
+
+
+class WriteBehindBuffer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (model, pk) → {field: value}; set_once fields only keep their first value
+        self._rows: Dict[RowKey, Dict[str, Any]] = {}
+        self._set_once: Dict[Type[models.Model], set] = {}
+        self._counters: Counter = Counter()
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _interval() -> float:
+        return float(getattr(settings, "ACLCORE_WRITE_BEHIND_FLUSH_SECONDS", 2.0))
+
+    @staticmethod
+    def _max_pending() -> int:
+        return int(getattr(settings, "ACLCORE_WRITE_BEHIND_MAX_PENDING", 1000))
+
+    def update(self, model: Type[models.Model], pk: Any, values: Dict[str, Any], set_once: Iterable[str] = ()) -> None:
+        """
+        Buffer ``UPDATE model SET values WHERE pk``. Fields in ``set_once`` are
+        only written while NULL (e.g. ``first_login``).
+        """
+        set_once = set(set_once)
+        with self._lock:
+            row = self._rows.setdefault((model, pk), {})
+            for field, value in values.items():
+                if field in set_once and field in row:
+                    continue
+                row[field] = value
+            if set_once:
+                self._set_once.setdefault(model, set()).update(set_once)
+        if self._interval() <= 0:
+            self.flush()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+        if self._interval() <= 0:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows) + len(self._counters)
+
+    def maybe_flush(self) -> None:
+        due = time.monotonic() - self._last_flush >= self._interval()
+        if (due or self.pending() >= self._max_pending()) and self.pending():
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, {}
+            set_once, self._set_once = self._set_once, {}
+            counters, self._counters = self._counters, Counter()
+            self._last_flush = time.monotonic()
+
+        by_model: Dict[Type[models.Model], Dict[Any, Dict[str, Any]]] = {}
+        for (model, pk), values in rows.items():
+            by_model.setdefault(model, {})[pk] = values
+        for model, pk_values in by_model.items():
+            try:
+                self._write_model(model, pk_values, set_once.get(model, set()))
+            except Exception:
+                logger.exception("write-behind: flushing %s failed", model.__name__)
+        if counters:
+            increment_many(counters)
+
+    @staticmethod
+    def _write_model(model: Type[models.Model], pk_values: Dict[Any, Dict[str, Any]], set_once: set) -> None:
+        fields = sorted({field for values in pk_values.values() for field in values})
+        assignments = {}
+        for field in fields:
+            output_field = model._meta.get_field(field)
+            whens = [
+                When(pk=pk, then=Value(values[field], output_field=output_field))
+                for pk, values in pk_values.items()
+                if field in values
+            ]
+            expr = Case(*whens, default=F(field), output_field=output_field)
+            assignments[field] = Coalesce(F(field), expr, output_field=output_field) if field in set_once else expr
+        model._base_manager.filter(pk__in=list(pk_values)).update(**assignments)
+
+
+write_behind = WriteBehindBuffer()
+atexit.register(write_behind.flush)
+
+
+@receiver(request_finished)
+def _flush_after_response(sender, **kwargs: Any) -> None:
+    try:
+        write_behind.maybe_flush()
+    except Exception:
+        logger.exception("write-behind: flush failed")
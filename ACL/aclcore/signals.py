@@ -1,23 +1,211 @@
 from __future__ import annotations
 
-import random
 from typing import Any
 
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
 
+from aclcore.models import ACLApplication, ACLRole, ACLRoleParent, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+
 # allowed, reason, user_id, application, method, path, matched_route_id, sampling_rate
+# No receiver is connected by default: projects connect their own logging sink
+# (and apply sampling_rate there); with no receivers the middleware skips the send.
 access_checked = Signal()
 
 
-@receiver(access_checked)
-def _sampled_logger(sender, **kwargs: Any):
-    sampling_rate: float = float(kwargs.get("sampling_rate", 1.0) or 1.0)
-    if sampling_rate <= 0:
-        return
-    if sampling_rate < 1.0 and random.random() > sampling_rate:
+@receiver(post_save, sender=ACLApplication)
+@receiver(post_save, sender=ACLRole)
+@receiver(post_delete, sender=ACLRole)
+@receiver(post_save, sender=ACLRoute)
+@receiver(post_delete, sender=ACLRoute)
+@receiver(post_save, sender=ACLRoleRoutePermission)
+@receiver(post_delete, sender=ACLRoleRoutePermission)
+@receiver(post_save, sender=ACLUserRole)
+@receiver(post_delete, sender=ACLUserRole)
+def _pin_reads_to_primary(sender, **kwargs: Any):
+    # read-your-writes: replicas may lag behind this change
+    from aclcore.services.replicas import mark_policy_write
+
+    mark_policy_write()
+
+
+@receiver(post_save, sender=ACLRole)
+@receiver(post_delete, sender=ACLRole)
+@receiver(post_save, sender=ACLRoute)
+@receiver(post_delete, sender=ACLRoute)
+@receiver(post_save, sender=ACLUserRole)
+@receiver(post_delete, sender=ACLUserRole)
+def _bump_policy_version(sender, instance, **kwargs: Any):
+    # snapshots built from an older version stop answering
+    from aclcore.services import policy_version
+
+    policy_version.bump([instance.application_id])
+
+
+@receiver(post_save, sender=ACLRoleRoutePermission)
+@receiver(post_delete, sender=ACLRoleRoutePermission)
+@receiver(post_save, sender=ACLRoleParent)
+@receiver(post_delete, sender=ACLRoleParent)
+def _bump_policy_version_for_role(sender, instance, **kwargs: Any):
+    from aclcore.services import policy_version
+
+    policy_version.bump_for_roles([instance.role_id])
+
+
+@receiver(post_save, sender=ACLApplication)
+@receiver(post_delete, sender=ACLApplication)
+def _application_changed(sender, instance: ACLApplication, **kwargs: Any):
+    from aclcore.services import invalidation
+
+    invalidation.forget_application(instance.pk)
+
+
+# The receivers below only queue work; holders are resolved and their cached
+# route lists / manifests dropped in one batch after commit.
+
+
+@receiver(post_save, sender=ACLUserRole)
+@receiver(post_delete, sender=ACLUserRole)
+def _user_role_changed(sender, instance: ACLUserRole, **kwargs: Any):
+    from aclcore.services import invalidation
+
+    invalidation.record(users=[(instance.user_id, invalidation.application_name(instance.application_id))])
+
+
+@receiver(post_save, sender=ACLRoleRoutePermission)
+@receiver(post_delete, sender=ACLRoleRoutePermission)
+def _role_permission_changed(sender, instance: ACLRoleRoutePermission, **kwargs: Any):
+    from aclcore.services import invalidation
+
+    # Only users holding the affected role (or a role inheriting it) need a fresh manifest
+    invalidation.record(role_ids=[instance.role_id])
+
+
+@receiver(post_save, sender=ACLRoute)
+def _route_changed(sender, instance: ACLRoute, created: bool = False, **kwargs: Any):
+    from aclcore.services import invalidation
+
+    # is_active / is_ignored / is_sensitive / path changes alter holders' route lists; new routes have no bindings
+    if not created:
+        invalidation.record(route_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=ACLRoute)
+def _route_deleting(sender, instance: ACLRoute, **kwargs: Any):
+    from aclcore.services import invalidation
+
+    # the bindings are gone by the time the batch is flushed
+    role_ids = ACLRoleRoutePermission.objects.filter(route_id=instance.pk).values_list("role_id", flat=True)
+    invalidation.record(role_ids=list(role_ids))
+
+
+@receiver(post_save, sender=ACLUserRole)
+@receiver(post_delete, sender=ACLUserRole)
+def _maintain_effective_for_user(sender, instance: ACLUserRole, **kwargs: Any):
+    from aclcore.services import effective
+
+    if effective.is_enabled():
+        effective.EffectivePermissionService().refresh_users(instance.application_id, [instance.user_id])
+
+
+@receiver(post_save, sender=ACLRoleRoutePermission)
+@receiver(post_delete, sender=ACLRoleRoutePermission)
+def _maintain_effective_for_binding(sender, instance: ACLRoleRoutePermission, **kwargs: Any):
+    from aclcore.services import effective
+
+    if effective.is_enabled():
+        effective.EffectivePermissionService().refresh_role_route(instance.role_id, instance.route_id)
+
+
+@receiver(post_save, sender=ACLRoute)
+def _maintain_effective_for_route(sender, instance: ACLRoute, created: bool = False, **kwargs: Any):
+    from aclcore.services import effective
+
+    # New routes have no bindings yet; deletes cascade to the table
+    if effective.is_enabled() and not created:
+        effective.EffectivePermissionService().refresh_routes(instance.application_id, [instance.pk])
+
+
+def _hierarchy_changed(role_ids) -> None:
+    """Parents of ``role_ids`` changed: fix the closure, then what holders below them see."""
+    from aclcore.services import effective, invalidation, policy_version, role_hierarchy
+    from aclcore.services.replicas import mark_policy_write
+
+    role_hierarchy.refresh(role_ids)
+    mark_policy_write()
+    policy_version.bump_for_roles(role_ids)
+    invalidation.record(role_ids=role_ids)
+    if effective.is_enabled():
+        holders = ACLUserRole.objects.filter(role_id__in=role_hierarchy.descendants(list(role_ids)))
+        users_by_app: dict = {}
+        for user_id, app_id in holders.values_list("user_id", "application_id").iterator():
+            users_by_app.setdefault(app_id, set()).add(user_id)
+        service = effective.EffectivePermissionService()
+        for app_id, user_ids in users_by_app.items():
+            service.refresh_users(app_id, user_ids)
+
+
+@receiver(post_save, sender=ACLRole)
+def _add_role_to_closure(sender, instance: ACLRole, created: bool = False, **kwargs: Any):
+    from aclcore.services import role_hierarchy
+
+    if created:
+        role_hierarchy.add_roles([instance.pk])
+
+
+@receiver(pre_delete, sender=ACLRole)
+def _role_deleting(sender, instance: ACLRole, **kwargs: Any):
+    from aclcore.services import role_hierarchy
+
+    # the cascade drops the role's edges and closure rows; its children are refreshed once it is gone
+    instance._aclcore_children = list(
+        ACLRoleParent.objects.filter(parent_id=instance.pk).values_list("role_id", flat=True)
+    )
+    role_hierarchy.begin_delete([instance.pk])
+
+
+@receiver(post_delete, sender=ACLRole)
+def _role_deleted(sender, instance: ACLRole, **kwargs: Any):
+    from aclcore.services import role_hierarchy
+
+    role_hierarchy.end_delete([instance.pk])
+    children = getattr(instance, "_aclcore_children", None)
+    if children:
+        _hierarchy_changed(children)
+
+
+@receiver(pre_save, sender=ACLRoleParent)
+def _check_role_parent(sender, instance: ACLRoleParent, raw: bool = False, **kwargs: Any):
+    from aclcore.services import role_hierarchy
+
+    if not raw:
+        role_hierarchy.check_parent(instance.role_id, instance.parent_id)
+
+
+@receiver(post_save, sender=ACLRoleParent)
+@receiver(post_delete, sender=ACLRoleParent)
+def _role_parent_changed(sender, instance: ACLRoleParent, **kwargs: Any):
+    from aclcore.services import role_hierarchy
+
+    if role_hierarchy.is_deleting(instance.role_id) or role_hierarchy.is_deleting(instance.parent_id):
         return
-    # no logging sink by default; projects can connect their own receivers
-    # this default receiver is a no-op (kept for future extension)
-    return
+    _hierarchy_changed([instance.role_id])
+
 
+@receiver(m2m_changed, sender=ACLRole.parents.through)
+def _role_parents_m2m_changed(sender, instance: ACLRole, action: str, reverse: bool, pk_set=None, **kwargs: Any):
+    # role.parents.add()/remove()/clear() (and role.children.*) bypass the through model's save/delete
+    from aclcore.services import role_hierarchy
 
+    if action == "pre_add":
+        for pk in pk_set or ():
+            child, parent = (pk, instance.pk) if reverse else (instance.pk, pk)
+            role_hierarchy.check_parent(child, parent)
+    elif action == "pre_clear" and reverse:
+        instance._aclcore_children = list(
+            ACLRoleParent.objects.filter(parent_id=instance.pk).values_list("role_id", flat=True)
+        )
+    elif action in ("post_add", "post_remove"):
+        _hierarchy_changed(list(pk_set or ()) if reverse else [instance.pk])
+    elif action == "post_clear":
+        _hierarchy_changed(getattr(instance, "_aclcore_children", []) if reverse else [instance.pk])
@@ -1,3 +1,1023 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from base.models import uuid7
+from aclcore.models import (
+    ACLAccessLog,
+    ACLApplication,
+    ACLCacheEntry,
+    ACLEffectivePermission,
+    ACLRole,
+    ACLRoleClosure,
+    ACLRoleParent,
+    ACLRoleRoutePermission,
+    ACLRoute,
+    ACLUserRole,
+)
+from aclcore.services import CacheService, EffectivePermissionService, EvaluationService, RoleService, RouteRegistryService
+from aclcore.decision import DecisionApp
+from aclcore.middleware import HttpAclMiddleware
+from aclcore.signals import access_checked
+from aclcore.services import access_log, profiler, query_plans, transfer
+from aclcore.services import invalidation, metrics, policy_version, replicas, role_hierarchy, sharding, warmup
+from aclcore.services.breaker import cache_breaker
+from aclcore.routers import ReadReplicaRouter
+from aclcore.services.matrix import PolicyMatrix
+from aclcore.services.manifest import _manifest_key, build_manifest
+from aclcore.services.staff_routes import _routes_cache_key, build_routes_for_user
+from aclcore.services.snapshot import PolicySnapshot, snapshot_store, write_snapshot
+from aclcore.services.route_registry import pattern_to_template
+
+
+@override_settings(ACLCORE_EFFECTIVE_PERMISSIONS=True)
+class EffectivePermissionTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.app = ACLApplication.objects.create(name="shop")
+        self.viewer = ACLRole.objects.create(application=self.app, name="viewer")
+        self.blocked = ACLRole.objects.create(application=self.app, name="blocked")
+        self.route = ACLRoute.objects.create(
+            application=self.app, path="/api/items/", normalized_path="/api/items", method="GET"
+        )
+        ACLRoleRoutePermission.objects.create(role=self.viewer, route=self.route, is_allowed=True)
+        ACLUserRole.objects.create(user_id="u1", application=self.app, role=self.viewer)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def _row(self, user_id="u1"):
+        return ACLEffectivePermission.objects.filter(user_id=user_id, route=self.route).first()
+
+    def test_maintained_incrementally_with_deny_precedence(self):
+        self.assertTrue(self._row().is_allowed)
+
+        ACLRoleRoutePermission.objects.create(role=self.blocked, route=self.route, is_allowed=False)
+        ACLUserRole.objects.create(user_id="u1", application=self.app, role=self.blocked)
+        self.assertFalse(self._row().is_allowed)
+
+        self.route.is_active = False
+        self.route.save()
+        self.assertIsNone(self._row())
+
+    def test_miss_path_is_single_lookup(self):
+        with self.assertNumQueries(1):
+            result = EvaluationService().evaluate(user_id="u1", method="GET", path="/api/items/", application="shop")
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.reason, "explicit-allow")
+
+    def test_check_and_rebuild(self):
+        ACLEffectivePermission.objects.all().delete()
+        service = EffectivePermissionService()
+        [report] = service.check(application="shop")
+        self.assertEqual(report.missing, 1)
+
+        service.rebuild(application="shop")
+        [report] = service.check(application="shop")
+        self.assertTrue(report.consistent)
+
+
+class RouteSyncTests(TestCase):
+    def test_pattern_to_template(self):
+        self.assertEqual(pattern_to_template("api/^users/(?P<pk>[^/.]+)/$"), "/api/users/{pk}/")
+        self.assertEqual(pattern_to_template("api/items/<int:item_id>/"), "/api/items/{item_id}/")
+        self.assertEqual(pattern_to_template("api/auth/login/"), "/api/auth/login/")
+
+    def test_sync_diffs_in_bulk(self):
+        registry = RouteRegistryService()
+        result = registry.sync([("/api/a/", "GET"), ("/api/a/", "POST"), ("/api/b/", "GET")], application="shop")
+        self.assertEqual((result.created, result.updated, result.deactivated), (3, 0, 0))
+
+        with self.assertNumQueries(6):
+            # savepoint, app lookup, one diff read, bulk insert, bulk update, release
+            result = registry.sync([("/api/a/", "GET"), ("/api/c/", "DELETE")], application="shop")
+        self.assertEqual((result.created, result.deactivated, result.unchanged), (1, 2, 1))
+        active = set(ACLRoute.objects.filter(is_active=True).values_list("path", "method"))
+        self.assertEqual(active, {("/api/a/", "GET"), ("/api/c/", "DELETE")})
+
+    def test_sync_command_keeps_digest_in_database(self):
+        call_command("aclcore_sync_routes", application="shop", stdout=io.StringIO())
+        self.assertTrue(ACLApplication.objects.get(name="shop").routes_digest)
+        cache.clear()
+        out = io.StringIO()
+        call_command("aclcore_sync_routes", application="shop", stdout=out)
+        self.assertIn("nothing to sync", out.getvalue())
+
+    def test_migration_moves_pattern_routes_to_templates(self):
+        from django.apps import apps
+        from importlib import import_module
+
+        adopt_templates = import_module("aclcore.migrations.0011_route_templates").adopt_templates
+        app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=app, name="viewer")
+        editor = ACLRole.objects.create(application=app, name="editor")
+        old_item = ACLRoute.objects.create(application=app, path="^api/items/(?P<pk>[^/.]+)/$", method="GET", is_active=False)
+        new_item = ACLRoute.objects.create(application=app, path="/api/items/{pk}/", method="GET")
+        old_users = ACLRoute.objects.create(application=app, path="api/users/<int:pk>/", method="GET")
+        ACLRoleRoutePermission.objects.create(role=viewer, route=old_item, is_allowed=False)
+        ACLRoleRoutePermission.objects.create(role=editor, route=old_item, is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=editor, route=new_item, is_allowed=False)
+        ACLRoleRoutePermission.objects.create(role=viewer, route=old_users, is_allowed=True)
+
+        adopt_templates(apps, None)
+
+        self.assertFalse(ACLRoute.objects.filter(pk=old_item.pk).exists())
+        bindings = set(ACLRoleRoutePermission.objects.values_list("role__name", "route__path", "is_allowed"))
+        self.assertEqual(
+            bindings,
+            {
+                ("viewer", "/api/items/{pk}/", False),
+                ("editor", "/api/items/{pk}/", False),
+                ("viewer", "/api/users/{pk}/", True),
+            },
+        )
+        self.assertEqual(ACLRoute.objects.get(pk=old_users.pk).normalized_path, "/api/users/{pk}")
+
+
+class StreamingImportTests(TestCase):
+    dump = {
+        "applications": [{"id": "a1", "name": "shop", "description": None}],
+        "routes": [
+            {"id": "r1", "application_id": "a1", "path": "/api/x/", "normalized_path": "/api/x", "method": "GET"},
+        ],
+        "roles": [{"id": "ro1", "application_id": "a1", "name": "viewer"}, {"id": "ro2", "application_id": "a1", "name": "editor"}],
+        "role_parents": [{"id": "p1", "role_id": "ro2", "parent_id": "ro1"}],
+        "role_route": [{"id": "m1", "role_id": "ro1", "route_id": "r1", "is_allowed": True}],
+        "user_roles": [{"id": f"ur{i}", "user_id": f"u{i}", "application_id": "a1", "role_id": "ro1"} for i in range(7)],
+    }
+
+    def _import(self, text: str, batch_size: int = 3):
+        with mock.patch.object(transfer, "_READ_CHUNK", 16):
+            records = transfer.iter_records(io.StringIO(text))
+            return transfer.PolicyImporter(batch_size=batch_size).run(records)
+
+    def test_legacy_json_parsed_incrementally(self):
+        counts = self._import(json.dumps(self.dump, indent=2))
+        self.assertEqual(counts["user_roles"], 7)
+        self.assertEqual(ACLUserRole.objects.filter(role__name="viewer").count(), 7)
+        self.assertTrue(ACLRoleRoutePermission.objects.filter(route__path="/api/x/", is_allowed=True).exists())
+
+    def test_import_invalidates_cached_decisions_and_route_lists(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        CacheService().set("shop", "u0", "GET", "/api/x", False)
+        cache.set(_routes_cache_key("u0", "shop"), [])
+        cache.set(_routes_cache_key("u0", None), [])
+        cache.set(_routes_cache_key("other", "blog"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self._import(json.dumps(self.dump))
+        self.assertIsNone(CacheService().get("shop", "u0", "GET", "/api/x"))
+        self.assertIsNone(cache.get(_routes_cache_key("u0", "shop")))
+        self.assertIsNone(cache.get(_routes_cache_key("u0", None)))
+        self.assertEqual(cache.get(_routes_cache_key("other", "blog")), [])
+
+    def test_ndjson_import_is_idempotent(self):
+        lines = [json.dumps({"table": t, "row": row}) for t in transfer.TABLES for row in self.dump[t]]
+        self._import("\n".join(lines))
+        self._import("\n".join(lines))
+        self.assertEqual(ACLUserRole.objects.count(), 7)
+        self.assertEqual(ACLRoute.objects.count(), 1)
+        editor = ACLRole.objects.get(name="editor")
+        self.assertEqual(set(role_hierarchy.expand([editor.pk])), {editor.pk, ACLRole.objects.get(name="viewer").pk})
+
+    def test_export_roundtrip_ndjson_gzip(self):
+        self._import(json.dumps(self.dump))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "policy.ndjson.gz")
+            counts = transfer.export_policy(path, chunk_size=2)
+            with transfer.open_text(path) as f:
+                tables = [table for table, _row in transfer.iter_records(f)]
+        self.assertEqual(counts["user_roles"], 7)
+        self.assertEqual(tables.count("user_roles"), 7)
+        self.assertEqual(tables[0], "applications")
+
+
+class PolicySnapshotTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=app, name="viewer")
+        blocked = ACLRole.objects.create(application=app, name="blocked")
+        idle = ACLRole.objects.create(application=app, name="idle")
+        routes = {}
+        for path, method, ignored in [("/a", "GET", False), ("/b", "GET", False), ("/c", "POST", False), ("/health", "GET", True)]:
+            routes[path] = ACLRoute.objects.create(
+                application=app, path=path, normalized_path=path, method=method, is_ignored=ignored
+            )
+        ACLRoleRoutePermission.objects.create(role=viewer, route=routes["/a"], is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=viewer, route=routes["/b"], is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=blocked, route=routes["/b"], is_allowed=False)
+        ACLUserRole.objects.create(user_id="u1", application=app, role=viewer)
+        ACLUserRole.objects.create(user_id="u1", application=app, role=blocked)
+        ACLUserRole.objects.create(user_id="u2", application=app, role=idle)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_snapshot_matches_database_evaluation(self):
+        cases = [
+            ("u1", "GET", "/a"), ("u1", "GET", "/b"), ("u1", "POST", "/c"), ("u2", "GET", "/a"),
+            ("nobody", "GET", "/a"), ("u1", "GET", "/missing"), ("nobody", "GET", "/health"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shop.aclsnap")
+            write_snapshot("shop", path)
+            snap = PolicySnapshot(path)
+            for user_id, method, p in cases:
+                expected = EvaluationService().evaluate(user_id=user_id, method=method, path=p, application="shop")
+                cache.clear()
+                allowed, reason, _route_id = snap.evaluate(user_id, method, p)
+                self.assertEqual((allowed, reason), (expected.allowed, expected.reason), (user_id, method, p))
+            snap.close()
+
+    def test_evaluation_uses_hot_swapped_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ACLCORE_SNAPSHOT_DIR=tmp, ACLCORE_SNAPSHOT_CHECK_SECONDS=0):
+            write_snapshot("shop", os.path.join(tmp, "shop.aclsnap"))
+            policy_version.current("shop")  # the version check reads through the cache once
+            with self.assertNumQueries(0):
+                result = EvaluationService().evaluate(user_id="u1", method="GET", path="/a", application="shop")
+            self.assertEqual(result.reason, "explicit-allow")
+
+            ACLUserRole.objects.filter(user_id="u1").delete()
+            write_snapshot("shop", os.path.join(tmp, "shop.aclsnap"))
+            cache.clear()
+            policy_version.current("shop")
+            with self.assertNumQueries(0):
+                result = EvaluationService().evaluate(user_id="u1", method="GET", path="/a", application="shop")
+            self.assertEqual(result.reason, "no-roles")
+
+    def test_stale_snapshot_falls_back_to_database(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ACLCORE_SNAPSHOT_DIR=tmp, ACLCORE_SNAPSHOT_CHECK_SECONDS=0):
+            write_snapshot("shop", os.path.join(tmp, "shop.aclsnap"))
+            self.assertIsNotNone(snapshot_store.get("shop"))
+
+            # a new deny binding after the snapshot was written must win right away
+            blocked = ACLRole.objects.get(name="blocked")
+            ACLRoleRoutePermission.objects.create(role=blocked, route=ACLRoute.objects.get(path="/a"), is_allowed=False)
+            cache.clear()
+            self.assertIsNone(snapshot_store.get("shop"))
+            result = EvaluationService().evaluate(user_id="u1", method="GET", path="/a", application="shop")
+            self.assertEqual((result.allowed, result.reason), (False, "explicit-deny"))
+
+            write_snapshot("shop", os.path.join(tmp, "shop.aclsnap"))
+            cache.clear()
+            self.assertIsNotNone(snapshot_store.get("shop"))
+            # one bump per transaction, however many rows change
+            version = policy_version.current("shop")
+            with transaction.atomic():
+                for user_id in ("u3", "u4", "u5"):
+                    ACLUserRole.objects.create(user_id=user_id, application=blocked.application, role=blocked)
+            self.assertEqual(policy_version.current("shop"), version + 1)
+            self.assertIsNone(snapshot_store.get("shop"))
+            result = EvaluationService().evaluate(user_id="u1", method="GET", path="/a", application="shop")
+            self.assertEqual((result.allowed, result.reason), (False, "explicit-deny"))
+
+
+class FakerCommandTests(TestCase):
+    def _seed(self):
+        call_command(
+            "faker", applications=2, routes=30, roles=4, users=25, binding_density=0.5,
+            max_roles_per_user=3, seed=7, replace=True, stdout=io.StringIO(),
+        )
+        return sorted(ACLUserRole.objects.values_list("id", "user_id", "role__name"))
+
+    def test_same_seed_generates_same_policy(self):
+        first = self._seed()
+        self.assertEqual(self._seed(), first)
+        self.assertEqual(ACLApplication.objects.count(), 2)
+        # every user holds the default role
+        self.assertEqual(ACLUserRole.objects.filter(role__is_default=True).count(), 50)
+        # time-ordered tables get UUIDv7 ids
+        for model in (ACLUserRole, ACLRoleRoutePermission):
+            ids = list(model.objects.order_by("created_at", "id").values_list("id", flat=True))
+            self.assertEqual({pk.version for pk in ids}, {7})
+            self.assertEqual(len(set(ids)), len(ids))
+
+    def test_route_templates_option_replaces_defaults(self):
+        call_command(
+            "faker", applications=1, routes=10, users=2, seed=7, stdout=io.StringIO(),
+            route_templates=["/v2/{app}/{resource}/{{pk}}/"],
+        )
+        paths = set(ACLRoute.objects.values_list("path", flat=True))
+        self.assertEqual(len(paths), 10)
+        self.assertTrue(all(p.startswith("/v2/app1/") and p.endswith("/{pk}/") for p in paths))
+        with self.assertRaises(CommandError):
+            call_command("faker", applications=1, app_prefix="other", route_templates=["/v2/{app}/"], stdout=io.StringIO())
+
+
+class ProfilerTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        app = ACLApplication.objects.create(name="shop")
+        ACLRoute.objects.create(application=app, path="/a/", normalized_path="/a", method="GET")
+        self.request = RequestFactory().get("/a/", HTTP_X_USER_ID="u1", HTTP_X_ACL_APP="shop")
+
+    def tearDown(self) -> None:
+        profiler.reset()
+        cache.clear()
+
+    def test_fingerprint_collapses_literals_and_lists(self):
+        self.assertEqual(
+            profiler.fingerprint("SELECT * FROM t WHERE id IN (%s, %s,  %s) AND name = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (?+) AND name = ? LIMIT ?",
+        )
+
+    def test_sampled_request_is_aggregated(self):
+        with override_settings(ACLCORE_PROFILER_SAMPLE_RATE=1.0):
+            HttpAclMiddleware(lambda r: HttpResponse())(self.request)
+        data = profiler.report()
+        self.assertEqual(data["requests"], 1)
+        self.assertTrue(data["sql"])
+        self.assertEqual({row["op"] for row in data["cache"]}, {"get", "set"})
+        self.assertEqual(data["slowest"][0]["path"], "/a/")
+        # the patched cache methods are gone once the request is done
+        self.assertNotIn("get", vars(caches["default"]))
+
+    def test_sampled_request_times_every_cache_shard(self):
+        with override_settings(
+            CACHES=SHARDED_CACHES, ACLCORE_CACHE_SHARDS=["shard1", "shard2", "shard3"], ACLCORE_PROFILER_SAMPLE_RATE=1.0
+        ):
+            with mock.patch.object(profiler._aggregate, "add") as add:
+                HttpAclMiddleware(lambda r: HttpResponse())(self.request)
+            [profile] = [c.args[0] for c in add.call_args_list]
+            # decision cache keys live on a shard, never on "default"
+            self.assertEqual({op for op, _ms, _hit in profile.cache_calls}, {"get", "set"})
+            for alias in SHARDED_CACHES:
+                self.assertNotIn("get", vars(caches[alias]))
+
+    def test_unsampled_requests_skip_profiler(self):
+        with mock.patch.object(profiler, "RequestProfile") as profile:
+            HttpAclMiddleware(lambda r: HttpResponse())(self.request)
+        profile.assert_not_called()
+        self.assertEqual(profiler.report()["requests"], 0)
+
+
+class HttpAclMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        app = ACLApplication.objects.create(name="shop")
+        ACLRoute.objects.create(application=app, path="/a/", normalized_path="/a", method="GET")
+        self.middleware = HttpAclMiddleware(lambda r: HttpResponse(b"ok"))
+        self.factory = RequestFactory()
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_deny_bodies_and_bypass(self):
+        request = self.factory.get("/a/", HTTP_X_USER_ID="u1", HTTP_X_ACL_APP="shop")
+        for reason in ("no-roles", "cache-hit"):
+            response = self.middleware(request)
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(json.loads(response.content), {"detail": "forbidden", "reason": reason})
+        self.assertEqual(self.middleware(self.factory.get("/a/")).status_code, 401)
+        self.assertEqual(self.middleware(self.factory.get("/health/x")).content, b"ok")
+
+    def test_cache_hits_share_results_and_signal_only_sent_to_listeners(self):
+        service = EvaluationService()
+        service.evaluate(user_id="u1", method="GET", path="/a/", application="shop")
+        first = service.evaluate(user_id="u1", method="GET", path="/a/", application="shop")
+        self.assertEqual(first.reason, "cache-hit")
+        self.assertIs(service.evaluate(user_id="u1", method="GET", path="/a", application="shop"), first)
+        request = self.factory.get("/a/", HTTP_X_USER_ID="u1", HTTP_X_ACL_APP="shop")
+        with mock.patch.object(access_checked, "send") as send:
+            self.middleware(request)
+        send.assert_not_called()
+        seen = []
+        access_checked.connect(lambda sender, **kw: seen.append(kw["reason"]), weak=False, dispatch_uid="test-listener")
+        try:
+            self.middleware(request)
+        finally:
+            access_checked.disconnect(dispatch_uid="test-listener")
+        self.assertEqual(seen, ["cache-hit"])
+
+
+class CachePurgeTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        cache.set("aclcore:cache:shop:u1:GET:/a", True)
+        cache.set("aclcore:cache:shop:u1:POST:/a", True)
+        cache.set("aclcore:cache:shop:u2:GET:/a", False)
+        cache.set("aclcore:cache:blog:u1:GET:/a", True)
+        cache.set("aclcore:routes:shop:u1", [])
+        cache.set("aclcore:metric:hits", 3)
+        cache.set("session:abc", {"admin_staff_id": "s1"})
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_scoped_purge_keeps_other_keys(self):
+        call_command("aclcore_clear_cache", application="shop", user="u1", max_deletes_per_second=0, stdout=io.StringIO())
+        self.assertIsNone(cache.get("aclcore:cache:shop:u1:GET:/a"))
+        self.assertIsNone(cache.get("aclcore:routes:shop:u1"))
+        self.assertFalse(cache.get("aclcore:cache:shop:u2:GET:/a"))
+        self.assertTrue(cache.get("aclcore:cache:blog:u1:GET:/a"))
+        self.assertEqual(cache.get("aclcore:metric:hits"), 3)
+        self.assertIsNotNone(cache.get("session:abc"))
+
+    def test_route_scope_and_families(self):
+        from aclcore.services.purge import purge
+
+        result = purge(["decisions"], route="GET /a/")
+        self.assertEqual(result.deleted, 3)
+        self.assertTrue(cache.get("aclcore:cache:shop:u1:POST:/a"))
+
+        purge(["metrics"])
+        self.assertIsNone(cache.get("aclcore:metric:hits"))
+        self.assertIsNotNone(cache.get("aclcore:routes:shop:u1"))
+
+
+class ManifestInvalidationTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        # flush the fixtures' batch so the tests' changes start a new one
+        with self.captureOnCommitCallbacks(execute=True):
+            app = ACLApplication.objects.create(name="shop")
+            self.viewer = ACLRole.objects.create(application=app, name="viewer")
+            other = ACLRole.objects.create(application=app, name="other")
+            self.route = ACLRoute.objects.create(
+                application=app, path="/api/items/", normalized_path="/api/items", method="GET"
+            )
+            ACLRoleRoutePermission.objects.create(role=self.viewer, route=self.route, is_allowed=True)
+            for user_id, role in (("u1", self.viewer), ("u2", self.viewer), ("u3", other)):
+                ACLUserRole.objects.create(user_id=user_id, application=app, role=role)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def _cached(self):
+        return {user_id for user_id in ("u1", "u2", "u3") if cache.get(_routes_cache_key(user_id, "shop")) is not None}
+
+    def _build(self):
+        for user_id in ("u1", "u2", "u3"):
+            build_routes_for_user(user_id, "shop")
+
+    def test_binding_changes_invalidate_holders_once_after_commit(self):
+        self._build()
+        with self.captureOnCommitCallbacks() as callbacks:
+            binding = ACLRoleRoutePermission.objects.get(role=self.viewer)
+            binding.is_allowed = False
+            binding.save()
+            ACLUserRole.objects.create(user_id="u3", application=self.viewer.application, role=self.viewer)
+        self.assertEqual(self._cached(), {"u1", "u2", "u3"})
+        flushes = [fn for fn in callbacks if getattr(fn, "__func__", None) is invalidation._Pending.flush]
+        self.assertEqual(len(flushes), 1)
+        flushes[0]()
+        self.assertEqual(self._cached(), set())
+
+    def test_route_changes_invalidate_holders(self):
+        self._build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.is_active = False
+            self.route.save()
+        self.assertEqual(self._cached(), {"u3"})
+        self.assertEqual(build_routes_for_user("u1", "shop"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.is_active = True
+            self.route.save()
+        self._build()
+        # the route sync writes in bulk, without post_save
+        with self.captureOnCommitCallbacks(execute=True):
+            RouteRegistryService().sync([("/api/other/", "GET")], application="shop")
+        self.assertEqual(self._cached(), {"u3"})
+
+        self._build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.delete()
+        self.assertEqual(self._cached(), {"u3"})
+
+
+class PolicyMatrixTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        call_command(
+            "faker", applications=1, routes=40, roles=5, users=30, binding_density=0.4,
+            max_roles_per_user=3, seed=11, replace=True, stdout=io.StringIO(),
+        )
+        self.app = ACLApplication.objects.get()
+        self.matrix = PolicyMatrix(self.app.name)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_matrix_matches_evaluation(self):
+        user_ids = sorted(set(ACLUserRole.objects.values_list("user_id", flat=True)))[:6]
+        for r in range(self.matrix.n_routes):
+            method, _ = self.matrix.route_keys[r]
+            allowed = set(self.matrix.user_ids_of(self.matrix.users_for_route(r)))
+            for user_id in user_ids:
+                cache.clear()
+                expected = EvaluationService().evaluate(
+                    user_id=user_id, method=method, path=self.matrix.route_paths[r], application=self.app.name
+                )
+                self.assertEqual(user_id in allowed, expected.allowed, (user_id, self.matrix.route_label(r)))
+                self.assertEqual(bool(self.matrix.routes_for_user(user_id) >> r & 1), expected.allowed)
+
+    def test_remove_role_impact_matches_recomputation(self):
+        role = ACLRole.objects.filter(application=self.app, is_default=False).order_by("name").first()
+        report = self.matrix.impact_remove_role(role.name, sample=1000)
+        before = {r: self.matrix.users_for_route(r) for r in range(self.matrix.n_routes)}
+
+        ACLUserRole.objects.filter(role=role).delete()
+        after = PolicyMatrix(self.app.name)
+        changed = {}
+        for r in range(self.matrix.n_routes):
+            if self.matrix.ignored_bits >> r & 1:
+                continue
+            now = set(after.user_ids_of(after.users_for_route(r)))
+            was = set(self.matrix.user_ids_of(before[r]))
+            if now != was:
+                changed[self.matrix.route_ids[r]] = (len(was - now), len(now - was))
+        self.assertEqual({row.route_id: (row.lost, row.gained) for row in report.routes}, changed)
+
+        out = io.StringIO()
+        call_command("aclcore_impact", application=self.app.name, remove_role=role.name, stdout=out)
+        self.assertIn(f"remove role {role.name}", out.getvalue())
+
+
+class TimeOrderedIdTests(TestCase):
+    def test_uuid7_is_ordered_and_versioned(self):
+        ids = [uuid7() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(value.version == 7 and value.variant == uuid.RFC_4122 for value in ids))
+        self.assertEqual(uuid7(1_700_000_000_123).int >> 80, 1_700_000_000_123)
+
+    def test_rekey_rewrites_uuid4_rows(self):
+        app = ACLApplication.objects.create(name="shop")
+        role = ACLRole.objects.create(application=app, name="viewer")
+        old = ACLUserRole.objects.create(id=uuid.uuid4(), user_id="u1", application=app, role=role)
+        new = ACLUserRole.objects.create(user_id="u2", application=app, role=role)
+        self.assertEqual(new.pk.version, 7)
+
+        call_command("aclcore_rekey_ids", model=["ACLUserRole"], batch_size=1, stdout=io.StringIO())
+        rekeyed = ACLUserRole.objects.get(user_id="u1")
+        self.assertNotEqual(rekeyed.pk, old.pk)
+        self.assertEqual(rekeyed.pk.version, 7)
+        self.assertEqual(rekeyed.pk.int >> 80, int(old.created_at.timestamp() * 1000))
+        self.assertEqual(ACLUserRole.objects.get(user_id="u2").pk, new.pk)
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=self.app, name="viewer")
+        blocked = ACLRole.objects.create(application=self.app, name="blocked")
+        route = ACLRoute.objects.create(application=self.app, path="/api/items/", normalized_path="/api/items", method="GET")
+        ACLRoleRoutePermission.objects.create(role=viewer, route=route, is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=blocked, route=route, is_allowed=False)
+        ACLUserRole.objects.create(user_id="u1", application=self.app, role=viewer)
+
+    def test_evaluation_queries_are_index_only(self):
+        plans = query_plans.evaluation_plans("u1", "GET", "/api/items/", "shop")
+        by_table = {plan.accesses[0].table: plan for plan in plans}
+        for table in ("aclcore_aclroute", "aclcore_acluserrole", "aclcore_aclroleroutepermission"):
+            self.assertEqual(by_table[table].kind_for(table), query_plans.INDEX_ONLY, by_table[table].sql)
+        # inherited roles come from the closure inside the rule-state read
+        states = by_table["aclcore_aclroleroutepermission"]
+        self.assertEqual(states.kind_for("aclcore_aclroleclosure"), query_plans.INDEX_ONLY, states.sql)
+        self.assertEqual([scan for plan in plans for scan in plan.scans], [])
+
+    def test_staff_routes_and_role_service_avoid_scans(self):
+        plans = query_plans.staff_routes_plans("u1", "shop")
+        plans += query_plans.capture_plans(RoleService().assign_role, "u2", "blocked", "shop")
+        self.assertTrue(plans)
+        self.assertEqual([(plan.sql, plan.scans) for plan in plans if plan.scans], [])
+        denied = next(plan for plan in plans if plan.sql.startswith('SELECT "aclcore_aclroleroutepermission"."route_id"'))
+        self.assertEqual(denied.kind_for("aclcore_aclroleroutepermission"), query_plans.INDEX_ONLY)
+
+
+class AccessLogRetentionTests(TestCase):
+    def test_partition_periods(self):
+        from datetime import date
+
+        self.assertEqual(access_log.next_period(date(2026, 12, 1), "month"), date(2027, 1, 1))
+        self.assertEqual(access_log.period_start(date(2026, 10, 19), "month"), date(2026, 10, 1))
+        partition = access_log.partition_for(date(2026, 10, 19), "day")
+        self.assertEqual(partition.name, "aclcore_aclaccesslog_p20261019")
+        self.assertEqual((partition.end - partition.start).days, 1)
+
+    def test_purge_deletes_old_rows_in_batches(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        now = timezone.now()
+        ACLAccessLog.objects.bulk_create(
+            [ACLAccessLog(user_id=f"u{i}", method="GET", allowed=True) for i in range(7)]
+        )
+        old_ids = list(ACLAccessLog.objects.values_list("pk", flat=True)[:5])
+        ACLAccessLog.objects.filter(pk__in=old_ids).update(timestamp=now - timedelta(days=100))
+
+        with self.assertNumQueries(3 * 2 + 1):  # (select + delete) per batch of 2, then an empty select
+            result = access_log.purge(now - timedelta(days=90), batch_size=2)
+        self.assertEqual(result.deleted_rows, 5)
+        self.assertEqual(ACLAccessLog.objects.count(), 2)
+        self.assertFalse(ACLAccessLog.objects.filter(pk__in=old_ids).exists())
+
+
+class CacheBreakerTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        cache_breaker.reset()
+        self.addCleanup(cache_breaker.reset)
+        self.app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=self.app, name="viewer")
+        self.route = ACLRoute.objects.create(
+            application=self.app, path="/api/items/", normalized_path="/api/items", method="GET", is_sensitive=True
+        )
+        ACLRoute.objects.create(application=self.app, path="/api/docs/", normalized_path="/api/docs", method="GET")
+        ACLRoleRoutePermission.objects.create(role=viewer, route=self.route, is_allowed=True)
+        ACLUserRole.objects.create(user_id="u1", application=self.app, role=viewer)
+
+    @override_settings(ACLCORE_CACHE_BREAKER_FAILURES=2, ACLCORE_CACHE_BREAKER_RESET_SECONDS=60)
+    def test_open_breaker_short_circuits_and_uses_secondary_cache(self):
+        service = EvaluationService()
+        down = ConnectionError("down")
+        with mock.patch("django.core.cache.cache.get", side_effect=down) as get, mock.patch(
+            "django.core.cache.cache.set", side_effect=down
+        ):
+            # failed get + failed set trip the breaker; the decision itself still comes from the database
+            with self.assertLogs("aclcore.services.breaker", "WARNING"):
+                self.assertEqual(service.evaluate("u1", "GET", "/api/items/", "shop").reason, "explicit-allow")
+            self.assertTrue(cache_breaker.is_open)
+            calls = get.call_count
+            # while open the shared cache is skipped: decided from the database once, then from ACLCacheEntry
+            self.assertEqual(service.evaluate("u1", "GET", "/api/items/", "shop").reason, "explicit-allow")
+            self.assertEqual(ACLCacheEntry.objects.filter(user_id="u1", is_allowed=True).count(), 1)
+            self.assertEqual(service.evaluate("u1", "GET", "/api/items/", "shop").reason, "secondary-cache-hit")
+            self.assertEqual(get.call_count, calls)
+        stats = cache_breaker.stats()
+        self.assertEqual((stats["state"], stats["opened"], stats["failures"]), ("open", 1, 2))
+
+    def test_secondary_cache_upserts_one_row_per_decision(self):
+        service = CacheService()
+        service.set_secondary("shop", "u1", "GET", "/api/items", True)
+        with self.assertNumQueries(1):
+            service.set_secondary("shop", "u1", "GET", "/api/items", False)
+        self.assertEqual(ACLCacheEntry.objects.filter(user_id="u1").count(), 1)
+        self.assertFalse(service.get_secondary("shop", "u1", "GET", "/api/items"))
+
+    @override_settings(ACLCORE_CACHE_BREAKER_FAILURES=1, ACLCORE_CACHE_BREAKER_RESET_SECONDS=60)
+    def test_invalidation_goes_through_breaker(self):
+        from aclcore.services import invalidate_manifest
+
+        with mock.patch("django.core.cache.cache.delete", side_effect=ConnectionError("down")) as delete:
+            with self.assertLogs("aclcore.services.breaker", "WARNING"):
+                invalidate_manifest("u1", "shop")
+            self.assertTrue(cache_breaker.is_open)
+            invalidate_manifest("u1", "shop")
+        self.assertEqual(delete.call_count, 1)
+
+    @override_settings(
+        ACLCORE_EVALUATION_DEADLINE_MS=1, ACLCORE_DEGRADED_POLICY="open", ACLCORE_DEGRADED_POLICY_SENSITIVE="closed"
+    )
+    def test_deadline_applies_policy_by_sensitivity(self):
+        service = EvaluationService()
+
+        def evaluate(path, clock):
+            with mock.patch("aclcore.services.evaluation.time") as fake_time:
+                fake_time.monotonic.side_effect = clock
+                return service.evaluate("u1", "GET", path, "shop")
+
+        # budget spent before the route is known: the sensitive policy applies
+        self.assertEqual(evaluate("/api/docs/", [0.0, 5.0]), EvaluationService.degraded())
+        self.assertFalse(EvaluationService.degraded().allowed)
+        # spent after the route lookup: its is_sensitive flag picks the policy
+        docs = evaluate("/api/docs/", [0.0, 0.0, 5.0])
+        items = evaluate("/api/items/", [0.0, 0.0, 5.0])
+        self.assertEqual((docs.allowed, docs.reason), (True, "degraded"))
+        self.assertEqual((items.allowed, items.reason, items.matched_route_id), (False, "degraded", str(self.route.pk)))
+        # degraded decisions are not cached
+        self.assertIsNone(cache.get("aclcore:cache:shop:u1:GET:/api/docs"))
+
+
+class ReadReplicaTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        replicas.clear_pin()
+        self.addCleanup(replicas._down_until.clear)
+        # TestCase wraps every test in a transaction, which always keeps reads on the primary
+        patcher = mock.patch.object(connections["default"], "in_atomic_block", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(ACLCORE_READ_REPLICAS=["default"], ACLCORE_REPLICA_STICKY_SECONDS=30)
+    def test_policy_write_pins_reads_to_primary(self):
+        router = ReadReplicaRouter()
+        with replicas.replica_reads() as alias:
+            self.assertEqual(alias, "default")
+            self.assertEqual(router.db_for_read(ACLRoute), "default")
+        self.assertIsNone(router.db_for_read(ACLRoute))
+
+        ACLApplication.objects.create(name="shop")
+        with replicas.replica_reads() as alias:
+            self.assertIsNone(alias)
+        # the pin is shared through the cache, not just this process
+        replicas._pinned_until = 0.0
+        with replicas.replica_reads() as alias:
+            self.assertIsNone(alias)
+
+    @override_settings(ACLCORE_READ_REPLICAS=["replica_gone"], ACLCORE_REPLICA_RETRY_SECONDS=60)
+    def test_unreachable_replica_falls_back_to_primary(self):
+        with self.assertLogs("aclcore.services.replicas", "WARNING"):
+            with replicas.replica_reads() as alias:
+                self.assertIsNone(alias)
+        with mock.patch.object(replicas, "connections") as conns:
+            with replicas.replica_reads() as alias:
+                self.assertIsNone(alias)
+            conns.__getitem__.return_value.ensure_connection.assert_not_called()
+
+
+class CacheWarmupTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        warmup.hot_keys.reset()
+        self.addCleanup(warmup.hot_keys.reset)
+        self.app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=self.app, name="viewer")
+        self.items = ACLRoute.objects.create(application=self.app, path="/api/items/", normalized_path="/api/items", method="GET")
+        self.orders = ACLRoute.objects.create(application=self.app, path="/api/orders/", normalized_path="/api/orders", method="GET")
+        ACLRoleRoutePermission.objects.create(role=viewer, route=self.items, is_allowed=True)
+        ACLUserRole.objects.create(user_id="u1", application=self.app, role=viewer)
+
+    def test_hot_keys_are_tracked_saved_and_merged(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            ACLCORE_WARMUP_HOT_KEYS_FILE=os.path.join(tmp, "hot.json"), ACLCORE_WARMUP_TOP_K=2
+        ):
+            service = EvaluationService()
+            for path in ["/api/items/"] * 3 + ["/api/orders/"] * 2 + ["/api/other/"]:
+                service.evaluate("u1", "GET", path, "shop")
+            self.assertEqual(warmup.hot_keys.save(), 2)
+            service.evaluate("u2", "GET", "/api/orders/", "shop")
+            warmup.hot_keys.save()
+
+            keys = warmup.load_hot_keys("auto")
+        self.assertEqual(
+            [(k.user_id, k.normalized_path, k.hits) for k in keys], [("u1", "/api/items", 3), ("u1", "/api/orders", 2)]
+        )
+        self.assertEqual(keys[0].application, "shop")
+
+    @override_settings(ACLCORE_WARMUP_HOT_KEYS_FILE=None)
+    def test_warm_cache_command_fills_decisions_and_route_lists(self):
+        ACLAccessLog.objects.bulk_create(
+            [ACLAccessLog(user_id="u1", route=self.items, method="GET", allowed=True) for _ in range(3)]
+            + [ACLAccessLog(user_id="u1", route=self.orders, method="GET", allowed=False)]
+            + [ACLAccessLog(user_id="u2", route=self.items, method="GET", allowed=False)]
+        )
+        self.assertEqual([k.hits for k in warmup.load_hot_keys("auto")], [3, 1, 1])
+        cache.set(CacheService._key("shop", "u2", "GET", "/api/items"), False)
+
+        out = io.StringIO()
+        call_command("aclcore_warm_cache", "--workers", "1", "--max-per-second", "0", stdout=out)
+        self.assertIn("cached 2 decisions and 2 route lists, 1 already cached, 0 errors", out.getvalue())
+        self.assertIs(cache.get(CacheService._key("shop", "u1", "GET", "/api/items")), True)
+        self.assertIs(cache.get(CacheService._key("shop", "u1", "GET", "/api/orders")), False)
+        routes = cache.get(_routes_cache_key("u1", "shop"))
+        self.assertEqual([r["path"] for r in routes], ["/api/items/"])
+        with self.assertNumQueries(0):
+            self.assertEqual(build_routes_for_user("u1", "shop"), routes)
+
+
+class DecisionAppTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        # decisions come from the cache, so the executor threads never need the test database
+        CacheService().set("shop", "u1", "GET", "/api/items", True)
+        CacheService().set("shop", "u1", "DELETE", "/api/items", False)
+
+    def _call(self, app, path="/auth", method="GET", headers=()):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "headers": [(b"x-user-id", b"u1"), *headers]}
+        asyncio.run(app(scope, receive, send))
+        start, body = sent
+        self.assertEqual(body, {"type": "http.response.body", "body": b""})
+        return start["status"], dict(start["headers"])
+
+    def test_decisions_from_gateway_headers(self):
+        app = DecisionApp()
+        self.addCleanup(lambda: app._executor and app._executor.shutdown())
+        original = [(b"x-acl-app", b"shop"), (b"x-original-uri", b"/api/items/?page=2")]
+
+        status, headers = self._call(app, headers=[*original, (b"x-original-method", b"GET")])
+        self.assertEqual((status, headers[b"x-acl-decision"], headers[b"x-acl-reason"]), (200, b"allow", b"cache-hit"))
+        status, headers = self._call(app, headers=[*original, (b"x-original-method", b"DELETE")])
+        self.assertEqual((status, headers[b"x-acl-decision"]), (403, b"deny"))
+        # Envoy style: the sub-request itself carries the original method and path
+        status, _ = self._call(app, path="/api/items/", method="DELETE", headers=[(b"x-acl-app", b"shop")])
+        self.assertEqual(status, 403)
+
+        status, headers = self._call(app, path="/health/live")
+        self.assertEqual((status, headers[b"x-acl-reason"]), (200, b"bypass"))
+        status, headers = asyncio.run(app.decide({"type": "http", "method": "GET", "path": "/api/items/", "headers": []}))
+        self.assertEqual((status, dict(headers)[b"x-acl-reason"]), (401, b"missing-user-id"))
+
+    def test_paths_are_decoded_and_resolved_before_bypass(self):
+        app = DecisionApp()
+        self.addCleanup(lambda: app._executor and app._executor.shutdown())
+        shop = (b"x-acl-app", b"shop")
+        for uri in (b"/static/../api/items/", b"/static/%2e%2e/api/items/", b"/media/%2E%2E%2Fapi/./items/"):
+            status, headers = self._call(app, method="DELETE", headers=[shop, (b"x-original-uri", uri)])
+            self.assertEqual((status, headers[b"x-acl-decision"]), (403, b"deny"), uri)
+        status, headers = self._call(app, path="/static/../api/items/", method="DELETE", headers=[shop])
+        self.assertEqual(status, 403)
+        status, headers = self._call(app, headers=[(b"x-original-uri", b"/static/css/../app.css")])
+        self.assertEqual((status, headers[b"x-acl-reason"]), (200, b"bypass"))
+
+
+def _locmem(location):
+    return {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": location, "TIMEOUT": None}
+
+
+# separate LocMem caches stand in for Redis nodes
+SHARDED_CACHES = {
+    "default": _locmem("acl-test-cache"),
+    **{f"shard{i}": _locmem(f"acl-test-shard-{i}") for i in range(1, 5)},
+}
+
+
+@override_settings(CACHES=SHARDED_CACHES, ACLCORE_CACHE_SHARDS=["shard1", "shard2", "shard3"])
+class CacheShardingTests(TestCase):
+    def setUp(self) -> None:
+        for alias in SHARDED_CACHES:
+            caches[alias].clear()
+        self.app = ACLApplication.objects.create(name="shop")
+        viewer = ACLRole.objects.create(application=self.app, name="viewer")
+        route = ACLRoute.objects.create(application=self.app, path="/api/items/", normalized_path="/api/items", method="GET")
+        ACLRoleRoutePermission.objects.create(role=viewer, route=route, is_allowed=True)
+        self.users = [f"user-{i}" for i in range(12)]
+        for user_id in self.users:
+            ACLUserRole.objects.create(user_id=user_id, application=self.app, role=viewer)
+
+    def _holders(self, key):
+        return [alias for alias in SHARDED_CACHES if caches[alias].get(key) is not None]
+
+    def test_user_keys_colocate_and_ring_changes_move_few_owners(self):
+        service = EvaluationService()
+        nodes = set()
+        for user_id in self.users:
+            service.evaluate(user_id, "GET", "/api/items/", "shop")
+            build_manifest(user_id, "shop")
+            holders = {
+                tuple(self._holders(key))
+                for key in (
+                    CacheService._key("shop", user_id, "GET", "/api/items"),
+                    _routes_cache_key(user_id, "shop"),
+                    _manifest_key(user_id, "shop"),
+                )
+            }
+            self.assertEqual(len(holders), 1, user_id)
+            (node,) = holders.pop()
+            self.assertEqual(node, sharding.alias_for(_routes_cache_key(user_id, "shop")))
+            nodes.add(node)
+        self.assertGreater(len(nodes), 1)
+        self.assertNotIn("default", nodes)
+
+        owners = [f"aclcore:routes:shop:u{i}" for i in range(1000)]
+        before = {key: sharding.alias_for(key) for key in owners}
+        after = {key: sharding.alias_for(key, ["shard1", "shard2", "shard3", "shard4"]) for key in owners}
+        moved = [key for key in owners if before[key] != after[key]]
+        # only keys taken over by the new node move, roughly a quarter of them
+        self.assertEqual({after[key] for key in moved}, {"shard4"})
+        self.assertLess(len(moved), 400)
+
+        metrics.increment_many({"a_total": 1, "b_total": 2, "c_total": 3})
+        metrics.increment_many({"a_total": 1, "b_total": 2, "c_total": 3})
+        self.assertEqual(metrics.snapshot(["a_total", "b_total", "c_total"]), {"a_total": 2, "b_total": 4, "c_total": 6})
+
+    def test_rebalance_and_purge_cover_every_node(self):
+        for user_id in self.users:
+            build_routes_for_user(user_id, "shop")
+        keys = [_routes_cache_key(user_id, "shop") for user_id in self.users]
+
+        with override_settings(ACLCORE_CACHE_SHARDS=["shard1", "shard2", "shard3", "shard4"]):
+            out = io.StringIO()
+            call_command("aclcore_cache_shards", stdout=out)
+            misplaced = sum(sharding.alias_for(key) != sharding.alias_for(key, ["shard1", "shard2", "shard3"]) for key in keys)
+            self.assertGreater(misplaced, 0)
+            self.assertIn(f"{misplaced} of {len(keys)} keys are on the wrong node", out.getvalue())
+
+            call_command("aclcore_cache_shards", "--rebalance", "--max-moves-per-second", "0", stdout=io.StringIO())
+            for key in keys:
+                self.assertEqual(self._holders(key), [sharding.alias_for(key)])
+                self.assertEqual(len(sharding.cache_for(key).get(key)), 1)
+
+            call_command("aclcore_clear_cache", application="shop", max_deletes_per_second=0, stdout=io.StringIO())
+            self.assertEqual([key for key in keys if self._holders(key)], [])
+
+
+@override_settings(ACLCORE_EFFECTIVE_PERMISSIONS=True)
+class RoleHierarchyTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.app = ACLApplication.objects.create(name="shop")
+        self.viewer, self.editor, self.admin = (
+            ACLRole.objects.create(application=self.app, name=name) for name in ("viewer", "editor", "admin")
+        )
+        routes = {}
+        for path, method in [("/items", "GET"), ("/items", "POST"), ("/items/export", "GET"), ("/audit", "GET")]:
+            routes[(method, path)] = ACLRoute.objects.create(application=self.app, path=path, normalized_path=path, method=method)
+        ACLRoleRoutePermission.objects.create(role=self.viewer, route=routes[("GET", "/items")], is_allowed=True)
+        # viewers (and so everyone above them) are kept off the export, even if admin allows it
+        ACLRoleRoutePermission.objects.create(role=self.viewer, route=routes[("GET", "/items/export")], is_allowed=False)
+        ACLRoleRoutePermission.objects.create(role=self.editor, route=routes[("POST", "/items")], is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=self.admin, route=routes[("GET", "/items/export")], is_allowed=True)
+        ACLRoleRoutePermission.objects.create(role=self.admin, route=routes[("GET", "/audit")], is_allowed=True)
+        ACLUserRole.objects.create(user_id="boss", application=self.app, role=self.admin)
+        ACLUserRole.objects.create(user_id="dev", application=self.app, role=self.editor)
+        self.admin.parents.add(self.editor)
+        ACLRoleParent.objects.create(role=self.editor, parent=self.viewer)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def _decisions(self, user_id):
+        out = {}
+        for method, path in [("GET", "/items"), ("POST", "/items"), ("GET", "/items/export"), ("GET", "/audit")]:
+            cache.clear()
+            with override_settings(ACLCORE_EFFECTIVE_PERMISSIONS=False):
+                out[(method, path)] = EvaluationService().evaluate(user_id, method, path, "shop").allowed
+        return out
+
+    def test_inherited_bindings_keep_deny_precedence(self):
+        expected = {("GET", "/items"): True, ("POST", "/items"): True, ("GET", "/items/export"): False, ("GET", "/audit"): True}
+        self.assertEqual(self._decisions("boss"), expected)
+        self.assertEqual(self._decisions("dev"), {**expected, ("GET", "/audit"): False})
+
+        # every other reader agrees: effective table, staff route list, matrix and snapshot
+        self.assertTrue(all(report.consistent for report in EffectivePermissionService().check("shop")))
+        table = dict(ACLEffectivePermission.objects.filter(user_id="boss").values_list("normalized_path", "is_allowed"))
+        self.assertEqual(table, {"/items": True, "/items/export": False, "/audit": True})
+        self.assertEqual(
+            sorted((r["method"], r["path"]) for r in build_routes_for_user("boss", "shop")),
+            [("GET", "/audit"), ("GET", "/items"), ("POST", "/items")],
+        )
+        matrix = PolicyMatrix("shop")
+        for (method, path), allowed in expected.items():
+            self.assertEqual(bool(matrix.routes_for_user("boss") >> matrix.find_route(f"{method} {path}") & 1), allowed)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shop.aclsnap")
+            write_snapshot("shop", path)
+            snap = PolicySnapshot(path)
+            self.assertEqual(snap.evaluate("boss", "GET", "/items")[0], True)
+            self.assertEqual(snap.evaluate("boss", "GET", "/items/export")[0], False)
+            snap.close()
+
+        # removing editor from the chain cuts boss off both editor and viewer
+        report = matrix.impact_remove_role("editor")
+        self.assertEqual(report.affected_users, 2)
+        self.editor.delete()
+        self.assertEqual(set(role_hierarchy.expand([self.admin.pk])), {self.admin.pk})
+        self.assertEqual(
+            dict(ACLEffectivePermission.objects.filter(user_id="boss").values_list("normalized_path", "is_allowed")),
+            {"/items/export": True, "/audit": True},
+        )
+
+    def test_cycles_rejected_and_closure_follows_edge_changes(self):
+        closure = lambda role: set(role_hierarchy.expand([role.pk]))  # noqa: E731
+        self.assertEqual(closure(self.admin), {self.admin.pk, self.editor.pk, self.viewer.pk})
+
+        other = ACLRole.objects.create(application=ACLApplication.objects.create(name="other"), name="x")
+        attempts = [
+            lambda: self.viewer.parents.add(self.admin),
+            lambda: ACLRoleParent.objects.create(role=self.viewer, parent=self.viewer),
+            lambda: role_hierarchy.set_parents(self.viewer, [other]),
+        ]
+        for attempt in attempts:
+            with self.assertRaises(role_hierarchy.RoleHierarchyError), transaction.atomic():
+                attempt()
+        self.assertFalse(ACLRoleParent.objects.filter(role=self.viewer).exists())
+
+        # one lookup, no walk, whatever the depth
+        with self.assertNumQueries(1):
+            list(role_hierarchy.expand([self.admin.pk]))
+
+        self.editor.parents.remove(self.viewer)
+        self.assertEqual(closure(self.admin), {self.admin.pk, self.editor.pk})
+        self.assertFalse(self._decisions("boss")[("GET", "/items")])
+        self.viewer.children.add(self.admin)
+        self.assertEqual(closure(self.admin), {self.admin.pk, self.editor.pk, self.viewer.pk})
+        self.assertEqual(closure(self.editor), {self.editor.pk})
+
+        ACLRoleClosure.objects.filter(descendant=self.admin, ancestor=self.viewer).delete()
+        self.assertFalse(role_hierarchy.check("shop")[0].consistent)
+        call_command("aclcore_role_hierarchy", "--rebuild", "--check", application="shop", stdout=io.StringIO())
+        self.assertEqual(closure(self.admin), {self.admin.pk, self.editor.pk, self.viewer.pk})
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union, Callable, Awaitable
 from urllib.parse import parse_qs
 
-from aclcore.services import EvaluationService, default_normalize_path
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+
+from aclcore.models import ACLUserRole, ACLApplication
+from aclcore.services import EvaluationService, default_normalize_path, profiler
 
 
 class WsAclMiddleware:
@@ -17,6 +22,7 @@ class WsAclMiddleware:
     def __init__(self, app):
         self.app = app
         self.eval = EvaluationService()
+        self.profile_rate = profiler.sample_rate()
 
     async def __call__(self, scope: Dict[str, Any], receive, send):
         if scope["type"] != "websocket":
@@ -33,28 +39,24 @@ class WsAclMiddleware:
             return
 
         path = scope.get("path") or "/"
-        result = self.eval.evaluate(user_id=user_id, method="WS", path=path, application=application)
+        result = await sync_to_async(self._evaluate)(user_id, path, application)
         if not result.allowed:
             await self._deny(send, code=4403, reason=result.reason)
             return
 
         return await self.app(scope, receive, send)
 
+    def _evaluate(self, user_id: str, path: str, application: Optional[str]):
+        # runs in a worker thread: the ORM may not be called from the event loop
+        if self.profile_rate and profiler.should_sample(self.profile_rate):
+            with profiler.RequestProfile("ws", "WS", path):
+                return self.eval.evaluate(user_id=user_id, method="WS", path=path, application=application)
+        return self.eval.evaluate(user_id=user_id, method="WS", path=path, application=application)
+
     @staticmethod
     async def _deny(send, code: int, reason: str):
         await send({"type": "websocket.close", "code": code, "reason": reason})
 
-from __future__ import annotations
-
-from typing import Optional, Union, Callable, Awaitable
-from urllib.parse import parse_qs
-
-from django.conf import settings
-from asgiref.sync import sync_to_async
-from django.contrib.auth.models import AnonymousUser
-
-from aclcore.models import ACLUserRole, ACLApplication
-
 
 class SessionWSAuthMiddleware:
     """
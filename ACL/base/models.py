@@ -1,4 +1,7 @@
+import os
 import re
+import threading
+import time
 import uuid
 from django.db import models
 from django.db.models.manager import Manager
@@ -33,6 +36,37 @@ class BaseDeletedModel(models.Model):
         return super().delete()
 
 
+_uuid7_lock = threading.Lock()
+_uuid7_last = [0, 0]  # last timestamp (ms), counter
+
+
+def uuid7(timestamp_ms: int | None = None) -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit Unix milliseconds, then a
+    12-bit counter that keeps ids from one process increasing within the same
+    millisecond, then 62 random bits. New rows land at the right edge of the
+    primary key B-tree instead of at random pages.
+    """
+    with _uuid7_lock:
+        if timestamp_ms is None:
+            timestamp_ms = time.time_ns() // 1_000_000
+            last_ms, counter = _uuid7_last
+            if timestamp_ms <= last_ms:
+                # same (or a stepped-back) millisecond: keep ordering by counting up
+                counter += 1
+                if counter > 0xFFF:
+                    last_ms, counter = last_ms + 1, 0
+                timestamp_ms = last_ms
+            else:
+                counter = int.from_bytes(os.urandom(2), "big") & 0x3FF
+            _uuid7_last[:] = [timestamp_ms, counter]
+        else:
+            counter = int.from_bytes(os.urandom(2), "big") & 0xFFF
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (timestamp_ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
 class BaseIDModel(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
 
@@ -41,6 +75,20 @@ class BaseIDModel(models.Model):
         ordering = ['-id']
 
 
+class BaseTimeOrderedIDModel(models.Model):
+    """
+    Like BaseIDModel, but new ids are UUIDv7: for append-heavy tables whose
+    random uuid4 keys would fragment the primary key index. Existing rows keep
+    their ids; see ``aclcore_rekey_ids`` to rewrite them.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['-id']
+
+
 class BaseAutoFieldModel(models.Model):
     id = models.AutoField(primary_key=True, auto_created=True)
 
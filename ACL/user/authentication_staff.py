@@ -6,7 +6,7 @@ from django.conf import settings
 from rest_framework import exceptions  # type: ignore
 from rest_framework.authentication import BaseAuthentication, get_authorization_header  # type: ignore
 
-from user.models import Staff
+from user.principals import get_principal, verified_subject
 from utils.messages import (
     ERROR_TOKEN_INVALID,
     ERROR_TOKEN_MISSING,
@@ -28,10 +28,9 @@ class JWTAuthentication(BaseAuthentication):
         token = raw_header.decode("utf-8")
         staff_id = decode_access_token(token)
 
-        try:
-            staff = Staff.objects.get(pk=staff_id, is_active=True)
-        except Staff.DoesNotExist as exc:
-            raise exceptions.AuthenticationFailed(ERROR_USER_NOT_FOUND) from exc
+        staff = get_principal("staff", staff_id)
+        if staff is None:
+            raise exceptions.AuthenticationFailed(ERROR_USER_NOT_FOUND)
 
         return staff, None
 
@@ -49,8 +48,10 @@ def create_access_token(staff_id: str) -> str:
     
     
 def decode_access_token(token: str) -> str:
-    payload = _decode_token(token, settings.JWT_ACCESS_SECRET, expected_type="access")
-    return payload["staff_id"]
+    secret = settings.JWT_ACCESS_SECRET
+    return verified_subject(
+        token, secret, "staff_id", lambda t: _decode_token(t, secret, expected_type="access")
+    )
 
 
 
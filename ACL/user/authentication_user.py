@@ -6,7 +6,7 @@ from django.conf import settings
 from rest_framework import exceptions  # type: ignore
 from rest_framework.authentication import BaseAuthentication, get_authorization_header  # type: ignore
 
-from user.models import User
+from user.principals import get_principal, verified_subject
 from utils.messages import (
     ERROR_TOKEN_INVALID,
     ERROR_TOKEN_MISSING,
@@ -28,10 +28,9 @@ class JWTAuthentication(BaseAuthentication):
         token = raw_header.decode("utf-8")
         user_id = decode_access_token(token)
 
-        try:
-            user = User.objects.get(pk=user_id, is_active=True)
-        except User.DoesNotExist as exc:
-            raise exceptions.AuthenticationFailed(ERROR_USER_NOT_FOUND) from exc
+        user = get_principal("user", user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed(ERROR_USER_NOT_FOUND)
 
         return user, None
 
@@ -49,8 +48,10 @@ def create_access_token(user_id: str) -> str:
     
     
 def decode_access_token(token: str) -> str:
-    payload = _decode_token(token, settings.JWT_ACCESS_SECRET, expected_type="access")
-    return payload["user_id"]
+    secret = settings.JWT_ACCESS_SECRET
+    return verified_subject(
+        token, secret, "user_id", lambda t: _decode_token(t, secret, expected_type="access")
+    )
 
 
 def _decode_token(token: str, secret: str, expected_type: str) -> Dict[str, Any]:
@@ -0,0 +1,117 @@
+"""
+Password hashing and verification in a bounded process pool.
+
+PBKDF2 is deliberately slow; run on request threads, a login storm takes
+every core the web workers share with ACL-checked traffic. Here at most
+``PASSWORD_HASH_WORKERS`` processes (per web worker) do the hashing, at most
+``PASSWORD_HASH_MAX_PENDING`` calls may wait for them, and anything beyond
+that is shed immediately with a 503 instead of queueing. ``0`` workers runs
+the hasher inline.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import exceptions, status  # type: ignore
+
+from utils.messages import ERROR_LOGIN_BUSY
+
+
+T = TypeVar("T")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class PasswordHashBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = ERROR_LOGIN_BUSY
+    default_code = "password_hash_busy"
+
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__()
+        # DRF's exception handler turns ``wait`` into a Retry-After header
+        self.wait = retry_after
+
+
+def _workers() -> int:
+    return int(getattr(settings, "PASSWORD_HASH_WORKERS", 2))
+
+
+def _max_pending(workers: int) -> int:
+    return int(getattr(settings, "PASSWORD_HASH_MAX_PENDING", 0) or workers * 8)
+
+
+def _init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web worker with open connections is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def pending() -> int:
+    return _pending
+
+
+def _run(fn: Callable[..., T], *args) -> T:
+    global _pending
+    workers = _workers()
+    if workers <= 0:
+        return fn(*args)
+
+    with _pending_lock:
+        if _pending >= _max_pending(workers):
+            raise PasswordHashBusy()
+        _pending += 1
+    try:
+        future = _get_pool(workers).submit(fn, *args)
+        timeout = float(getattr(settings, "PASSWORD_HASH_TIMEOUT_SECONDS", 5.0))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHashBusy(retry_after=max(1, int(timeout)))
+    except BrokenProcessPool:
+        # a worker died (OOM kill etc.); start a fresh pool on the next call
+        shutdown_pool()
+        raise PasswordHashBusy()
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+def verify_password(raw_password: str, encoded: str) -> bool:
+    return _run(check_password, raw_password, encoded)
+
+
+def hash_password(raw_password: str) -> str:
+    return _run(make_password, raw_password)
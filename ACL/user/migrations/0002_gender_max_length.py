@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='staff',
+            name='gender',
+            field=models.CharField(blank=True, choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')], db_index=True, max_length=10, null=True, verbose_name='Gender'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='gender',
+            field=models.CharField(blank=True, choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')], db_index=True, max_length=10, null=True, verbose_name='Gender'),
+        ),
+    ]
@@ -39,7 +39,7 @@ class Staff(BaseIDModel, BaseModel, BaseActiveModel):
     password = models.CharField(max_length=128, verbose_name="Password")
     first_name = models.CharField(max_length=50, null=True, blank=True, verbose_name="First name", db_index=True)
     last_name = models.CharField(max_length=50, null=True, blank=True, verbose_name="Last name", db_index=True)
-    gender = models.CharField(null=True, blank=True, choices=GenderChoices.choices, verbose_name="Gender", db_index=True)
+    gender = models.CharField(max_length=10, null=True, blank=True, choices=GenderChoices.choices, verbose_name="Gender", db_index=True)
     phone_number = models.CharField(
         max_length=11,
         unique=True,
@@ -75,7 +75,7 @@ class User(BaseIDModel, BaseModel, BaseActiveModel):
     )
     first_name = models.CharField(max_length=50, null=True, blank=True, verbose_name="First name", db_index=True)
     last_name = models.CharField(max_length=50, null=True, blank=True, verbose_name="Last name", db_index=True)
-    gender = models.CharField(null=True, blank=True, choices=GenderChoices.choices, verbose_name="Gender", db_index=True)
+    gender = models.CharField(max_length=10, null=True, blank=True, choices=GenderChoices.choices, verbose_name="Gender", db_index=True)
 
     last_login = models.DateTimeField(null=True, blank=True, verbose_name="Last login")
     first_login = models.DateTimeField(null=True, blank=True, verbose_name="First login")
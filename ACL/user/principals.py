@@ -0,0 +1,126 @@
+"""
+Shared identity resolution for JWT, session and websocket authentication.
+
+- Verified access tokens are remembered per process by SHA-256 digest until
+  their ``exp``, so a repeated token skips ``jwt.decode``.
+- ``(kind, id) → Staff/User`` lookups go through the shared cache; misses
+  (unknown or inactive ids) are cached too. ``user.signals`` drops the entry
+  on save/delete, which covers deactivation and password changes;
+  ``QuerySet.update()`` bypasses signals and is only bounded by the TTL.
+  Only ``CACHED_FIELDS`` are stored (no password hash or personal data); the
+  principal is rebuilt as an instance with every other field deferred, so
+  reading one of them loads it from the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from user.models import Staff, User
+
+
+PRINCIPAL_MODELS = {"staff": Staff, "user": User}
+# what authentication needs; the rest stays out of the shared cache
+CACHED_FIELDS = ("id", "username", "is_active")
+# cached for ids that do not resolve, so bad ids do not reach the DB every time
+_MISSING = 0
+
+
+class TokenCache:
+    """Thread-safe LRU of token digest → (subject, exp)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            subject, exp = entry
+            if exp <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return subject
+
+    def put(self, digest: str, subject: str, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (subject, exp)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(int(getattr(settings, "PRINCIPAL_TOKEN_CACHE_SIZE", 10000)))
+
+
+def verified_subject(
+    token: str,
+    secret: str,
+    claim: str,
+    decode: Callable[[str], Dict[str, Any]],
+) -> str:
+    """
+    Return ``claim`` from a token that ``decode`` (signature, expiry and type
+    checks) has accepted before, decoding only on a cache miss.
+    """
+    # the secret is part of the digest so rotating it invalidates every entry
+    digest = hashlib.sha256(f"{claim}\0{secret}\0{token}".encode()).hexdigest()
+    subject = token_cache.get(digest)
+    if subject is not None:
+        return subject
+    payload = decode(token)
+    subject = str(payload[claim])
+    if "exp" in payload:
+        token_cache.put(digest, subject, float(payload["exp"]))
+    return subject
+
+
+def _principal_key(kind: str, pk: Any) -> str:
+    return f"principal:{kind}:{pk}"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "PRINCIPAL_CACHE_TTL_SECONDS", 300))
+
+
+def _cached_field_names(model) -> List[str]:
+    # Model.from_db expects values in concrete field order
+    return [f.attname for f in model._meta.concrete_fields if f.attname in CACHED_FIELDS]
+
+
+def get_principal(kind: str, pk: Any) -> Union[Staff, User, None]:
+    """Active Staff/User by primary key, or None."""
+    key = _principal_key(kind, pk)
+    model = PRINCIPAL_MODELS[kind]
+    names = _cached_field_names(model)
+    cached = cache.get(key)
+    if cached is None:
+        try:
+            cached = tuple(model.objects.filter(pk=pk, is_active=True).values_list(*names).get())
+        except (model.DoesNotExist, ValidationError, ValueError):
+            cached = _MISSING
+        cache.set(key, cached, timeout=_ttl())
+    if not cached:
+        return None
+    return model.from_db(model.objects.db, names, cached)
+
+
+def invalidate_principal(kind: str, pk: Any) -> None:
+    cache.delete(_principal_key(kind, pk))
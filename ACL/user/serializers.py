@@ -5,8 +5,9 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from user.authentication_user import create_access_token
 from user.authentication_staff import create_access_token as create_staff_access_token
+from user.hashing import hash_password, verify_password
 from user.models import Staff, User
-from aclcore.services import build_routes_for_user
+from aclcore.services import build_routes_for_user, schedule_manifest_build, write_behind
 from utils.messages import ERROR_INVALID_CREDENTIALS, ERROR_PASSWORD_REQUIRED
 
 
@@ -33,7 +34,7 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"password": ERROR_PASSWORD_REQUIRED})
 
         instance = User(**validated_data)
-        instance.set_password(password)
+        instance.password = hash_password(password)
         instance.save()
         return instance
 
@@ -41,7 +42,7 @@ class UserSerializer(serializers.ModelSerializer):
         password = validated_data.pop("password", None)
         instance = super().update(instance, validated_data)
         if password:
-            instance.set_password(password)
+            instance.password = hash_password(password)
             instance.save(update_fields=["password"])
         return instance
 
@@ -59,20 +60,21 @@ class UserLoginSerializer(serializers.Serializer):
         except UserModel.DoesNotExist as exc:
             raise serializers.ValidationError({"username": ERROR_INVALID_CREDENTIALS}) from exc
 
-        if not user.check_password(password):
+        if not verify_password(password, user.password):
             raise serializers.ValidationError({"password": ERROR_INVALID_CREDENTIALS})
 
         now = timezone.now()
-        update_fields = []
+        values = {}
         if hasattr(user, "first_login"):
             if getattr(user, "first_login") is None:
                 setattr(user, "first_login", now)
-                update_fields.append("first_login")
+                values["first_login"] = now
         if hasattr(user, "last_login"):
             setattr(user, "last_login", now)
-            update_fields.append("last_login")
-        if update_fields:
-            user.save(update_fields=update_fields)
+            values["last_login"] = now
+        if values:
+            # bookkeeping only; flushed in bulk after the response
+            write_behind.update(type(user), user.pk, values, set_once=("first_login",))
 
         attrs["user"] = user
         if not getattr(settings, "ADMIN_SESSION_ONLY_AUTH", True):
@@ -93,17 +95,19 @@ class StaffLoginSerializer(serializers.Serializer):
         except Staff.DoesNotExist as exc:
             raise serializers.ValidationError({"username": ERROR_INVALID_CREDENTIALS}) from exc
 
-        if not staff.check_password(password):
+        if not verify_password(password, staff.password):
             raise serializers.ValidationError({"password": ERROR_INVALID_CREDENTIALS})
 
         now = timezone.now()
         staff.last_login = now
-        staff.save(update_fields=["last_login"])
-
-        routes = build_routes_for_user(str(staff.pk))
+        write_behind.update(Staff, staff.pk, {"last_login": now})
 
         attrs["staff"] = staff
-        attrs["routes"] = routes
+        if getattr(settings, "ACLCORE_LOGIN_INLINE_ROUTES", False):
+            attrs["routes"] = build_routes_for_user(str(staff.pk))
+        else:
+            # Clients fetch routes from the manifest endpoint; warm it off-thread
+            schedule_manifest_build(str(staff.pk))
         if not getattr(settings, "ADMIN_SESSION_ONLY_AUTH", True):
             token = create_staff_access_token(str(staff.pk))
             expires_at = now + settings.JWT_ACCESS_TOKEN_LIFETIME
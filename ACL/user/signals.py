@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import Staff, User
+from user.principals import invalidate_principal
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def _staff_changed(sender, instance: Staff, **kwargs: Any):
+    # covers deactivation and password changes, which are both saves
+    invalidate_principal("staff", instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance: User, **kwargs: Any):
+    invalidate_principal("user", instance.pk)
@@ -1,11 +1,21 @@
 from django.test import TestCase, override_settings, RequestFactory
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import exceptions, status
+from unittest import mock
 
+from aclcore.models import ACLApplication, ACLRole, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+from user.authentication_staff import JWTAuthentication as StaffJWTAuthentication
+from user.authentication_staff import create_access_token as create_staff_access_token
+from user import hashing
+from aclcore.services import snapshot, write_behind
 from user.models import Staff
-from user.views import StaffLoginAPIView, UserLoginAPIView
+from user.principals import get_principal, token_cache
+from user.views import ACLProfileAPIView, StaffLoginAPIView, StaffRouteManifestAPIView, UserLoginAPIView
 from user.serializers import StaffLoginSerializer, UserLoginSerializer
 
 
@@ -43,3 +53,193 @@ class SessionOnlyLoginTests(TestCase):
         self.assertIn("staff_id", response.data)
         self.assertNotIn("access", response.data)
         self.assertEqual(request.session.get("admin_staff_id"), self.staff.id)
+
+
+class StaffRouteManifestTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.staff = Staff.objects.create_user(username="admin2", password="pass1234", is_active=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.app = ACLApplication.objects.create(name="admin")
+            self.role = ACLRole.objects.create(application=self.app, name="admin-role")
+            ACLUserRole.objects.create(user_id=str(self.staff.pk), application=self.app, role=self.role)
+            self.route = ACLRoute.objects.create(
+                application=self.app, path="/api/admin/a/", normalized_path="/api/admin/a", method="GET"
+            )
+            ACLRoleRoutePermission.objects.create(role=self.role, route=self.route, is_allowed=True)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def _get(self, **extra):
+        query = extra.pop("query", {})
+        request = add_session_to_request(self.factory.get("/", data=query, **extra))
+        request.session["admin_staff_id"] = str(self.staff.pk)
+        return StaffRouteManifestAPIView.as_view()(request)
+
+    def test_manifest_etag_and_not_modified(self):
+        response = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in response.data["routes"]], [str(self.route.pk)])
+        etag = response["ETag"]
+        self.assertEqual(etag, f'"{response.data["version"]}"')
+
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_manifest_delta_since_previous_version(self):
+        old_version = self._get().data["version"]
+        other = ACLRoute.objects.create(
+            application=self.app, path="/api/admin/b/", normalized_path="/api/admin/b", method="POST"
+        )
+        # permission change invalidates the cached manifest for role holders once committed
+        with self.captureOnCommitCallbacks(execute=True):
+            ACLRoleRoutePermission.objects.create(role=self.role, route=other, is_allowed=True)
+            ACLRoleRoutePermission.objects.filter(route=self.route).delete()
+
+        response = self._get(query={"since": old_version})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data["version"], old_version)
+        self.assertEqual([r["id"] for r in response.data["added"]], [str(other.pk)])
+        self.assertEqual(response.data["removed"], [str(self.route.pk)])
+
+    def test_route_edit_changes_etag_and_delta(self):
+        response = self._get()
+        old_etag, old_version = response["ETag"], response.data["version"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.path = "/api/admin/a2/"
+            self.route.normalized_path = "/api/admin/a2"
+            self.route.save()
+
+        response = self._get(HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], old_etag)
+        delta = self._get(query={"since": old_version}).data
+        self.assertEqual((delta["added"], delta["removed"]), ([], []))
+        self.assertEqual([r["path"] for r in delta["changed"]], ["/api/admin/a2/"])
+
+    def test_manifest_requires_staff_session(self):
+        request = add_session_to_request(self.factory.get("/"))
+        response = StaffRouteManifestAPIView.as_view()(request)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_staff_endpoints_reject_deactivated_staff(self):
+        self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+        self.staff.is_active = False
+        self.staff.save()
+        self.assertIn(self._get().status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        request = add_session_to_request(self.factory.get("/"))
+        request.session["admin_staff_id"] = str(self.staff.pk)
+        response = ACLProfileAPIView.as_view()(request)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_profile_report_is_staff_only(self):
+        response = ACLProfileAPIView.as_view()(add_session_to_request(self.factory.get("/")))
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        request = add_session_to_request(self.factory.get("/"))
+        request.session["admin_staff_id"] = str(self.staff.pk)
+        response = ACLProfileAPIView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("sql", response.data)
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        token_cache.clear()
+        self.staff = Staff.objects.create_user(username="admin3", password="pass1234", phone_number="09120000003")
+        self.token = create_staff_access_token(str(self.staff.pk))
+        self.request = RequestFactory().get("/", HTTP_AUTHORIZATION=self.token)
+
+    def tearDown(self) -> None:
+        cache.clear()
+        token_cache.clear()
+
+    def test_repeat_authentication_skips_decode_and_db(self):
+        auth = StaffJWTAuthentication()
+        self.assertEqual(auth.authenticate(self.request)[0].pk, self.staff.pk)
+        with mock.patch("user.authentication_staff.jwt.decode") as decode, self.assertNumQueries(0):
+            staff, _ = auth.authenticate(self.request)
+        decode.assert_not_called()
+        self.assertEqual(staff.pk, self.staff.pk)
+
+    def test_deactivation_and_password_change_invalidate(self):
+        auth = StaffJWTAuthentication()
+        auth.authenticate(self.request)
+        self.staff.set_password("new-pass")
+        self.staff.save()
+        self.assertTrue(auth.authenticate(self.request)[0].check_password("new-pass"))
+
+        self.staff.is_active = False
+        self.staff.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            auth.authenticate(self.request)
+        self.assertIsNone(get_principal("user", "not-a-uuid"))
+
+    def test_cached_principal_holds_identity_fields_only(self):
+        StaffJWTAuthentication().authenticate(self.request)
+        cached = cache.get(f"principal:staff:{self.staff.pk}")
+        self.assertNotIn(self.staff.password, cached)
+        self.assertNotIn(self.staff.phone_number, cached)
+        staff = get_principal("staff", self.staff.pk)
+        self.assertEqual(staff.username, self.staff.username)
+        with self.assertNumQueries(1):
+            self.assertTrue(staff.check_password("pass1234"))
+
+
+class PasswordHashPoolTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        Staff.objects.create_user(username="admin4", password="pass1234", phone_number="09120000004")
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def _login(self):
+        request = add_session_to_request(RequestFactory().post("/", data={"username": "admin4", "password": "pass1234"}))
+        return StaffLoginAPIView.as_view()(request)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, ADMIN_SESSION_ONLY_AUTH=True)
+    def test_login_verifies_in_pool(self):
+        try:
+            self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+            self.assertEqual(hashing.pending(), 0)
+        finally:
+            hashing.shutdown_pool()
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=2)
+    def test_saturated_pool_sheds_with_503(self):
+        with mock.patch.object(hashing, "_pending", 2), mock.patch.object(hashing, "_get_pool") as get_pool:
+            response = self._login()
+        get_pool.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class LoginWriteBehindTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        write_behind.flush()
+        UserModel = get_user_model()
+        self.users = [UserModel.objects.create_user(username=f"wb{i}", password="pass1234") for i in range(2)]
+
+    def tearDown(self) -> None:
+        write_behind.flush()
+        cache.clear()
+
+    @override_settings(PASSWORD_HASH_WORKERS=0)
+    def test_logins_coalesce_into_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            for user in self.users + self.users[:1]:
+                serializer = UserLoginSerializer(data={"username": user.username, "password": "pass1234"})
+                self.assertTrue(serializer.is_valid())
+        self.assertFalse([q for q in queries if q["sql"].startswith("UPDATE")])
+        self.assertIsNone(get_user_model().objects.get(pk=self.users[0].pk).last_login)
+        write_behind.count("admin_login_success_total", 3)
+
+        with self.assertNumQueries(1):
+            write_behind.flush()
+        self.assertFalse(get_user_model().objects.filter(pk__in=[u.pk for u in self.users], last_login=None).exists())
+        self.assertEqual(snapshot(["admin_login_success_total"])["admin_login_success_total"], 3)
@@ -1,7 +1,14 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter  # type: ignore
 
-from user.views import StaffLoginAPIView, UserLoginAPIView, UserViewSet
+from user.views import (
+    ACLCacheBreakerAPIView,
+    ACLProfileAPIView,
+    StaffLoginAPIView,
+    StaffRouteManifestAPIView,
+    UserLoginAPIView,
+    UserViewSet,
+)
 
 router = DefaultRouter()
 router.register("users", UserViewSet, basename="user")
@@ -13,6 +20,12 @@ urlpatterns = [
     path("auth/login/", UserLoginAPIView.as_view(), name="user-login"),
     # Staff/admin login with ACL route generation
     path("admin/login/", StaffLoginAPIView.as_view(), name="staff-login"),
+    # Versioned allowed-route manifest for the logged-in staff member
+    path("admin/routes/manifest/", StaffRouteManifestAPIView.as_view(), name="staff-routes-manifest"),
+    # Sampled ACL query/cache profiler (staff only)
+    path("admin/acl/profile/", ACLProfileAPIView.as_view(), name="acl-profile"),
+    # Cache circuit breaker state of the serving process (staff only)
+    path("admin/acl/cache-breaker/", ACLCacheBreakerAPIView.as_view(), name="acl-cache-breaker"),
 ]
 
 
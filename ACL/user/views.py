@@ -1,14 +1,26 @@
-from rest_framework import permissions, status
-from rest_framework.authentication import SessionAuthentication
+from rest_framework import exceptions, permissions, status
+from rest_framework.authentication import SessionAuthentication, get_authorization_header
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response  # type: ignore
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.viewsets import ModelViewSet  # type: ignore
 
 from django.conf import settings
+from django.urls import reverse
+from user.authentication_staff import decode_access_token as decode_staff_access_token
+from user.hashing import PasswordHashBusy
 from user.models import User
+from user.principals import get_principal
 from user.serializers import StaffLoginSerializer, UserLoginSerializer, UserSerializer
-from aclcore.services import increment as metric_increment, LoginAttemptLimiter
+from aclcore.services import (
+    cache_breaker,
+    get_manifest,
+    manifest_delta,
+    LoginAttemptLimiter,
+    profiler,
+    write_behind,
+)
+from utils.messages import ERROR_TOKEN_MISSING
 
 
 class UserViewSet(ModelViewSet):
@@ -41,11 +53,11 @@ class StaffLoginAPIView(APIView):
 
     def post(self, request, *args, **kwargs):
         username = str(request.data.get("username", "")).strip()
-        metric_increment("admin_login_attempt_total")
+        write_behind.count("admin_login_attempt_total")
 
         rate_result = self.login_limiter.allow(username)
         if not rate_result.allowed:
-            metric_increment("admin_login_rate_limited_total")
+            write_behind.count("admin_login_rate_limited_total")
             response = Response(
                 {"detail": rate_result.error_message},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -57,19 +69,106 @@ class StaffLoginAPIView(APIView):
         try:
             serializer.is_valid(raise_exception=True)
         except ValidationError:
-            metric_increment("admin_login_failure_total")
+            write_behind.count("admin_login_failure_total")
+            raise
+        except PasswordHashBusy:
+            write_behind.count("admin_login_shed_total")
             raise
 
         self.login_limiter.reset(username)
-        metric_increment("admin_login_success_total")
-        metric_increment("admin_login_routes_generated_total", len(serializer.validated_data.get("routes", [])))
+        write_behind.count("admin_login_success_total")
 
         staff = serializer.validated_data["staff"]
-        routes = serializer.validated_data.get("routes", [])
+        payload = {"staff_id": staff.id, "routes_manifest": reverse("staff-routes-manifest")}
+        if "routes" in serializer.validated_data:
+            payload["routes"] = serializer.validated_data["routes"]
         # Session-only flow: store staff id in session; don't return token
         if getattr(settings, "ADMIN_SESSION_ONLY_AUTH", True):
             request.session["admin_staff_id"] = staff.id
             request.session.modified = True
-            return Response({"staff_id": staff.id, "routes": routes}, status=status.HTTP_200_OK)
+            return Response(payload, status=status.HTTP_200_OK)
         # Fallback: JWT transient
-        return Response({"access": serializer.validated_data["access_token"], "staff_id": staff.id, "expires_at": serializer.validated_data["expires_at"], "routes": routes}, status=status.HTTP_200_OK)
\ No newline at end of file
+        payload.update({"access": serializer.validated_data["access_token"], "expires_at": serializer.validated_data["expires_at"]})
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+def _staff_id_from_request(request) -> str:
+    """
+    Resolve the logged-in staff id from the session, or from the access token
+    when JWT mode is enabled; the staff member must still exist and be active.
+    """
+    staff_id = request.session.get("admin_staff_id") if hasattr(request, "session") else None
+    if not staff_id and not getattr(settings, "ADMIN_SESSION_ONLY_AUTH", True):
+        raw_header = get_authorization_header(request).strip()
+        if raw_header:
+            staff_id = decode_staff_access_token(raw_header.decode("utf-8"))
+    if not staff_id:
+        raise exceptions.NotAuthenticated(ERROR_TOKEN_MISSING)
+    if get_principal("staff", staff_id) is None:
+        raise exceptions.NotAuthenticated()
+    return str(staff_id)
+
+
+class StaffRouteManifestAPIView(APIView):
+    """
+    Allowed routes for the logged-in staff member, versioned for revalidation.
+
+    - ETag carries the policy version; a matching If-None-Match returns 304
+    - ?since=<version> returns only added and changed routes and removed route
+      ids when the old version is still known, otherwise the full manifest
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        staff_id = _staff_id_from_request(request)
+        application = request.query_params.get("application") or None
+        manifest = get_manifest(staff_id, application=application)
+
+        etag = f'"{manifest["version"]}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        since = request.query_params.get("since")
+        if since and since != manifest["version"]:
+            delta = manifest_delta(manifest, staff_id, since, application=application)
+            if delta is not None:
+                return Response(delta, status=status.HTTP_200_OK, headers=headers)
+
+        return Response(manifest, status=status.HTTP_200_OK, headers=headers)
+
+
+class ACLProfileAPIView(APIView):
+    """
+    Staff-only view of the sampled ACL profiler (ACLCORE_PROFILER_SAMPLE_RATE).
+
+    - GET returns top-N SQL fingerprints, cache operations and slowest requests (?top=N)
+    - DELETE clears the collected profiles
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        _staff_id_from_request(request)
+        try:
+            top_n = int(request.query_params.get("top") or 0) or None
+        except ValueError:
+            raise ValidationError({"top": "must be an integer"})
+        return Response(profiler.report(top_n=top_n), status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        _staff_id_from_request(request)
+        profiler.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ACLCacheBreakerAPIView(APIView):
+    """Staff-only state of this process's aclcore cache circuit breaker."""
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        _staff_id_from_request(request)
+        return Response(cache_breaker.stats(), status=status.HTTP_200_OK)
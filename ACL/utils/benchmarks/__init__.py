@@ -0,0 +1,2 @@
+from .runner import BenchmarkResult, Regression, compare_results, dump_results, load_results, measure, summarize
+from .cases import GROUPS, BenchmarkContext, run_benchmarks
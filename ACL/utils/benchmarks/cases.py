@@ -0,0 +1,466 @@
+"""
+Benchmark cases for the ACL decision path.
+
+Each group builds its own fixture in the current database, so the suite can run
+against a throwaway SQLite/LocMem setup as well as a local Postgres/Redis one.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.http import HttpResponse
+from django.db import connection, connections
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from aclcore.management.commands.faker import SeedOptions, seed_application
+from aclcore.decision import DecisionApp
+from aclcore.middleware import HttpAclMiddleware
+from aclcore.models import ACLApplication, ACLRole, ACLRoleRoutePermission, ACLRoute, ACLUserRole
+from aclcore.signals import access_checked
+from aclcore.services import replicas
+from aclcore.services import CacheService, EvaluationService, build_routes_for_user, clear_routes_for_user, default_normalize_path
+from user.hashing import PasswordHashBusy, shutdown_pool, verify_password
+from base.models import uuid7
+from .runner import BenchmarkResult, measure, summarize
+
+
+BENCH_APP = "bench"
+
+# (reason, user_id, path) — every reason code EvaluationService can return on a miss
+REASON_CASES = [
+    ("explicit-allow", "bench-user", "/bench/allow/"),
+    ("explicit-deny", "bench-user", "/bench/deny/"),
+    ("no-matching-rule", "bench-user", "/bench/unbound/"),
+    ("route-ignored", "bench-user", "/bench/ignored/"),
+    ("route-not-registered", "bench-user", "/bench/missing/"),
+    ("no-roles", "bench-nobody", "/bench/allow/"),
+]
+
+
+@dataclass
+class BenchmarkContext:
+    iterations: int = 1000
+    sizes: Sequence[int] = (50, 500, 2000)
+    seed: int = 42
+
+
+class _NullCache(CacheService):
+    """Never hits, so every evaluation takes the cold path."""
+
+    def get(self, *args, **kwargs):
+        return None
+
+    def set(self, *args, **kwargs):
+        return None
+
+
+def _ensure_decision_fixture() -> None:
+    if ACLApplication.objects.filter(name=BENCH_APP).exists():
+        return
+    app = ACLApplication.objects.create(name=BENCH_APP)
+    routes = {}
+    for path, ignored in [("/bench/allow/", False), ("/bench/deny/", False), ("/bench/unbound/", False), ("/bench/ignored/", True)]:
+        routes[path] = ACLRoute.objects.create(
+            application=app, path=path, normalized_path=default_normalize_path(path), method="GET", is_ignored=ignored
+        )
+    viewer = ACLRole.objects.create(application=app, name="bench-viewer")
+    blocked = ACLRole.objects.create(application=app, name="bench-blocked")
+    ACLRoleRoutePermission.objects.create(role=viewer, route=routes["/bench/allow/"], is_allowed=True)
+    ACLRoleRoutePermission.objects.create(role=viewer, route=routes["/bench/deny/"], is_allowed=True)
+    ACLRoleRoutePermission.objects.create(role=blocked, route=routes["/bench/deny/"], is_allowed=False)
+    ACLUserRole.objects.create(user_id="bench-user", application=app, role=viewer)
+    ACLUserRole.objects.create(user_id="bench-user", application=app, role=blocked)
+
+
+def bench_normalize(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    paths = [
+        "/", "/api/users/", "/api/users/42/", "//api//orders///7/items/", "/api/reports/2024/q1/export/",
+        "/static/app.js", "/api/" + "segment/" * 20,
+    ]
+    n = len(paths)
+    return [measure("normalize_path", lambda i: default_normalize_path(paths[i % n]), ctx.iterations * 10)]
+
+
+def bench_cache(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    service = CacheService()
+    service.set(BENCH_APP, "bench-user", "GET", "/bench/hit", True)
+    return [
+        measure("cache_get_hit", lambda i: service.get(BENCH_APP, "bench-user", "GET", "/bench/hit"), ctx.iterations),
+        measure("cache_get_miss", lambda i: service.get(BENCH_APP, "bench-user", "GET", f"/bench/miss/{i}"), ctx.iterations),
+        measure("cache_set", lambda i: service.set(BENCH_APP, "bench-user", "GET", f"/bench/set/{i % 256}", True), ctx.iterations),
+    ]
+
+
+def bench_evaluate(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    _ensure_decision_fixture()
+    cold = EvaluationService(cache=_NullCache())
+    warm = EvaluationService()
+    results: List[BenchmarkResult] = []
+    for reason, user_id, path in REASON_CASES:
+        def cold_call(i, user_id=user_id, path=path):
+            return cold.evaluate(user_id=user_id, method="GET", path=path, application=BENCH_APP)
+
+        def warm_call(i, user_id=user_id, path=path):
+            return warm.evaluate(user_id=user_id, method="GET", path=path, application=BENCH_APP)
+
+        observed = cold_call(0).reason
+        result = measure(f"evaluate_cold[{reason}]", cold_call, max(ctx.iterations // 4, 1))
+        result.extra["reason"] = observed
+        results.append(result)
+
+        warm_call(0)
+        result = measure(f"evaluate_warm[{reason}]", warm_call, ctx.iterations)
+        result.extra["reason"] = warm_call(0).reason
+        results.append(result)
+    return results
+
+
+def bench_middleware(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    _ensure_decision_fixture()
+    factory = RequestFactory()
+    user_header = getattr(settings, "ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")
+    app_header = getattr(settings, "ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")
+    bypass = next(iter(getattr(settings, "ACLCORE_BYPASS_PREFIXES", None) or ["/health"]))
+
+    def view(request):
+        return HttpResponse(b"ok")
+
+    middleware = HttpAclMiddleware(view)
+    requests = {
+        "baseline": factory.get("/bench/allow/"),
+        "allow_warm": factory.get("/bench/allow/", **{user_header: "bench-user", app_header: BENCH_APP}),
+        "deny_warm": factory.get("/bench/deny/", **{user_header: "bench-user", app_header: BENCH_APP}),
+        "bypass": factory.get(f"{bypass.rstrip('/')}/ping", **{user_header: "bench-user"}),
+    }
+    middleware(requests["allow_warm"])
+    middleware(requests["deny_warm"])
+
+    results = [measure("middleware[baseline]", lambda i: view(requests["baseline"]), ctx.iterations)]
+    baseline = results[0].p50_us
+    for name in ("allow_warm", "deny_warm", "bypass"):
+        request = requests[name]
+        result = measure(f"middleware[{name}]", lambda i, request=request: middleware(request), ctx.iterations)
+        result.extra["overhead_us"] = round(result.p50_us - baseline, 3)
+        results.append(result)
+
+    # the access_checked send is skipped without receivers; measure what one costs
+    access_checked.connect(_noop_receiver, dispatch_uid="acl-bench-listener")
+    try:
+        request = requests["allow_warm"]
+        result = measure("middleware[allow_warm_listener]", lambda i: middleware(request), ctx.iterations)
+        result.extra["overhead_us"] = round(result.p50_us - baseline, 3)
+        results.append(result)
+    finally:
+        access_checked.disconnect(dispatch_uid="acl-bench-listener")
+    return results
+
+
+def _noop_receiver(sender, **kwargs) -> None:
+    return None
+
+
+def bench_staff_routes(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    results: List[BenchmarkResult] = []
+    for size in ctx.sizes:
+        app_name = f"{BENCH_APP}-routes-{size}"
+        if not ACLApplication.objects.filter(name=app_name).exists():
+            seed_application(
+                SeedOptions(
+                    app_name=app_name,
+                    seed=ctx.seed + size,
+                    routes=size,
+                    roles=max(4, size // 50),
+                    users=20,
+                    allow_rate=0.8,
+                    binding_density=0.5,
+                    max_roles_per_user=4,
+                    zipf_s=1.2,
+                    super_roles=1,
+                    default_roles=1,
+                    super_user_rate=0.0,
+                    batch_size=5000,
+                )
+            )
+        user_id = (
+            ACLUserRole.objects.filter(application__name=app_name, role__is_default=False)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+
+        def reset(i, user_id=user_id, app_name=app_name):
+            clear_routes_for_user(user_id, application=app_name)
+
+        iterations = max(5, ctx.iterations // max(1, size // 10))
+        result = measure(
+            f"build_routes_for_user[{size}]",
+            lambda i, user_id=user_id, app_name=app_name: build_routes_for_user(user_id, application=app_name),
+            iterations,
+            warmup=2,
+            setup=reset,
+        )
+        result.extra["routes_returned"] = len(build_routes_for_user(user_id, application=app_name))
+        results.append(result)
+    return results
+
+
+def bench_login_burst(ctx: BenchmarkContext, threads: int = 8) -> List[BenchmarkResult]:
+    """
+    Warm ACL-checked request latency while ``threads`` clients hammer password
+    verification, hashing inline vs. through the bounded pool.
+    """
+    _ensure_decision_fixture()
+    user_header = getattr(settings, "ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")
+    app_header = getattr(settings, "ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")
+    middleware = HttpAclMiddleware(lambda request: HttpResponse(b"ok"))
+    request = RequestFactory().get("/bench/allow/", **{user_header: "bench-user", app_header: BENCH_APP})
+    middleware(request)
+    encoded = make_password("bench-password")
+
+    results = [measure("login_burst[idle]", lambda i: middleware(request), ctx.iterations)]
+    for mode, workers in (("inline", 0), ("pool", max(1, int(getattr(settings, "PASSWORD_HASH_WORKERS", 2) or 2)))):
+        with override_settings(PASSWORD_HASH_WORKERS=workers):
+            if workers:
+                verify_password("bench-password", encoded)  # start the pool outside the timer
+            stop = threading.Event()
+            counts = {"logins": 0, "shed": 0}
+
+            def client() -> None:
+                while not stop.is_set():
+                    try:
+                        verify_password("bench-password", encoded)
+                        counts["logins"] += 1
+                    except PasswordHashBusy:
+                        counts["shed"] += 1
+                        stop.wait(0.01)
+
+            clients = [threading.Thread(target=client, daemon=True) for _ in range(threads)]
+            for t in clients:
+                t.start()
+            started = time.perf_counter()
+            try:
+                result = measure(f"login_burst[{mode}]", lambda i: middleware(request), ctx.iterations)
+            finally:
+                stop.set()
+                for t in clients:
+                    t.join()
+            elapsed = time.perf_counter() - started
+        result.extra.update(
+            logins_per_s=round(counts["logins"] / elapsed, 1),
+            shed=counts["shed"],
+            mean_vs_idle=round(result.mean_us / results[0].mean_us, 2),
+        )
+        results.append(result)
+    shutdown_pool()
+    return results
+
+
+def _pk_index_kib(table: str) -> Optional[float]:
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT pg_relation_size(i.indexrelid) FROM pg_index i WHERE i.indrelid = %s::regclass AND i.indisprimary",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [f"sqlite_autoindex_{table}_1"])
+            except Exception:
+                # dbstat is an optional SQLite build flag
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+    return round(row[0] / 1024, 1) if row and row[0] is not None else None
+
+
+def bench_pk_inserts(ctx: BenchmarkContext, batch: int = 1000) -> List[BenchmarkResult]:
+    """
+    Batched inserts into a scratch table keyed by uuid4 vs. UUIDv7, with the
+    resulting primary key index size. Meaningful on PostgreSQL; SQLite shows
+    the same trend at small scale.
+    """
+    rows = max(ctx.sizes) * 50
+    id_type = "uuid" if connection.vendor == "postgresql" else "char(32)"
+    results: List[BenchmarkResult] = []
+    for kind, generate in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+        table = f"aclcore_bench_pk_{kind}"
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} (id {id_type} PRIMARY KEY, user_id varchar(100) NOT NULL, created_at timestamp NOT NULL)"
+            )
+        sql = f"INSERT INTO {table} (id, user_id, created_at) VALUES (%s, %s, %s)"
+        as_param = (lambda value: value) if id_type == "uuid" else (lambda value: value.hex)
+        timings: List[float] = []
+        try:
+            for i in range(max(1, rows // batch)):
+                now = timezone.now()
+                params = [(as_param(generate()), f"user-{i}-{n}", now) for n in range(batch)]
+                started = time.perf_counter_ns()
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, params)
+                timings.append((time.perf_counter_ns() - started) / 1000)
+            result = summarize(f"pk_inserts[{kind}]", timings)
+            result.extra.update(
+                rows=len(timings) * batch,
+                rows_per_s=round(batch * result.ops_per_sec, 1),
+                pk_index_kib=_pk_index_kib(table),
+            )
+            results.append(result)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    return results
+
+
+def bench_db_connections(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    """
+    Evaluation miss path when every request opens a new connection
+    (CONN_MAX_AGE=0) vs. a persistent one, plus the replica route when
+    ACLCORE_READ_REPLICAS is configured. Run against local PostgreSQL for
+    realistic connect costs; SQLite only opens a file.
+    """
+    _ensure_decision_fixture()
+    replicas.clear_pin()
+    cold = EvaluationService(cache=_NullCache())
+
+    def miss(i):
+        return cold.evaluate(user_id="bench-user", method="GET", path="/bench/allow/", application=BENCH_APP)
+
+    def reconnect(i):
+        # what request_finished does with CONN_MAX_AGE=0
+        connections.close_all()
+
+    iterations = max(ctx.iterations // 4, 1)
+    results = [
+        measure("miss_path[new_connection]", miss, iterations, setup=reconnect),
+        measure("miss_path[persistent]", miss, iterations),
+    ]
+    aliases = list(getattr(settings, "ACLCORE_READ_REPLICAS", ()))
+    if aliases:
+        with replicas.replica_reads() as alias:
+            used = alias
+        result = measure("miss_path[persistent_replica]", miss, iterations)
+        result.extra["replica"] = used
+        results.append(result)
+    for result in results[1:]:
+        result.extra["mean_vs_new_connection"] = round(result.mean_us / results[0].mean_us, 2)
+    results[0].extra["vendor"] = connection.vendor
+    return results
+
+
+def bench_decision_server(ctx: BenchmarkContext) -> List[BenchmarkResult]:
+    """
+    One warm decision through the full Django ASGI stack (every configured
+    middleware) vs. the standalone ``DecisionApp``. The full stack is measured
+    on the deny route: HttpAclMiddleware answers 403 before URL resolution, so
+    no view time is counted against it.
+    """
+    from django.core.handlers.asgi import ASGIHandler
+
+    _ensure_decision_fixture()
+    user_header = getattr(settings, "ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")
+    app_header = getattr(settings, "ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")
+
+    def scope(path: str, extra: Sequence = ()) -> dict:
+        headers = [
+            (b"host", b"localhost"),
+            (user_header[5:].lower().replace("_", "-").encode(), b"bench-user"),
+            (app_header[5:].lower().replace("_", "-").encode(), BENCH_APP.encode()),
+            *extra,
+        ]
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+        }
+
+    statuses: Dict[str, int] = {}
+
+    def runner(app, name: str, request_scope: dict):
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses[name] = message["status"]
+
+        async def call():
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                # Django listens for a disconnect until the response is sent
+                await asyncio.sleep(3600)
+                return {"type": "http.disconnect"}
+
+            await app(request_scope, receive, send)
+
+        return lambda i: loop.run_until_complete(call())
+
+    loop = asyncio.new_event_loop()
+    decision = DecisionApp()
+    cases = [
+        ("decision_server[full_stack_deny]", ASGIHandler(), scope("/bench/deny/")),
+        ("decision_server[standalone_deny]", decision, scope("/bench/deny/")),
+        (
+            "decision_server[standalone_allow]",
+            decision,
+            scope("/auth", [(b"x-original-method", b"GET"), (b"x-original-uri", b"/bench/allow/?page=2")]),
+        ),
+    ]
+    results: List[BenchmarkResult] = []
+    # the full stack logs every 403 through django.request
+    request_log = logging.getLogger("django.request")
+    level = request_log.level
+    request_log.setLevel(logging.ERROR)
+    try:
+        for name, app, request_scope in cases:
+            call = runner(app, name, request_scope)
+            call(0)  # warm the decision cache and connections
+            result = measure(name, call, ctx.iterations)
+            result.extra["status"] = statuses[name]
+            result.extra["rps"] = round(1e6 / result.mean_us) if result.mean_us else None
+            results.append(result)
+    finally:
+        request_log.setLevel(level)
+        if decision._executor is not None:
+            decision._executor.shutdown(wait=True)
+        loop.close()
+    for result in results[1:]:
+        result.extra["speedup_vs_full_stack"] = round(results[0].mean_us / result.mean_us, 1)
+    return results
+
+
+GROUPS: Dict[str, Callable[[BenchmarkContext], List[BenchmarkResult]]] = {
+    "normalize": bench_normalize,
+    "cache": bench_cache,
+    "evaluate": bench_evaluate,
+    "middleware": bench_middleware,
+    "staff_routes": bench_staff_routes,
+    "login_burst": bench_login_burst,
+    "pk_inserts": bench_pk_inserts,
+    "db_connections": bench_db_connections,
+    "decision_server": bench_decision_server,
+}
+
+
+def run_benchmarks(ctx: BenchmarkContext, groups: Optional[Sequence[str]] = None) -> List[BenchmarkResult]:
+    unknown = set(groups or ()) - set(GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark groups: {', '.join(sorted(unknown))}")
+    results: List[BenchmarkResult] = []
+    for name, fn in GROUPS.items():
+        if groups and name not in groups:
+            continue
+        results.extend(fn(ctx))
+    return results
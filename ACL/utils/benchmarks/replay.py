@@ -0,0 +1,407 @@
+"""
+Replay recorded or synthetic traffic through the full Django stack.
+
+Requests are sharded over N forked worker processes; each worker drives its
+share through ``WSGIHandler`` (one request at a time, like a sync gunicorn
+worker) or ``ASGIHandler`` (``concurrency`` in-flight requests) and reports
+latencies, status codes, ACL cache hits and DB queries back to the parent.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import io
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from itertools import accumulate
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from aclcore.models import ACLRoute, ACLUserRole
+from aclcore.signals import access_checked
+
+
+@dataclass
+class ReplayRequest:
+    ts: float
+    method: str
+    path: str
+    user_id: Optional[str] = None
+    application: Optional[str] = None
+
+
+@dataclass
+class WorkerStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    acl_checks: int = 0
+    cache_hits: int = 0
+    db_queries: int = 0
+
+
+@dataclass
+class ReplayReport:
+    handler: str
+    processes: int
+    requests: int
+    seconds: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    cache_hit_ratio: Optional[float]
+    db_queries_per_request: float
+    errors: int
+    statuses: Dict[str, int]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _parse_ts(value: Any) -> float:
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def load_log(lines: Iterable[str]) -> Iterator[ReplayRequest]:
+    """
+    Parse a JSON-lines request log. Accepted keys: method, path, user_id (or user),
+    application (or app), timestamp (or ts; epoch seconds or ISO-8601).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        yield ReplayRequest(
+            ts=_parse_ts(row.get("timestamp", row.get("ts"))),
+            method=str(row.get("method") or "GET").upper(),
+            path=row["path"],
+            user_id=row.get("user_id", row.get("user")),
+            application=row.get("application", row.get("app")),
+        )
+
+
+def _zipf_cdf(n: int, s: float) -> List[float]:
+    weights = list(accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+    return [w / weights[-1] for w in weights]
+
+
+def synthetic_requests(
+    count: int, rate: float, zipf_s: float = 1.1, seed: int = 42, application: Optional[str] = None
+) -> List[ReplayRequest]:
+    """
+    Sample active routes and users of the same application from the database;
+    both are drawn with Zipf popularity so a few hot (user, route) pairs
+    dominate, as in real traffic.
+    Timestamps are spaced at ``rate`` requests per second.
+    """
+    rng = random.Random(seed)
+    routes_qs = ACLRoute.objects.filter(is_active=True)
+    users_qs = ACLUserRole.objects.all()
+    if application:
+        routes_qs = routes_qs.filter(application__name=application)
+        users_qs = users_qs.filter(application__name=application)
+    routes = list(routes_qs.order_by("id").values_list("method", "path", "application__name"))
+    users_by_app: Dict[str, List[str]] = {}
+    for user_id, app_name in users_qs.order_by().values_list("user_id", "application__name").distinct():
+        users_by_app.setdefault(app_name, []).append(user_id)
+    routes = [r for r in routes if users_by_app.get(r[2])]
+    if not routes:
+        return []
+    rng.shuffle(routes)
+    route_cdf = _zipf_cdf(len(routes), zipf_s)
+    user_cdfs: Dict[str, List[float]] = {}
+    for app_name, users in users_by_app.items():
+        users.sort()
+        rng.shuffle(users)
+        user_cdfs[app_name] = _zipf_cdf(len(users), zipf_s)
+    out: List[ReplayRequest] = []
+    for i in range(count):
+        method, path, app_name = routes[min(bisect.bisect_left(route_cdf, rng.random()), len(routes) - 1)]
+        users = users_by_app[app_name]
+        user_id = users[min(bisect.bisect_left(user_cdfs[app_name], rng.random()), len(users) - 1)]
+        out.append(ReplayRequest(ts=i / rate if rate > 0 else 0.0, method=method, path=path, user_id=user_id, application=app_name))
+    return out
+
+
+def _headers(req: ReplayRequest) -> Dict[str, str]:
+    """WSGI environ keys for the configured ACL headers."""
+    headers: Dict[str, str] = {}
+    if req.user_id:
+        headers[getattr(settings, "ACLCORE_USER_ID_HEADER", "HTTP_X_USER_ID")] = str(req.user_id)
+    if req.application:
+        headers[getattr(settings, "ACLCORE_APPLICATION_HEADER", "HTTP_X_ACL_APP")] = str(req.application)
+    return headers
+
+
+def _wsgi_environ(req: ReplayRequest, host: str) -> Dict[str, Any]:
+    path, _, query = req.path.partition("?")
+    environ = {
+        "REQUEST_METHOD": req.method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SCRIPT_NAME": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    environ.update(_headers(req))
+    return environ
+
+
+def _asgi_scope(req: ReplayRequest, host: str) -> Dict[str, Any]:
+    path, _, query = req.path.partition("?")
+    headers = [(b"host", host.encode())]
+    for key, value in _headers(req).items():
+        name = key[5:] if key.startswith("HTTP_") else key
+        headers.append((name.lower().replace("_", "-").encode(), value.encode()))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": req.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": (host, 80),
+    }
+
+
+def _install_counters(stats: WorkerStats) -> Callable[[], None]:
+    """
+    Count DB queries. Under ASGI every request context gets its own connection
+    object, so the wrapper is also attached to each connection as it opens.
+    Returns the uninstaller.
+    """
+
+    def count_queries(execute, sql, params, many, context):
+        stats.db_queries += 1
+        return execute(sql, params, many, context)
+
+    def attach(sender=None, connection=None, **kwargs):
+        conn = connection or connections["default"]
+        if count_queries not in conn.execute_wrappers:
+            conn.execute_wrappers.append(count_queries)
+
+    attach()
+    connection_created.connect(attach, weak=False, dispatch_uid="acl-replay-queries")
+
+    def uninstall() -> None:
+        connection_created.disconnect(dispatch_uid="acl-replay-queries")
+        for conn in connections.all(initialized_only=True):
+            if count_queries in conn.execute_wrappers:
+                conn.execute_wrappers.remove(count_queries)
+
+    return uninstall
+
+
+def _record(stats: WorkerStats, started: float, status: Optional[int]) -> None:
+    stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+    if status is None:
+        stats.errors += 1
+    else:
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+
+def _wait_until(start_at: float, offset: float, speed: float) -> float:
+    if speed > 0:
+        delay = start_at + offset / speed - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    return time.perf_counter()
+
+
+def _run_wsgi(requests: Sequence[ReplayRequest], start_at: float, t0: float, speed: float, host: str, stats: WorkerStats) -> None:
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    uninstall = _install_counters(stats)
+    try:
+        for req in requests:
+            started = _wait_until(start_at, req.ts - t0, speed)
+            status: Optional[int] = None
+
+            def start_response(status_line, headers, exc_info=None):
+                nonlocal status
+                status = int(status_line.split(" ", 1)[0])
+
+            try:
+                body = handler(_wsgi_environ(req, host), start_response)
+                for _chunk in body:
+                    pass
+                if hasattr(body, "close"):
+                    body.close()
+            except Exception:
+                status = None
+            _record(stats, started, status)
+    finally:
+        uninstall()
+
+
+async def _run_asgi(
+    requests: Sequence[ReplayRequest], start_at: float, t0: float, speed: float, host: str, stats: WorkerStats, concurrency: int
+) -> None:
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    uninstall = _install_counters(stats)
+    gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(req: ReplayRequest) -> None:
+        if speed > 0:
+            delay = start_at + (req.ts - t0) / speed - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with gate:
+            started = time.perf_counter()
+            status: Optional[int] = None
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.sleep(3600)
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = int(message["status"])
+
+            try:
+                await handler(_asgi_scope(req, host), receive, send)
+            except Exception:
+                status = None
+            _record(stats, started, status)
+
+    try:
+        await asyncio.gather(*(one(req) for req in requests))
+    finally:
+        uninstall()
+
+
+def replay_worker(
+    requests: Sequence[ReplayRequest], handler: str, start_at: float, t0: float, speed: float, host: str, concurrency: int
+) -> WorkerStats:
+    stats = WorkerStats()
+
+    def on_access(sender, **kwargs):
+        stats.acl_checks += 1
+        if kwargs.get("reason") == "cache-hit":
+            stats.cache_hits += 1
+
+    access_checked.connect(on_access, weak=False, dispatch_uid="acl-replay-counter")
+    hosts = list(getattr(settings, "ALLOWED_HOSTS", []) or []) + [host]
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=hosts):
+            if handler == "asgi":
+                asyncio.run(_run_asgi(requests, start_at, t0, speed, host, stats, concurrency))
+            else:
+                _run_wsgi(requests, start_at, t0, speed, host, stats)
+    finally:
+        access_checked.disconnect(dispatch_uid="acl-replay-counter")
+    return stats
+
+
+def _replay_in_child(*args: Any) -> WorkerStats:
+    try:
+        return replay_worker(*args)
+    finally:
+        connections.close_all()
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, max(0, int(round(q * len(values))) - 1))
+    return values[idx]
+
+
+def replay(
+    requests: Sequence[ReplayRequest],
+    processes: int = 1,
+    handler: str = "wsgi",
+    speed: float = 0.0,
+    host: str = "localhost",
+    concurrency: int = 1,
+) -> ReplayReport:
+    """
+    Replay ``requests`` (ordered by timestamp) and aggregate worker stats.
+    ``speed`` scales recorded inter-arrival times (2.0 = twice as fast); 0 replays
+    as fast as the workers can go.
+    """
+    requests = sorted(requests, key=lambda r: r.ts)
+    processes = max(1, min(processes, len(requests) or 1))
+    t0 = requests[0].ts if requests else 0.0
+    start_at = time.time() + (0.5 if processes > 1 else 0.0)
+    shards = [requests[i::processes] for i in range(processes)]
+
+    wall_started = time.perf_counter()
+    sync_delay = max(0.0, start_at - time.time())
+    if processes == 1:
+        results = [replay_worker(shards[0], handler, start_at, t0, speed, host, concurrency)]
+    else:
+        # forked children must open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("fork")) as pool:
+            futures = [
+                pool.submit(_replay_in_child, shard, handler, start_at, t0, speed, host, concurrency) for shard in shards
+            ]
+            results = [f.result() for f in futures]
+    seconds = time.perf_counter() - wall_started - sync_delay
+
+    latencies = sorted(x for r in results for x in r.latencies_ms)
+    statuses: Dict[str, int] = {}
+    for r in results:
+        for code, n in r.statuses.items():
+            statuses[str(code)] = statuses.get(str(code), 0) + n
+    checks = sum(r.acl_checks for r in results)
+    total = len(latencies)
+    return ReplayReport(
+        handler=handler,
+        processes=processes,
+        requests=total,
+        seconds=round(seconds, 3),
+        throughput_rps=round(total / seconds, 1) if seconds > 0 else 0.0,
+        p50_ms=round(_percentile(latencies, 0.50), 3),
+        p95_ms=round(_percentile(latencies, 0.95), 3),
+        p99_ms=round(_percentile(latencies, 0.99), 3),
+        max_ms=round(latencies[-1], 3) if latencies else 0.0,
+        cache_hit_ratio=round(sum(r.cache_hits for r in results) / checks, 4) if checks else None,
+        db_queries_per_request=round(sum(r.db_queries for r in results) / total, 2) if total else 0.0,
+        errors=sum(r.errors for r in results),
+        statuses=dict(sorted(statuses.items())),
+    )
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import django
+from django.conf import settings
+from django.db import connection
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    mean_us: float
+    p50_us: float
+    p95_us: float
+    ops_per_sec: float
+    peak_kib: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline_us: float
+    current_us: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_us / self.baseline_us if self.baseline_us else float("inf")
+
+
+def measure(
+    name: str,
+    fn: Callable[[int], Any],
+    iterations: int,
+    warmup: int = 10,
+    setup: Optional[Callable[[int], Any]] = None,
+) -> BenchmarkResult:
+    """
+    Time ``fn(i)`` per call. ``setup(i)`` runs before each call, outside the timer.
+    Peak memory comes from one extra traced pass so tracemalloc does not skew timings.
+    """
+    for i in range(warmup):
+        if setup:
+            setup(i)
+        fn(i)
+
+    timings: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            if setup:
+                setup(i)
+            started = time.perf_counter_ns()
+            fn(i)
+            timings.append((time.perf_counter_ns() - started) / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    traced = min(iterations, 100)
+    tracemalloc.start()
+    try:
+        for i in range(traced):
+            if setup:
+                setup(i)
+            fn(i)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return summarize(name, timings, peak_kib=peak / 1024)
+
+
+def summarize(name: str, timings: List[float], peak_kib: float = 0.0) -> BenchmarkResult:
+    """Build a result from per-call timings in microseconds."""
+    timings = sorted(timings)
+    mean = statistics.fmean(timings)
+    return BenchmarkResult(
+        name=name,
+        iterations=len(timings),
+        mean_us=round(mean, 3),
+        p50_us=round(timings[len(timings) // 2], 3),
+        p95_us=round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+        ops_per_sec=round(1_000_000 / mean, 1) if mean else 0.0,
+        peak_kib=round(peak_kib, 1),
+    )
+
+
+def environment() -> Dict[str, Any]:
+    cache_backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "cache": cache_backend.rsplit(".", 1)[-1],
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+    }
+
+
+def dump_results(path: str, results: Iterable[BenchmarkResult]) -> None:
+    payload = {"environment": environment(), "results": [asdict(r) for r in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return {row["name"]: row for row in payload.get("results", [])}
+
+
+def compare_results(
+    current: Iterable[BenchmarkResult], baseline: Dict[str, Dict[str, Any]], threshold: float
+) -> List[Regression]:
+    """
+    Cases whose p50 grew by more than ``threshold`` (0.2 = 20%) over the baseline.
+    Cases missing from either side are ignored.
+    """
+    regressions: List[Regression] = []
+    for result in current:
+        base = baseline.get(result.name)
+        if not base:
+            continue
+        if result.p50_us > float(base["p50_us"]) * (1 + threshold):
+            regressions.append(Regression(result.name, float(base["p50_us"]), result.p50_us))
+    return regressions
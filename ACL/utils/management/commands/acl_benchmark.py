@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from utils.benchmarks import BenchmarkContext, GROUPS, compare_results, dump_results, load_results, run_benchmarks
+
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "acl-benchmark",
+        "TIMEOUT": None,
+    }
+}
+
+
+class Command(BaseCommand):
+    help = "Run ACL decision-path microbenchmarks against a throwaway test database; optionally compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", action="append", choices=sorted(GROUPS), help="Run only these groups (repeatable)")
+        parser.add_argument("--iterations", type=int, default=1000, help="Base iteration count per case")
+        parser.add_argument("--sizes", type=str, default="50,500,2000", help="Policy sizes (routes) for build_routes_for_user")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+        parser.add_argument("--compare", type=str, default=None, help="Baseline JSON; fail on regressions")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs baseline (0.2 = 20%%)")
+        parser.add_argument("--use-configured-cache", action="store_true", help="Use CACHES from settings instead of LocMemCache")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database (and its seeded fixtures)")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in str(options["sizes"]).split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+        ctx = BenchmarkContext(iterations=max(1, int(options["iterations"])), sizes=sizes, seed=int(options["seed"]))
+        baseline = load_results(options["compare"]) if options.get("compare") else None
+
+        keepdb = bool(options["keepdb"])
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor == "sqlite":
+            # user/0001 has a CharField without max_length, which only PostgreSQL
+            # accepts; build the throwaway schema straight from the models
+            connection.settings_dict["TEST"]["MIGRATE"] = False
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+        try:
+            overrides = {} if options["use_configured_cache"] else {"CACHES": LOCMEM_CACHES}
+            with override_settings(**overrides):
+                results = run_benchmarks(ctx, options.get("group"))
+                if options.get("output"):
+                    dump_results(options["output"], results)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+        width = max(len(r.name) for r in results) if results else 0
+        self.stdout.write(f"{'case':<{width}}  {'p50 us':>10}  {'p95 us':>10}  {'ops/s':>12}  {'peak KiB':>9}")
+        for r in results:
+            extra = " ".join(f"{k}={v}" for k, v in r.extra.items())
+            self.stdout.write(
+                f"{r.name:<{width}}  {r.p50_us:>10.2f}  {r.p95_us:>10.2f}  {r.ops_per_sec:>12,.0f}  {r.peak_kib:>9.1f}  {extra}"
+            )
+        if options.get("output"):
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, float(options["threshold"]))
+            for reg in regressions:
+                self.stdout.write(
+                    self.style.ERROR(f"REGRESSION {reg.name}: p50 {reg.baseline_us:.2f}us -> {reg.current_us:.2f}us (x{reg.ratio:.2f})")
+                )
+            if regressions:
+                raise CommandError(f"{len(regressions)} benchmark(s) regressed beyond {options['threshold']:.0%}")
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
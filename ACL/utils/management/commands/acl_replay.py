@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.benchmarks.replay import load_log, replay, synthetic_requests
+
+
+class Command(BaseCommand):
+    help = "Replay a JSON-lines request log (or Zipf synthetic traffic) through the WSGI/ASGI stack and report latency"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--log", type=str, help="JSON-lines log: method, path, user_id, application, timestamp")
+        source.add_argument("--synthetic", type=int, help="Generate this many requests from routes/users in the DB")
+        parser.add_argument("--handler", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes (e.g. planned gunicorn workers)")
+        parser.add_argument("--concurrency", type=int, default=1, help="In-flight requests per ASGI worker")
+        parser.add_argument("--speed", type=float, default=0.0, help="Time scale for recorded gaps (1 = real time, 0 = flat out)")
+        parser.add_argument("--rate", type=float, default=100.0, help="Synthetic mode: requests/second for timestamps")
+        parser.add_argument("--zipf-s", type=float, default=1.1, help="Synthetic mode: Zipf exponent for users and routes")
+        parser.add_argument("--application", type=str, default=None, help="Synthetic mode: restrict to one application")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--limit", type=int, default=None, help="Replay at most this many log entries")
+        parser.add_argument("--host", type=str, default="localhost", help="Host header to send")
+        parser.add_argument("--output", type=str, default=None, help="Write the report as JSON")
+
+    def handle(self, *args, **options):
+        if options.get("log"):
+            try:
+                with open(options["log"], "r", encoding="utf-8") as f:
+                    requests = []
+                    for req in load_log(f):
+                        requests.append(req)
+                        if options["limit"] and len(requests) >= options["limit"]:
+                            break
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read log: {exc}")
+        else:
+            requests = synthetic_requests(
+                int(options["synthetic"]),
+                rate=float(options["rate"]),
+                zipf_s=float(options["zipf_s"]),
+                seed=int(options["seed"]),
+                application=options.get("application"),
+            )
+        if not requests:
+            raise CommandError("Nothing to replay")
+
+        report = replay(
+            requests,
+            processes=int(options["processes"]),
+            handler=options["handler"],
+            speed=float(options["speed"]),
+            host=options["host"],
+            concurrency=int(options["concurrency"]),
+        )
+
+        hit_ratio = "n/a" if report.cache_hit_ratio is None else f"{report.cache_hit_ratio:.1%}"
+        self.stdout.write(
+            f"{report.handler} x{report.processes}: {report.requests} requests in {report.seconds:.2f}s "
+            f"({report.throughput_rps:,.1f} req/s)"
+        )
+        self.stdout.write(
+            f"latency ms: p50={report.p50_ms:.2f} p95={report.p95_ms:.2f} p99={report.p99_ms:.2f} max={report.max_ms:.2f}"
+        )
+        self.stdout.write(
+            f"acl cache hit ratio={hit_ratio} db queries/request={report.db_queries_per_request:.2f} errors={report.errors}"
+        )
+        self.stdout.write("status codes: " + ", ".join(f"{code}={n}" for code, n in report.statuses.items()))
+        if options.get("output"):
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report.as_dict(), f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from django.core.management.base import BaseCommand
-from aclcore.models import ACLApplication, ACLRoute, ACLRole, ACLRoleRoutePermission, ACLUserRole
+from aclcore.models import ACLApplication, ACLRoute, ACLRole, ACLRoleClosure, ACLRoleRoutePermission, ACLUserRole
+from aclcore.services.matrix import MatrixError, PolicyMatrix
+from aclcore.services.replicas import replica_reads
 
 
 class Command(BaseCommand):
@@ -28,13 +30,32 @@ class Command(BaseCommand):
             type=str,
             help="Filter by user_id (lists roles assigned; does not filter permissions).",
         )
+        parser.add_argument(
+            "--who-can",
+            type=str,
+            help='Reverse query: users allowed on a route, e.g. "DELETE /api/x/" (requires --application).',
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Maximum user ids printed by --who-can.",
+        )
 
     def handle(self, *args, **options):
+        # read-only listing: a replica will do
+        with replica_reads():
+            return self._handle(**options)
+
+    def _handle(self, **options):
         application_name = options.get("application")
         path_filter = options.get("path")
         role_filter = options.get("role")
         user_filter = options.get("user")
 
+        if options.get("who_can"):
+            return self._who_can(application_name, options["who_can"], options["limit"])
+
         app = None
         if application_name:
             app = ACLApplication.objects.filter(name=application_name).first()
@@ -42,13 +63,14 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f"Application '{application_name}' not found"))
                 return
 
-        routes = ACLRoute.objects.all().order_by("path", "method")
+        routes = ACLRoute.objects.select_related("application").order_by("path", "method")
         if app:
             routes = routes.filter(application=app)
         if path_filter:
             routes = routes.filter(path__icontains=path_filter)
+        routes = list(routes)
 
-        if not routes.exists():
+        if not routes:
             self.stdout.write(self.style.WARNING("No routes found with the given filters."))
             return
 
@@ -59,21 +81,56 @@ class Command(BaseCommand):
                 qs = qs.filter(application=app)
             roles = list(qs.select_related("role").values_list("role__name", flat=True))
             self.stdout.write(self.style.NOTICE(f"user_id={user_filter} roles={roles or '[]'}"))
+            inherited = sorted(
+                set(
+                    ACLRoleClosure.objects.filter(descendant_id__in=qs.values("role_id"))
+                    .exclude(ancestor_id__in=qs.values("role_id"))
+                    .values_list("ancestor__name", flat=True)
+                )
+            )
+            if inherited:
+                self.stdout.write(self.style.NOTICE(f"  inherited roles={inherited}"))
+
+        # one query for all bindings instead of one per route
+        perms = ACLRoleRoutePermission.objects.all()
+        if app:
+            perms = perms.filter(route__application=app)
+        if path_filter:
+            perms = perms.filter(route__path__icontains=path_filter)
+        if role_filter:
+            perms = perms.filter(role__name=role_filter)
+        bindings = {}
+        for route_id, role_name, is_allowed in perms.order_by("role__name").values_list("route_id", "role__name", "is_allowed"):
+            bindings.setdefault(route_id, []).append((role_name, is_allowed))
 
         for route in routes:
             self.stdout.write("")
             app_label = route.application.name if route.application else "default"
             self.stdout.write(self.style.NOTICE(f"[{app_label}] {route.method} {route.path} (ignored={route.is_ignored}, active={route.is_active})"))
 
-            perms = ACLRoleRoutePermission.objects.filter(route=route).select_related("role").order_by("role__name")
-            if role_filter:
-                perms = perms.filter(role__name=role_filter)
-
-            if not perms.exists():
+            route_bindings = bindings.get(route.pk)
+            if not route_bindings:
                 self.stdout.write("  - (no role bindings)")
                 continue
 
-            for p in perms:
-                status = "ALLOW" if p.is_allowed else "DENY"
-                self.stdout.write(f"  - {status:<5} role={p.role.name}")
+            for role_name, is_allowed in route_bindings:
+                status = "ALLOW" if is_allowed else "DENY"
+                self.stdout.write(f"  - {status:<5} role={role_name}")
 
+    def _who_can(self, application_name, route: str, limit: int) -> None:
+        if not application_name:
+            self.stdout.write(self.style.ERROR("--who-can requires --application"))
+            return
+        try:
+            matrix = PolicyMatrix(application_name)
+            r = matrix.find_route(route)
+        except MatrixError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+        if matrix.ignored_bits >> r & 1:
+            self.stdout.write(self.style.NOTICE(f"{matrix.route_label(r)} is ignored: every user is allowed"))
+            return
+        users = matrix.users_for_route(r)
+        self.stdout.write(self.style.NOTICE(f"[{application_name}] {matrix.route_label(r)}: {users.bit_count()} users allowed"))
+        for user_id in matrix.user_ids_of(users, limit):
+            self.stdout.write(f"  - {user_id}")
@@ -10,6 +10,7 @@ ERROR_METHOD_NOT_ALLOWED = "You do not have permission to use this HTTP method."
 ERROR_INTERNAL_SERVER = "Internal server error."
 ERROR_RATE_LIMIT_EXCEEDED = "Too many requests. Please slow down."
 ERROR_LOGIN_RATE_LIMIT_EXCEEDED = "Too many login attempts. Please wait before retrying."
+ERROR_LOGIN_BUSY = "Login is temporarily overloaded. Please retry shortly."
 
 # Validation messages
 ERROR_PASSWORD_REQUIRED = "Password is required."
@@ -105,3 +105,62 @@ class RouteBuilderTests(TestCase):
 # WebSocket auth tests removed.
 # For WebSocket ACL testing, use aclcore.ws_middleware.WsAclMiddleware
 # or aclcore.ws_middleware.SessionWSAuthMiddleware in your ASGI stack.
+
+
+class BenchmarkSuiteTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_cold_cases_cover_every_reason(self):
+        from utils.benchmarks import BenchmarkContext, run_benchmarks
+
+        results = run_benchmarks(BenchmarkContext(iterations=4), ["evaluate"])
+        cold = {r.name: r.extra["reason"] for r in results if r.name.startswith("evaluate_cold")}
+        for name, reason in cold.items():
+            self.assertEqual(name, f"evaluate_cold[{reason}]")
+        self.assertEqual(len(cold), 6)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        from utils.benchmarks import BenchmarkResult, compare_results
+
+        current = [
+            BenchmarkResult("fast", 10, 1.0, 1.0, 1.0, 1e6, 0.0),
+            BenchmarkResult("slow", 10, 2.0, 2.0, 2.0, 5e5, 0.0),
+        ]
+        baseline = {"fast": {"p50_us": 0.9}, "slow": {"p50_us": 1.0}}
+        self.assertEqual([r.name for r in compare_results(current, baseline, 0.2)], ["slow"])
+
+
+class ReplayHarnessTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        app = ACLApplication.objects.create(name="replay")
+        role = ACLRole.objects.create(application=app, name="viewer")
+        route = ACLRoute.objects.create(application=app, path="/api/replay/", normalized_path="/api/replay", method="GET")
+        ACLRoleRoutePermission.objects.create(role=role, route=route, is_allowed=True)
+        ACLUserRole.objects.create(user_id="u1", application=app, role=role)
+
+    def test_log_parsing_and_wsgi_replay_counts(self):
+        from django.core.signals import request_finished, request_started
+        from django.db import close_old_connections
+        from utils.benchmarks.replay import load_log, replay
+
+        lines = [
+            '{"method": "get", "path": "/api/replay/", "user_id": "u1", "app": "replay", "timestamp": "2026-01-01T00:00:00Z"}',
+            '{"method": "GET", "path": "/api/replay/", "user": "u1", "application": "replay", "ts": 1767225600.5}',
+        ]
+        requests = list(load_log(lines))
+        self.assertEqual(requests[0].method, "GET")
+        self.assertAlmostEqual(requests[1].ts - requests[0].ts, 0.5)
+
+        # keep the test transaction's connection open, as the test client does
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            report = replay(requests, handler="wsgi")
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        self.assertEqual(report.requests, 2)
+        self.assertEqual(report.cache_hit_ratio, 0.5)
+        self.assertGreater(report.db_queries_per_request, 0)
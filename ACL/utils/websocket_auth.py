@@ -9,6 +9,7 @@ from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 
 from user.models import User, Staff
+from user.principals import get_principal
 
 
 logger = logging.getLogger(__name__)
@@ -60,19 +61,9 @@ class SessionAuthMiddleware:
     @database_sync_to_async
     def _get_user_or_staff(self, identifier: str) -> Union[User, Staff, None]:
         """
-        Resolve identifier to User or Staff. Prefer Staff if numeric, else User.
+        Resolve identifier to Staff, then User (cached, see user.principals).
         """
-        # Try Staff by primary key (supports UUID or int)
-        try:
-            return Staff.objects.get(pk=identifier, is_active=True)
-        except Staff.DoesNotExist:
-            pass
-
-        # Fallback: User by string PK
-        try:
-            return User.objects.get(pk=identifier, is_active=True)
-        except User.DoesNotExist:
-            return None
+        return get_principal("staff", identifier) or get_principal("user", identifier)
 
 
 def SessionAuthMiddlewareStack(app):
@@ -10,6 +10,11 @@ fi
 
 python manage.py migrate --noinput
 
+# Cheap when the URLConf is unchanged (digest short-circuit)
+if [ -n "${ACLCORE_DEFAULT_APPLICATION:-}" ]; then
+  python manage.py aclcore_sync_routes --application "$ACLCORE_DEFAULT_APPLICATION"
+fi
+
 exec gunicorn ACL.wsgi:application --bind 0.0.0.0:8000 --workers 3 --timeout 60
 
 